@@ -282,6 +282,12 @@ admin_api_operations = {
                     'GET'
                 ]
             },
+            '/api/v0/system/cache-flush': {
+                'function': 'empty the in-process caches of every worker',
+                'methods': [
+                    'POST'
+                ]
+            },
         }
     },
     '1': {
@@ -329,6 +335,12 @@ admin_api_operations = {
                     'GET'
                 ]
             },
+            '/api/v1/system/cache-flush': {
+                'function': 'empty the in-process caches of every worker',
+                'methods': [
+                    'POST'
+                ]
+            },
         }
     }
 }
@@ -31,6 +31,8 @@ class MockUser(object):
         with db_instance() as db:
             db.execute(sql)
             db.commit()
+        # remembered logins would otherwise point at the deleted records
+        User.forget('bilbo_baggins')
 
     @classmethod
     def get(cls, *args):
@@ -136,9 +136,8 @@ class Order(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, params)
-                logger.info('New order complete SQL: {}'
-                            .format(log_sql))
+                log_sql = db.mogrify_later(sql, params)
+                logger.info('New order complete SQL: %s', log_sql)
                 db.execute(sql, params)
                 db.commit()
         except DBConnectException as e:
@@ -222,8 +221,8 @@ class Order(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, values)
-                logger.info('order.py where sql: {}'.format(log_sql))
+                log_sql = db.mogrify_later(sql, values)
+                logger.info('order.py where sql: %s', log_sql)
 
                 db.select(sql, values)
 
@@ -276,6 +275,42 @@ class Order(object):
         scene_list = Scene.where(params)
         return scene_list
 
+    @classmethod
+    def user_scene_count(cls, user_id, params=None, order_status=None):
+        """
+        Count the scenes associated with a user, without building
+        the scene objects
+
+        :param user_id: user info
+        :param params: additional SQL query parameters on ordering_scene
+        :param order_status: limit to orders with this status
+        :return: int
+        """
+        base_sql = ('SELECT count(s.id) '
+                    'FROM ordering_scene s '
+                    'JOIN ordering_order o ON o.id = s.order_id '
+                    'WHERE ')
+        sql_dict = {'o.user_id': user_id}
+        if order_status:
+            sql_dict['o.status'] = order_status
+        for key, val in (params or dict()).items():
+            sql_dict['s.{}'.format(key)] = val
+
+        sql, values = format_sql_params(base_sql, sql_dict)
+
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.mogrify_later(sql, values)
+                logger.info('order.py user_scene_count sql: %s', log_sql)
+                db.select(sql, values)
+        except DBConnectException as e:
+            logger.critical('Error order user_scene_count: {}\n'
+                            'sql: {}'.format(e.message, log_sql))
+            raise OrderException(e)
+
+        return int(db[0][0])
+
     @classmethod
     def generate_ee_order_id(cls, email_addr, eeorder):
         """
@@ -481,8 +516,8 @@ class Order(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (self.user_id,))
-                logger.info('order.py user_email: {}'.format(log_sql))
+                log_sql = db.mogrify_later(sql, (self.user_id,))
+                logger.info('order.py user_email: %s', log_sql)
 
                 db.select(sql, self.user_id)
 
@@ -519,18 +554,18 @@ class Order(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(cols),
-                                                  vals,
-                                                  db_extns.AsIs(cols),
-                                                  vals))
+                log_sql = db.mogrify_later(sql, (db_extns.AsIs(cols),
+                                                vals,
+                                                db_extns.AsIs(cols),
+                                                vals))
                 db.execute(sql, (db_extns.AsIs(cols), vals,
                                  db_extns.AsIs(cols), vals))
                 db.commit()
 
-                logger.info('Saved updates to order id: {}\n'
-                            'order.id: {}\nsql: {}\nargs: {}'
-                            .format(self.orderid, self.id, log_sql,
-                                    zip(attr_tup, vals)))
+                logger.info('Saved updates to order id: %s\n'
+                            'order.id: %s\nsql: %s\nargs: %s',
+                            self.orderid, self.id, log_sql,
+                            zip(attr_tup, vals))
         except DBConnectException as e:
             logger.critical('Error saving order: {}\nsql: {}'
                             .format(e.message, log_sql))
@@ -555,9 +590,9 @@ class Order(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(att),
-                                                  val, self.id))
-                logger.info(log_sql)
+                log_sql = db.mogrify_later(sql, (db_extns.AsIs(att),
+                                                val, self.id))
+                logger.info('%s', log_sql)
                 db.execute(sql, (db_extns.AsIs(att), val, self.id))
                 db.commit()
         except DBConnectException as e:
@@ -596,6 +631,38 @@ class Order(object):
 
         return int(db[0][0])
 
+    @classmethod
+    def status_fingerprint(cls, orderid):
+        """
+        Summarize the current state of an order and its scenes with a
+        single aggregate query, without materializing any Scene objects
+
+        :param orderid: orderid of the order to summarize
+        :return: dict of status, completion_date, scene_count and
+                 last_modified (max scene status_modified), or None
+                 if the order does not exist
+        """
+        sql = ('SELECT o.status, o.completion_date, '
+               'count(s.id) AS scene_count, '
+               'max(s.status_modified) AS last_modified '
+               'FROM ordering_order o '
+               'LEFT JOIN ordering_scene s ON s.order_id = o.id '
+               'WHERE o.orderid = %s '
+               'GROUP BY o.id, o.status, o.completion_date;')
+
+        try:
+            with db_instance() as db:
+                db.select(sql, (orderid,))
+                if not len(db):
+                    return None
+                ret = dict(db[0])
+        except DBConnectException as e:
+            logger.critical('Error order status_fingerprint: {}\n'
+                            'orderid: {}'.format(e.message, orderid))
+            raise OrderException(e)
+
+        return ret
+
     def products_by_sensor(self):
         """
         Return a dictionary of the requested products, keyed on sensor
@@ -144,10 +144,9 @@ class Scene(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = (db.cursor.
-                           mogrify(sql, (db_extns.AsIs(col_name),
-                                         scene_name, orderid)))
-                logger.info(log_sql)
+                log_sql = db.mogrify_later(sql, (db_extns.AsIs(col_name),
+                                                scene_name, orderid))
+                logger.info('%s', log_sql)
                 db.select(sql, (db_extns.AsIs(col_name),
                                 scene_name, orderid))
                 ret = db[0][col]
@@ -204,9 +203,8 @@ class Scene(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, args)
-                logger.info('scene creation sql: {}'
-                            .format(log_sql))
+                log_sql = db.mogrify_later(sql, args)
+                logger.info('scene creation sql: %s', log_sql)
                 db.execute(sql, args)
                 db.commit()
 
@@ -234,8 +232,8 @@ class Scene(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, values)
-                logger.info('scene.py where sql: {}'.format(log_sql))
+                log_sql = db.mogrify_later(sql, values)
+                logger.info('scene.py where sql: %s', log_sql)
                 db.select(sql, values)
                 for i in db:
                     sd = dict(i)
@@ -318,9 +316,9 @@ class Scene(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(fields),
-                                                  vals, ids))
-                logger.info('\n*** Bulk Updating scenes: \n' + log_sql + "\n\***\n")
+                log_sql = db.mogrify_later(sql, (db_extns.AsIs(fields),
+                                                vals, ids))
+                logger.info('\n*** Bulk Updating scenes: \n%s\n\***\n', log_sql)
                 db.execute(sql, (db_extns.AsIs(fields), vals, ids))
                 db.commit()
         except DBConnectException as e:
@@ -344,9 +342,9 @@ class Scene(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(att),
-                                                  val, self.id))
-                logger.info("\n*** Updating scene: \n" + log_sql + '\n***\n"')
+                log_sql = db.mogrify_later(sql, (db_extns.AsIs(att),
+                                                val, self.id))
+                logger.info('\n*** Updating scene: \n%s\n***\n"', log_sql)
                 db.execute(sql, (db_extns.AsIs(att), val, self.id))
                 db.commit()
         except DBConnectException as e:
@@ -378,15 +376,15 @@ class Scene(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(cols),
-                                                  vals, self.id))
+                log_sql = db.mogrify_later(sql, (db_extns.AsIs(cols),
+                                                vals, self.id))
 
                 db.execute(sql, (db_extns.AsIs(cols), vals, self.id))
                 db.commit()
-                logger.info('\n*** Saved updates to scene id: {}, name:{}\n'
-                            'sql: {}\n args: {}\n***'
-                            .format(self.id, self.name,
-                                    log_sql, zip(attr_tup, vals)))
+                logger.info('\n*** Saved updates to scene id: %s, name:%s\n'
+                            'sql: %s\n args: %s\n***',
+                            self.id, self.name,
+                            log_sql, zip(attr_tup, vals))
         except DBConnectException as e:
             logger.critical("Error saving scene: {}\n"
                             "sql: {}".format(e.message, log_sql))
@@ -413,8 +411,8 @@ class Scene(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(col),
-                                                  self.id))
+                log_sql = db.mogrify_later(sql, (db_extns.AsIs(col),
+                                                self.id))
                 db.select(sql, (db_extns.AsIs(col), self.id))
                 ret = db[0][col]
 
@@ -432,6 +430,37 @@ class Scene(object):
 
         return ret
 
+    @staticmethod
+    def order_attrs(scenes, col):
+        """
+        Select the column value from the ordering_order table for many
+        scenes in a single query
+
+        :param scenes: list of Scene instances
+        :param col: column to select on
+        :return: dict, {scene id: value}
+        """
+        if not scenes:
+            return dict()
+
+        sql = ('SELECT ordering_scene.id, %s '
+               'FROM ordering_scene JOIN ordering_order '
+               'ON ordering_order.id = ordering_scene.order_id '
+               'WHERE ordering_scene.id in %s')
+        params = (db_extns.AsIs(col), tuple(s.id for s in scenes))
+
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.mogrify_later(sql, params)
+                db.select(sql, params)
+                return {row['id']: row[col] for row in db}
+
+        except DBConnectException as e:
+            logger.critical('Error retrieving order_attrs: {}\n'
+                            'sql: {} \n'.format(e.message, log_sql))
+            raise SceneException(e)
+
     @staticmethod
     def cancel_opts():
         """
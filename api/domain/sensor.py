@@ -5,7 +5,8 @@ Author: David V. Hill
 """
 import os
 import re
-from collections import namedtuple
+import threading
+from collections import namedtuple, OrderedDict
 
 import yaml
 
@@ -13,15 +14,18 @@ from api import ProductNotImplemented, __location__
 from api.util import julian_date_check, julian_from_date
 from api.system.logger import ilogger as logger
 
+# libyaml's loader, when built, is many times faster than pure python
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 # Grab details on product restrictions
 # Do it here, vs during object instantiation,
 # to avoid needless repetition
 with open(os.path.join(__location__, 'domain/restricted.yaml')) as f:
-    restricted = yaml.safe_load(f.read())
+    restricted = yaml.load(f.read(), Loader=YamlLoader)
 
 # Grab human-readable product names/categories
 with open(os.path.join(__location__, 'domain/products.yaml')) as f:
-    products = yaml.safe_load(f.read())
+    products = yaml.load(f.read(), Loader=YamlLoader)
 
 
 class ProductNames(object):
@@ -125,22 +129,29 @@ class Modis(SensorProduct):
 
         self.short_name = parts[0]
         self.date_acquired = parts[1][1:]
-        self.year = self.date_acquired[0:4]
-        self.doy = self.date_acquired[4:8]
+        self.year, self.doy, self.lta_json_name = self.parse_id(product_id)
 
         __hv = parts[2]
         self.horizontal = __hv[1:3]
         self.vertical = __hv[4:6]
         self.version = parts[3]
         self.date_produced = parts[4]
-        self.lta_json_name = self.lta_json_name.format(collection=int(self.version))
-        if int(self.version) == 5:
-            # MODIS Version 5 dataset does not have a version...
-            self.lta_json_name = self.lta_json_name.replace('_V5', '')
 
     def __repr__(self):
         return 'MODIS: {}'.format(self.__dict__)
 
+    @classmethod
+    def parse_id(cls, product_id):
+        """Year, day of year and LTA dataset name, without instantiation"""
+        parts = product_id.strip().split('.')
+        date_acquired = parts[1][1:]
+        version = int(parts[3])
+        dataset = cls.lta_json_name.format(collection=version)
+        if version == 5:
+            # MODIS Version 5 dataset does not have a version...
+            dataset = dataset.replace('_V5', '')
+        return date_acquired[0:4], date_acquired[4:8], dataset
+
 
 class Terra(Modis):
     """Superclass for Terra based Modis products"""
@@ -336,19 +347,25 @@ class Viirs(SensorProduct):
 
         self.short_name = parts[0]
         self.date_acquired = parts[1][1:]
-        self.year = self.date_acquired[0:4]
-        self.doy = self.date_acquired[4:8]
+        self.year, self.doy, self.lta_json_name = self.parse_id(product_id)
 
         __hv = parts[2]
         self.horizontal = __hv[1:3]
         self.vertical = __hv[4:6]
         self.version = parts[3]
         self.date_produced = parts[4]
-        self.lta_json_name = self.lta_json_name.format(collection=int(self.version))
 
     def __repr__(self):
         return 'VIIRS: {}'.format(self.__dict__)
 
+    @classmethod
+    def parse_id(cls, product_id):
+        """Year, day of year and LTA dataset name, without instantiation"""
+        parts = product_id.strip().split('.')
+        date_acquired = parts[1][1:]
+        dataset = cls.lta_json_name.format(collection=int(parts[3]))
+        return date_acquired[0:4], date_acquired[4:8], dataset
+
 
 class Viirs09GA(Viirs):
     """models VIIRS VNP09GA"""
@@ -380,19 +397,26 @@ class Landsat(SensorProduct):
         super(Landsat, self).__init__(product_id)
 
         _idlist = product_id.split('_')
-        self.year = _idlist[3][:4]
-        self.doy = julian_from_date(_idlist[3][:4], _idlist[3][4:6], _idlist[3][6:8])
+        self.year, self.doy, self.lta_json_name = self.parse_id(product_id)
         self.julian = self.year + self.doy
         self.path = _idlist[2][:3].lstrip('0')
         self.row = _idlist[2][3:].lstrip('0')
         self.correction_level = _idlist[1]
         self.collection_number = _idlist[-2]
         self.collection_category = _idlist[-1]
-        self.lta_json_name = self.lta_json_name.format(collection=int(self.collection_number))
 
     def __repr__(self):
         return 'Landsat: {}'.format(self.__dict__)
 
+    @classmethod
+    def parse_id(cls, product_id):
+        """Year, day of year and LTA dataset name, without instantiation"""
+        _idlist = product_id.strip().split('_')
+        year = _idlist[3][:4]
+        doy = julian_from_date(year, _idlist[3][4:6], _idlist[3][6:8])
+        dataset = cls.lta_json_name.format(collection=int(_idlist[-2]))
+        return year, doy, dataset
+
     # SR based products are not available for those
     # dates where we are missing auxiliary data
     def sr_date_restricted(self):
@@ -575,16 +599,9 @@ class Sentinel2(SensorProduct):
         id_len = self.check_id(product_id)
 
         if id_len is 'short':
-            _idlist = product_id.split('_')
-            self.year = _idlist[3][:4]
-            self.doy = julian_from_date(self.year, _idlist[3][4:6], _idlist[3][6:8])
-            self.julian = self.year + self.doy
-            self.tile = _idlist[1]
+            self.tile = product_id.split('_')[1]
 
         elif id_len is 'long':
-            self.year = product_id[25:29]
-            self.doy = julian_from_date(self.year, product_id[29:31], product_id[31:33])
-            self.julian = self.year + self.doy
             self.tile = product_id[66:71]
 
         else:
@@ -592,6 +609,9 @@ class Sentinel2(SensorProduct):
             logger.exception(msg)
             raise ProductNotImplemented(product_id)
 
+        self.year, self.doy, _ = self.parse_id(product_id)
+        self.julian = self.year + self.doy
+
     def __repr__(self):
         return 'Sentinel: {}'.format(self.__dict__)
 
@@ -604,7 +624,8 @@ class Sentinel2(SensorProduct):
                     return True
         return False
 
-    def check_id(self, product_id):
+    @staticmethod
+    def check_id(product_id):
         """
         Determine what the product_id looks like (long or short)
         """
@@ -615,6 +636,23 @@ class Sentinel2(SensorProduct):
         else:
             return None
 
+    @classmethod
+    def parse_id(cls, product_id):
+        """Year, day of year and LTA dataset name, without instantiation"""
+        product_id = product_id.strip()
+        id_len = cls.check_id(product_id)
+
+        if id_len is 'short':
+            date_acquired = product_id.split('_')[3]
+        elif id_len is 'long':
+            date_acquired = product_id[25:33]
+        else:
+            raise ProductNotImplemented(product_id)
+
+        year = date_acquired[:4]
+        doy = julian_from_date(year, date_acquired[4:6], date_acquired[6:8])
+        return year, doy, cls.lta_json_name
+
 
 class Sentinel2_AB(Sentinel2):
     """Superclass for all sentinel 2-AB based products"""
@@ -733,28 +771,92 @@ class SensorCONST(object):
     }
 
 
-def instance(product_id):
+class ParsedIdCache(object):
     """
-    Supported MODIS products
-    MOD09A1 MOD09GA MOD09GQ MOD09Q1 MYD09A1 MYD09GA MYD09GQ MYD09Q1
-    MOD13A1 MOD13A2 MOD13A3 MOD13Q1 MYD13A1 MYD13A2 MYD13A3 MYD13Q1
+    Small thread-safe LRU mapping of lower-cased product id to the
+    (shortname, class) it was matched to, or None when unsupported
+    """
+    def __init__(self, maxsize=20000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                return default
+            self._entries[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _compile_instances(instances):
+    """
+    Compile the SensorCONST patterns once, and index them on the literal
+    prefix each pattern starts with (lt04, mod09a1, vnp09ga, ...)
 
-    MODIS FORMAT:   MOD09GQ.A2000072.h02v09.005.2008237032813
+    :return: list of (shortname, regex, class), dict of prefix: same
+    """
+    compiled = []
+    dispatch = {}
+    for key, (pattern, cls, _) in instances.items():
+        entry = (key, re.compile(pattern), cls)
+        compiled.append(entry)
+        prefix = re.match(r'\^([a-z0-9]+)', pattern)
+        if prefix:
+            dispatch.setdefault(prefix.group(1), []).append(entry)
+    return compiled, dispatch
 
-    Supported VIIRS products
-    VNP09GA
 
-    VIIRS FORMAT:   VNP09GA.A2019059.h18v06.001.2019061005706
+_compiled_instances, _prefix_dispatch = _compile_instances(SensorCONST.instances)
+_prefix_split = re.compile(r'[_.]')
+_parsed_ids = ParsedIdCache()
+_unparsed = object()
 
-    Supported LANDSAT products
-    LT04 LT05 LE07 LC08 LO08
 
-    LANDSAT FORMAT: LE07_L1TP_026027_20170912_20171008_01_T1
+def _match_instance(_id):
+    """
+    Find the (shortname, class) for a cleaned, lower-cased product id
 
-    SENTINEL 2[A,B] FORMAT: L1C_T14TPP_A022031_20190910T172721
+    Ids are dispatched on their leading token first; anything whose token
+    isn't a known prefix (such as the long S2A/S2B names) falls back to
+    trying every pattern.
+    """
+    match = _parsed_ids.get(_id, _unparsed)
+    if match is not _unparsed:
+        return match
+
+    token = _prefix_split.split(_id, 1)[0]
+    candidates = _prefix_dispatch.get(token, _compiled_instances)
+
+    match = None
+    for key, regex, cls in candidates:
+        if regex.match(_id):
+            match = (key, cls)
+            break
+
+    _parsed_ids.set(_id, match)
+    return match
 
+
+def _strip_extension(product_id):
     """
+    Remove known file extensions from a product id
 
+    :return: (product_id with its case intact, lower-cased product_id)
+    """
     # remove known file extensions before comparison
     # do not alter the case of the actual product_id!
     _id = product_id.lower().strip()
@@ -785,18 +887,87 @@ def instance(product_id):
         product_id = product_id[0:index]
         _id = _id[0:index]
 
-    instances = SensorCONST.instances
+    return product_id, _id
+
+
+def instance(product_id):
+    """
+    Supported MODIS products
+    MOD09A1 MOD09GA MOD09GQ MOD09Q1 MYD09A1 MYD09GA MYD09GQ MYD09Q1
+    MOD13A1 MOD13A2 MOD13A3 MOD13Q1 MYD13A1 MYD13A2 MYD13A3 MYD13Q1
+
+    MODIS FORMAT:   MOD09GQ.A2000072.h02v09.005.2008237032813
+
+    Supported VIIRS products
+    VNP09GA
+
+    VIIRS FORMAT:   VNP09GA.A2019059.h18v06.001.2019061005706
+
+    Supported LANDSAT products
+    LT04 LT05 LE07 LC08 LO08
+
+    LANDSAT FORMAT: LE07_L1TP_026027_20170912_20171008_01_T1
+
+    SENTINEL 2[A,B] FORMAT: L1C_T14TPP_A022031_20190910T172721
+
+    """
+
+    product_id, _id = _strip_extension(product_id)
 
-    for key in instances.iterkeys():
-        if re.match(instances[key][0], _id):
-            inst = instances[key][1](product_id.strip())
-            inst.shortname = key
-            return inst
+    match = _match_instance(_id)
+    if match:
+        key, cls = match
+        inst = cls(product_id.strip())
+        inst.shortname = key
+        return inst
 
     msg = u"[{0:s}] is not a supported sensor product".format(product_id)
     raise ProductNotImplemented(msg)
 
 
+def classify(product_ids):
+    """Classifies a batch of product ids in one pass, without building
+    a SensorProduct object for each
+
+    Args:
+        product_ids (iterable): product ids (str), file extensions allowed
+
+    Returns:
+        dict: { 'tm5_collection': {'products': [output, products],
+                                   'inputs': [supplied, input, products],
+                                   'datasets': {'LANDSAT_TM_C1': [inputs]},
+                                   'dates': {input: (year, doy)}},
+                'not_implemented': [unsupported, inputs] }
+    """
+    result = {}
+
+    for product in product_ids:
+        stripped, _id = _strip_extension(product)
+        match = _match_instance(_id)
+        if match:
+            key, cls = match
+            try:
+                year, doy, dataset = cls.parse_id(stripped)
+            except (ProductNotImplemented, ValueError, IndexError):
+                match = None
+
+        if not match:
+            result.setdefault('not_implemented', []).append(product)
+            continue
+
+        if key not in result:
+            result[key] = {'products': list(getattr(cls, 'products', [])),
+                           'inputs': [],
+                           'datasets': {},
+                           'dates': {}}
+        group = result[key]
+        group['inputs'].append(product)
+        group['datasets'].setdefault(dataset, []).append(product)
+        group['dates'][product] = (year, doy)
+
+    return result
+
+
 def available_products(input_products):
     """Lists all the available products for each input_product
 
@@ -816,18 +987,10 @@ def available_products(input_products):
 
     result = {}
 
-    for product in input_products:
-        try:
-            inst = instance(product)
-            name = inst.shortname
-            if name not in result:
-                result[name] = {'products': inst.products,
-                                'inputs': [product]}
-            else:
-                result[name]['inputs'].append(product)
-        except ProductNotImplemented:
-            if 'not_implemented' not in result:
-                result['not_implemented'] = [product]
-            else:
-                result['not_implemented'].append(product)
+    for name, group in classify(input_products).items():
+        if name == 'not_implemented':
+            result[name] = group
+        else:
+            result[name] = {'products': group['products'],
+                            'inputs': group['inputs']}
     return result
@@ -1,5 +1,8 @@
+import os
 import sys
 import time
+import hmac
+import hashlib
 import traceback
 import datetime
 
@@ -10,11 +13,15 @@ from api.domain import format_sql_params
 from api.domain.order import Order
 from api.domain.scene import Scene
 from api.external.ers import ERSApi
+from api.providers.caching.caching_provider import CachingProvider
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.system.logger import ilogger as logger
 from api.util.dbconnect import db_instance, DBConnectException
+from api.util.singleflight import SingleFlight
 
 ers = ERSApi()
+cache = CachingProvider(local_timeout=60)
+logins = SingleFlight()
 
 
 class UserException(Exception):
@@ -23,16 +30,31 @@ class UserException(Exception):
 
 class User(object):
 
-    base_sql = "SELECT username, email, first_name, last_name, contactid "\
+    base_sql = "SELECT id, username, email, first_name, last_name, contactid, "\
+                "is_staff, is_active, is_superuser "\
                 "FROM auth_user WHERE "
 
-    def __init__(self, username, email, first_name, last_name, contactid):
+    role_columns = ('is_staff', 'is_active', 'is_superuser')
+
+    # seconds a successful login is remembered for
+    credential_timeout = 7200
+
+    # seconds before roles are re-read, so role changes propagate
+    roles_timeout = 300
+
+    def __init__(self, username, email, first_name, last_name, contactid,
+                 user_id=None, roles=None):
         self.username = username
         self.email = email
         self.first_name = first_name
         self.last_name = last_name
         self.contactid = contactid
-        self.id = self.find_or_create_user()
+        self._roles = None
+        self._roles_loaded = 0
+        if roles is not None:
+            self._set_roles(roles)
+        # a known id means the auth_user record is already current
+        self.id = user_id or self.find_or_create_user()
 
     @property
     def username(self):
@@ -111,6 +133,69 @@ class User(object):
             eu = ers.get_user_info(username, password)
             return eu['username'], eu['email'], eu['firstName'], eu['lastName'], eu['contact_id']
 
+    @staticmethod
+    def credentials_key(username):
+        # usernames with spaces are valid in EE, though they can't be used for cache keys
+        return '{}-credentials'.format(username.replace(' ', '_espa_cred_insert_'))
+
+    @staticmethod
+    def password_digest(password, salt):
+        if isinstance(password, unicode):
+            password = password.encode('utf-8')
+        return hashlib.sha256(salt + password).hexdigest()
+
+    @classmethod
+    def authenticate(cls, username, password):
+        """
+        Log a user in, remembering successful logins for credential_timeout
+        seconds under a salted hash of the password
+
+        Concurrent logins for the same credentials within this process
+        share a single ERS lookup
+
+        :param username: ERS username
+        :param password: ERS password
+        :return: User
+        """
+        cache_key = cls.credentials_key(username)
+        cache_entry = cache.get(cache_key)
+
+        # User may have changed their password while it was still cached
+        if cache_entry and 'salt' in cache_entry:
+            digest = cls.password_digest(password, cache_entry['salt'])
+            if hmac.compare_digest(str(cache_entry['digest']), digest):
+                fresh = time.time() - cache_entry.get('roles_loaded', 0) < cls.roles_timeout
+                user = cls(*cache_entry['user_entry'], user_id=cache_entry['user_id'],
+                           roles=cache_entry.get('roles') if fresh else None)
+                if not fresh:
+                    cache_entry.update(roles=user.roles(), roles_loaded=user._roles_loaded)
+                    cache.set(cache_key, cache_entry, cls.credential_timeout)
+                return user
+
+        flight_key = (cache_key, cls.password_digest(password, ''))
+        user_entry, user_id, roles = logins.do(flight_key, cls._login, username, password)
+        return cls(*user_entry, user_id=user_id, roles=roles)
+
+    @classmethod
+    def _login(cls, username, password):
+        user_entry = cls.get(username, password)
+        user = cls(*user_entry)
+
+        salt = os.urandom(16).encode('hex')
+        cache_entry = {'salt': salt,
+                       'digest': cls.password_digest(password, salt),
+                       'user_entry': user_entry,
+                       'user_id': user.id,
+                       'roles': user.roles(),
+                       'roles_loaded': user._roles_loaded}
+        cache.set(cls.credentials_key(username), cache_entry, cls.credential_timeout)
+        return user_entry, user.id, user.roles()
+
+    @classmethod
+    def forget(cls, username):
+        """ Drop any remembered login for the user """
+        return cache.delete(cls.credentials_key(username))
+
     def find_or_create_user(self):
         """ check if user exists in our DB, if not create them
             returns what should be assigned to self.id
@@ -126,8 +211,8 @@ class User(object):
                       "(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) " \
                       "on conflict (username) " \
                       "do update set (email, contactid, last_login) = (%s, %s, %s) " \
-                      "where auth_user.username = %s" \
-                      "returning id"
+                      "where auth_user.username = %s " \
+                      "returning id, is_staff, is_active, is_superuser"
         arg_tup = (username, email, first_name, last_name,
                    'pass', 'f', 't', 'f', nownow, nownow, contactid,
                    email, contactid, nownow, username)
@@ -137,6 +222,7 @@ class User(object):
                 db.execute(insert_stmt, arg_tup)
                 db.commit()
                 user_id = db.fetcharr[0]['id']
+                self._set_roles(db.fetcharr[0])
             except:
                 exc_type, exc_val, exc_trace = sys.exc_info()
                 logger.critical("ERR user find_or_create args {0} {1} " \
@@ -163,19 +249,24 @@ class User(object):
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, values)
-                logger.info('user.py where sql: {}'.format(log_sql))
+                log_sql = db.mogrify_later(sql, values)
+                logger.info('user.py where sql: %s', log_sql)
                 db.select(sql, values)
                 for i in db:
-                    obj = User(i["username"], i["email"], i["first_name"],
-                               i["last_name"], i["contactid"])
-                    ret.append(obj)
+                    ret.append(cls.from_row(i))
         except DBConnectException as e:
                 logger.critical('Error querying for users: {}\n'
                                 'sql: {}'.format(e.message, log_sql))
                 raise UserException(e)
         return ret
 
+    @classmethod
+    def from_row(cls, row):
+        """ Build a User from an auth_user row selected with base_sql """
+        return cls(row["username"], row["email"], row["first_name"],
+                   row["last_name"], row["contactid"], user_id=row["id"],
+                   roles=row)
+
     @classmethod
     def by_contactid(cls, contactid):
         try:
@@ -213,9 +304,7 @@ class User(object):
 
         if db:
             for i in db:
-                obj = User(i["username"], i["email"], i["first_name"],
-                               i["last_name"], i["contactid"])
-                resp.append(obj)
+                resp.append(cls.from_row(i))
 
         if _single:
             return resp[0]
@@ -223,7 +312,11 @@ class User(object):
             return resp
 
     def update(self, att, val):
-        self.__setattr__(att, val)
+        if att in self.role_columns:
+            # re-read on next use
+            self._roles = None
+        else:
+            self.__setattr__(att, val)
         if isinstance(val, str) or isinstance(val, datetime.datetime):
             val = "\'{0}\'".format(val)
         sql = "update auth_user set {0} = {1} where id = {2};".format(att, val, self.id)
@@ -232,18 +325,24 @@ class User(object):
             db.commit()
         return True
 
+    def _set_roles(self, row):
+        self._roles = {k: row[k] for k in self.role_columns}
+        self._roles_loaded = time.time()
+
     def roles(self):
-        result = None
+        if self._roles is not None and time.time() - self._roles_loaded < self.roles_timeout:
+            return self._roles
+
         with db_instance() as db:
             db.select("select is_staff, is_active, is_superuser from auth_user where id = %s;" % self.id)
         try:
-            result = db[0]
+            self._set_roles(db[0])
         except:
             exc_type, exc_val, exc_trace = sys.exc_info()
             logger.critical("ERR retrieving roles for user. msg{0} trace{1}".format(exc_val, traceback.format_exc()))
             raise exc_type, exc_val, exc_trace
 
-        return result
+        return self._roles
 
     def is_staff(self):
         return self.roles()['is_staff']
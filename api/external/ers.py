@@ -6,6 +6,7 @@ from api.system.logger import ilogger as logger
 
 import requests
 from api.providers.configuration.configuration_provider import ConfigurationProvider
+from api.providers.metrics.registry import registry
 
 cfg = ConfigurationProvider()
 
@@ -25,16 +26,31 @@ class ERSApiAuthFailedException(Exception):
 class ERSApi(object):
 
     def __init__(self):
-        self._host = cfg.url_for('ersapi')
-        self._secret = cfg.get("ers.%s.secret" % cfg.mode)
+        # looked up on first use, so importing this module does not need
+        # the database
+        self.__host = None
+        self.__secret = None
+
+    @property
+    def _host(self):
+        if self.__host is None:
+            self.__host = cfg.url_for('ersapi')
+        return self.__host
+
+    @property
+    def _secret(self):
+        if self.__secret is None:
+            self.__secret = cfg.get("ers.%s.secret" % cfg.mode)
+        return self.__secret
 
     def _api(self, verb, url, data=None, header=None):
         # certificate verification fails in dev/tst
         verify = True if cfg.mode == 'ops' else False
         try:
             logger.debug('[%s] %s', verb.upper(), self._host+url)
-            resp = getattr(requests, verb)(self._host + url, data=data,
-                                           headers=header, verify=verify)
+            with registry.timed('espa_external_request', service='ers', endpoint=url):
+                resp = getattr(requests, verb)(self._host + url, data=data,
+                                               headers=header, verify=verify)
             resp.raise_for_status()
         except Exception as e:
             raise ERSApiConnectionException(e)
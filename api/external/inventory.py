@@ -6,20 +6,40 @@ import urllib
 import traceback
 import datetime
 import socket
+import time
 import re
-from itertools import groupby
 
 import requests
 import memcache
 
+from api import ProductNotImplemented
 from api.domain import sensor
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.providers.caching.caching_provider import CachingProvider
+from api.providers.metrics.registry import registry
 from api.system.logger import ilogger as logger
 
 
 config = ConfigurationProvider()
 
+_request_timeout = {'seconds': None, 'until': 0}
+
+
+def request_timeout():
+    """
+    Seconds to wait on any one M2M request: a tenth of a handle_orders
+    stage's timeout (system.handle_orders_stage_timeout), so a hung request
+    fails well within the stage making it. Re-read every five minutes
+
+    :return: int
+    """
+    now = time.time()
+    if now >= _request_timeout['until']:
+        stage = int(config.get('system.handle_orders_stage_timeout') or 1800)
+        _request_timeout.update(seconds=max(10, stage // 10), until=now + 300)
+    return _request_timeout['seconds']
+
+
 # -----------------------------------------------------------------------------+
 # Find Documentation here:                                                     |
 #      https://earthexplorer.usgs.gov/inventory/documentation/json-api         |
@@ -31,15 +51,25 @@ def split_by_dataset(product_ids):
     :type product_ids: list
     :return: dict
     """
-    return {k: list(g) for k, g in groupby(sorted(product_ids),
-                lambda x: sensor.instance(x).lta_json_name)}
+    classified = sensor.classify(product_ids)
+    if 'not_implemented' in classified:
+        msg = u"{} are not supported sensor products".format(classified['not_implemented'])
+        raise ProductNotImplemented(msg)
+
+    datasets = dict()
+    for group in classified.values():
+        for dataset, ids in group['datasets'].items():
+            datasets.setdefault(dataset, []).extend(ids)
+    return {k: sorted(v) for k, v in datasets.items()}
 
 class LTAError(Exception):
     pass
 
 class LTAService(object):
-    def __init__(self, token=None, current_user=None, ipaddr=None):
+    def __init__(self, token=None, current_user=None, ipaddr=None, timeout=None):
         mode = config.mode
+        # seconds to wait on each request
+        self.timeout = timeout or request_timeout()
         self.api_version = config.get('bulk.{0}.json.version'.format(mode))
         self.agent = config.get('bulk.{0}.json.username'.format(mode))
         self.agent_wurd = config.get('bulk.{0}.json.password'.format(mode))
@@ -121,7 +151,8 @@ class LTAService(object):
         if 'password' not in str(data):
             logger.debug('Payload: {}'.format(data))
         # Note: using `data=` (to force form-encoded params)
-        response = getattr(requests, verb)(url, data=data)
+        with registry.timed('espa_external_request', service='m2m', endpoint=endpoint):
+            response = getattr(requests, verb)(url, data=data, timeout=self.timeout)
         logger.debug('[RESPONSE] %s\n%s', response, response.content)
         return self._parse(response)
 
@@ -473,24 +504,13 @@ class LTACachedService(LTAService):
         # TODO: need to profile how much data we are caching
         one_hour = 3600  # seconds
         self.MC_KEY_FMT = '({resource})'
-        self.cache = CachingProvider(timeout=one_hour)
-
-    def get_login(self):
-        cache_key = self.MC_KEY_FMT.format(resource='login')
-        token = self.cache.get(cache_key)
-        return token
-
-    def set_login(self, token):
-        cache_key = self.MC_KEY_FMT.format(resource='login')
-        success = self.cache.set(cache_key, token)
-        if not success:
-            logger.error('LTACachedService: Token not cached')
+        self.cache = CachingProvider(timeout=one_hour, local_timeout=60)
 
     def cached_login(self):
-        token = self.get_login()
-        if token is None:
-            token = self.login()
-            self.set_login(token)
+        cache_key = self.MC_KEY_FMT.format(resource='login')
+        # a single worker logs in again shortly before the hour is up,
+        # the rest keep using the current token meanwhile
+        token = self.cache.get_or_compute(cache_key, self.login, stale=600)
         return token
 
 
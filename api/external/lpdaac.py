@@ -4,33 +4,76 @@ Author: David V. Hill
 '''
 
 import requests
+import hashlib
 import os
 
 from api.domain import sensor
 from api import util as utils
+from api.util.parallel import parallel_map
 
 from api.providers.configuration.configuration_provider import ConfigurationProvider
+from api.providers.caching.caching_provider import CachingProvider
 from api.system.logger import ilogger as logger
 
 config = ConfigurationProvider()
+cache = CachingProvider(local_timeout=300)
+
+# concurrent HEAD requests, and pooled connections, per verify_products
+HEAD_WORKERS = 16
+
+# input paths and extensions, read once per verify_products
+SETTINGS = ('path.aqua_base_source', 'path.terra_base_source', 'path.viirs_base_source',
+            'file.extension.modis.input.filename', 'file.extension.viirs.input.filename')
+
+_session = {'pid': None, 'session': None}
+
+
+def session():
+    """
+    A requests Session for this process, pooling connections to the datapool
+    """
+    if _session['pid'] != os.getpid():
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=HEAD_WORKERS)
+        s = requests.Session()
+        s.mount('http://', adapter)
+        s.mount('https://', adapter)
+        _session.update(pid=os.getpid(), session=s)
+    return _session['session']
+
 
 class LPDAACService(object):
+    # seconds to remember that a granule was, or was not, found
+    found_timeout = 3600
+    missing_timeout = 300
 
     def __init__(self):
         self.datapool = {'modis': config.url_for('modis.datapool'),
                          'viirs': config.url_for('viirs.datapool')}
+        self._settings = dict()
 
-    def verify_products(self, products):
-        response = {}
+    def _load_settings(self):
+        # before the HEAD workers start, so they only ever read them
+        self._settings = dict(zip(SETTINGS, config.get(SETTINGS)))
 
+    def _setting(self, key):
+        if key in self._settings:
+            return self._settings[key]
+        return config.get(key)
+
+    def verify_products(self, products):
         if isinstance(products, str):
             products = [products]
 
-        for product in products:
-            if isinstance(product, basestring):
-                product = sensor.instance(product)
+        products = [sensor.instance(p) if isinstance(p, basestring) else p
+                    for p in products]
 
-            response[product.product_id] = self.input_exists(product)
+        self._load_settings()
+        response = {}
+        for product, exists, error in parallel_map(self.input_exists, products,
+                                                   workers=HEAD_WORKERS):
+            if error:
+                raise error
+            response[product.product_id] = exists
 
         return response
 
@@ -61,8 +104,7 @@ class LPDAACService(object):
             if 'download_url' in url[product.product_id]:
                 url = url[product.product_id]['download_url']
                 try:
-                    wait = 3  # seconds
-                    result = utils.connections.is_reachable(url, timeout=wait)
+                    result = self.url_exists(url)
                 except Exception, e:
                     logger.exception('Exception checking modis input {0}\n '
                                      'Exception:{1}'
@@ -74,6 +116,29 @@ class LPDAACService(object):
 
         return result
 
+    def url_exists(self, url):
+        """
+        HEAD the URL over the pooled session, the answer cached by URL
+
+        Only a 200 or a 404 is remembered, timeouts and server errors are
+        asked again next time
+
+        :param url: granule download URL
+        :return: bool
+        """
+        cache_key = 'lpdaac-head-{}'.format(hashlib.md5(url).hexdigest())
+        result = cache.get(cache_key)
+        if result is not None:
+            return result
+
+        wait = 3  # seconds
+        status = utils.connections.head_status(url, timeout=wait, session=session())
+        if status == 200:
+            cache.set(cache_key, True, self.found_timeout)
+        elif status == 404:
+            cache.set(cache_key, False, self.missing_timeout)
+        return status == 200
+
     def get_download_url(self, product):
         url = {}
 
@@ -132,9 +197,9 @@ class LPDAACService(object):
             product = sensor.instance(product)
 
         if isinstance(product, sensor.Aqua):
-            base_path = config.get('path.aqua_base_source')
+            base_path = self._setting('path.aqua_base_source')
         elif isinstance(product, sensor.Terra):
-            base_path = config.get('path.terra_base_source')
+            base_path = self._setting('path.terra_base_source')
         else:
             msg = "Cant build input file path for unknown LPDAAC product:%s"
             raise Exception(msg % product.product_id)
@@ -145,7 +210,7 @@ class LPDAACService(object):
                                   str(date.month).zfill(2),
                                   str(date.day).zfill(2))
 
-        input_extension = config.get('file.extension.modis.input.filename')
+        input_extension = self._setting('file.extension.modis.input.filename')
 
         parts = product.product_id.split('.')
         prod_id = '.'.join([parts[0].upper(),
@@ -169,7 +234,7 @@ class LPDAACService(object):
             product = sensor.instance(product)
 
         if isinstance(product, sensor.Viirs09GA):
-            base_path = config.get('path.viirs_base_source')
+            base_path = self._setting('path.viirs_base_source')
 
         else:
             msg = "Cant build input file path for unknown LPDAAC product:%s"
@@ -181,7 +246,7 @@ class LPDAACService(object):
                                   str(date.month).zfill(2),
                                   str(date.day).zfill(2))
 
-        input_extension = config.get('file.extension.viirs.input.filename')
+        input_extension = self._setting('file.extension.viirs.input.filename')
 
         parts = product.product_id.split('.')
         prod_id = '.'.join([parts[0].upper(),
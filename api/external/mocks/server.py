@@ -0,0 +1,306 @@
+"""
+Purpose: a local stand-in for the USGS services the API talks to, so the real
+HTTP clients can be exercised (and load tested) without leaving the host
+
+    M2M JSON API: POST <any path>/<endpoint>, the request in the jsonRequest
+                  form field, for login, logout, idLookup, downloadoptions,
+                  download, orderstatus, setunitstatus, getorderqueue,
+                  userContext, userLookup and clearUserContext
+    ERS:          POST /auth, GET /me
+    Mesos:        GET /slaves, for the production whitelist
+    LP DAAC:      HEAD <any other path>, the granule found unless missing
+
+Responses are generated, deterministically, from the ids in each request.
+Latency, error rate and data set sizes are configurable:
+
+    python -m api.external.mocks.server --port 8901 --latency .2 --error-rate .01
+"""
+import sys
+import zlib
+import json
+import time
+import random
+import urlparse
+import argparse
+import datetime
+import threading
+import BaseHTTPServer
+import SocketServer
+
+M2M_ENDPOINTS = ('login', 'logout', 'idLookup', 'downloadoptions', 'download',
+                 'orderstatus', 'setunitstatus', 'getorderqueue', 'userContext',
+                 'userLookup', 'clearUserContext')
+
+
+class StubOptions(object):
+    """
+    :param latency: mean seconds added to every response
+    :param jitter: latency varies uniformly by up to this many seconds either way
+    :param error_rate: fraction of requests answered with a 500
+    :param missing_rate: fraction of products reported missing/unavailable
+    :param rejected_rate: fraction of tram units reported rejected, the rest
+                          are split evenly between complete and in process
+    :param orders: number of orders in the EE order queue
+    :param units: number of units in each queued order
+    :param seed: makes generated data repeatable
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, missing_rate=0.0,
+                 rejected_rate=0.05, orders=10, units=10, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.missing_rate = missing_rate
+        self.rejected_rate = rejected_rate
+        self.orders = orders
+        self.units = units
+        self.seed = seed
+
+
+def _crc(value):
+    return zlib.crc32(str(value)) & 0xffffffff
+
+
+def _fraction(*parts):
+    """ a stable pseudo-random number in [0, 1) for the given ids """
+    return random.Random(':'.join(str(p) for p in parts)).random()
+
+
+def landsat_id(seed, n):
+    day = datetime.date(2017, 1, 1) + datetime.timedelta(days=n % 365)
+    return 'LC08_L1TP_{:03d}{:03d}_{}_20170925_01_T1'.format(
+        1 + (seed + n) % 233, 1 + n % 248, day.strftime('%Y%m%d'))
+
+
+class StubData(object):
+    """
+    Builds each service's response body
+    """
+    def __init__(self, options):
+        self.options = options
+
+    def missing(self, name):
+        return _fraction(self.options.seed, 'missing', name) < self.options.missing_rate
+
+    def entity_id(self, name):
+        return 'E{}'.format(_crc(name))
+
+    def order_units(self, order_number):
+        """ [(orderingId, unit number)] for an EE order """
+        base = int(order_number) if str(order_number).isdigit() else _crc(order_number)
+        return [(landsat_id(self.options.seed, base * self.options.units + i), i + 1)
+                for i in range(self.options.units)]
+
+    def unit_status(self, order_number, unit):
+        f = _fraction(self.options.seed, 'status', order_number, unit)
+        if f < self.options.rejected_rate:
+            return 'R'
+        return 'C' if f < (1 + self.options.rejected_rate) / 2 else 'I'
+
+    # M2M =====================================================================
+    def login(self, request):
+        return 'stub-api-key'
+
+    def logout(self, request):
+        return True
+
+    def idLookup(self, request):
+        return {i: None if self.missing(i) else self.entity_id(i)
+                for i in request.get('idList', [])}
+
+    def downloadoptions(self, request):
+        return [{'entityId': e,
+                 'downloadOptions': [{'downloadCode': 'STANDARD',
+                                      'available': not self.missing(e)}]}
+                for e in request.get('entityIds', [])]
+
+    def download(self, request):
+        return [{'entityId': e, 'url': 'http://localhost/datapool/{}.tar.gz'.format(e)}
+                for e in request.get('entityIds', [])]
+
+    def orderstatus(self, request):
+        number = request.get('orderNumber')
+        return {'orderNumber': number, 'statusCode': 'I', 'statusText': 'In Process',
+                'units': [{'orderingId': name, 'unitNumber': unit,
+                           'statusCode': self.unit_status(number, unit)}
+                          for name, unit in self.order_units(number)]}
+
+    def setunitstatus(self, request):
+        return True
+
+    def getorderqueue(self, request):
+        orders = []
+        for n in range(self.options.orders):
+            number = str(1000000000000 + self.options.seed * 10000 + n)
+            orders.append({'contactId': 900000 + n % 50, 'orderNumber': number,
+                           'statusCode': 'Q', 'statusText': 'Queued for Processing',
+                           'units': [{'orderingId': name, 'unitNumber': unit,
+                                      'productCode': 'SR08', 'statusCode': 'Q',
+                                      'datasetName': None, 'displayId': None,
+                                      'entityId': None}
+                                     for name, unit in self.order_units(number)]})
+        return {'orders': orders}
+
+    def userContext(self, request):
+        return {'contactId': request.get('contactId'), 'username': 'stub_{}'.format(request.get('contactId'))}
+
+    def userLookup(self, request):
+        return 'stub_{}@example.com'.format(request.get('contactId'))
+
+    def clearUserContext(self, request):
+        return True
+
+    # Mesos ===================================================================
+    def mesos_slaves(self):
+        # addresses shaped like those production_whitelist() parses
+        return {'slaves': [{'pid': 'slave(1)@10.12.34.{}:5051'.format(10 + n)}
+                           for n in range(3)]}
+
+    # ERS =====================================================================
+    def ers_auth(self, form):
+        return {'errors': None, 'data': {'authToken': 'stub-{}'.format(form.get('username'))}}
+
+    def ers_me(self, token):
+        username = token.replace('stub-', '', 1)
+        return {'errors': None,
+                'data': {'username': username, 'firstName': 'Stub', 'lastName': 'User',
+                         'email': '{}@example.com'.format(username),
+                         'contact_id': 900000 + _crc(username) % 50}}
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def options(self):
+        return self.server.options
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, fmt, *args)
+
+    def _delay(self):
+        seconds = self.options.latency + random.uniform(-self.options.jitter, self.options.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _failed(self):
+        return random.random() < self.options.error_rate
+
+    def _send(self, code, body=None):
+        payload = json.dumps(body) if body is not None else ''
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+        self.server.count(self.command, self.path.rsplit('/', 1)[-1], code)
+
+    def _form(self):
+        length = int(self.headers.getheader('Content-Length') or 0)
+        return dict(urlparse.parse_qsl(self.rfile.read(length)))
+
+    def do_HEAD(self):
+        self._delay()
+        path = urlparse.urlparse(self.path).path
+        if path.rsplit('/', 1)[-1] in M2M_ENDPOINTS:
+            # inventory.available()
+            return self._send(200)
+        if self._failed():
+            return self._send(503)
+        self._send(404 if self.server.data.missing(path) else 200)
+
+    def do_POST(self):
+        self._delay()
+        path = urlparse.urlparse(self.path).path
+        form = self._form()
+        if self._failed():
+            return self._send(500, {'data': None, 'errorCode': 'STUB_ERROR', 'error': 'stub failure'})
+
+        if path == '/auth':
+            return self._send(200, self.server.data.ers_auth(form))
+
+        endpoint = path.rsplit('/', 1)[-1]
+        if endpoint not in M2M_ENDPOINTS:
+            return self._send(404, {'data': None, 'errorCode': 'UNKNOWN', 'error': path})
+        try:
+            request = json.loads(form.get('jsonRequest') or '{}')
+        except ValueError:
+            return self._send(400, {'data': None, 'errorCode': 'BAD_JSON', 'error': 'bad jsonRequest'})
+        data = getattr(self.server.data, endpoint)(request)
+        self._send(200, {'data': data, 'errorCode': None, 'error': '', 'api_version': 'stub'})
+
+    def do_GET(self):
+        self._delay()
+        path = urlparse.urlparse(self.path).path
+        if self._failed():
+            return self._send(500, {'errors': 'stub failure', 'data': None})
+        if path == '/me':
+            return self._send(200, self.server.data.ers_me(self.headers.getheader('X-AuthToken') or ''))
+        if path == '/slaves':
+            return self._send(200, self.server.data.mesos_slaves())
+        self._send(404, {'errors': 'unknown path {}'.format(path), 'data': None})
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, options=None, verbose=False):
+        BaseHTTPServer.HTTPServer.__init__(self, address, StubHandler)
+        self.options = options or StubOptions()
+        self.data = StubData(self.options)
+        self.verbose = verbose
+        self.requests = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address)
+
+    def count(self, verb, endpoint, code):
+        key = '{} {} {}'.format(verb, endpoint, code)
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+
+def start(port=0, options=None, verbose=False):
+    """
+    Serve from a background thread
+
+    :param port: 0 picks a free one, see server.url
+    :return: StubServer, stop it with shutdown()
+    """
+    server = StubServer(('127.0.0.1', port), options, verbose)
+    thread = threading.Thread(target=server.serve_forever, name='stub-server')
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Stub M2M, ERS, LP DAAC and Mesos services')
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--missing-rate', type=float, default=0.0)
+    parser.add_argument('--rejected-rate', type=float, default=0.05)
+    parser.add_argument('--orders', type=int, default=10)
+    parser.add_argument('--units', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    options = StubOptions(args.latency, args.jitter, args.error_rate, args.missing_rate,
+                          args.rejected_rate, args.orders, args.units, args.seed)
+    server = StubServer(('127.0.0.1', args.port), options, args.verbose)
+    print('Serving stub M2M/ERS/LP DAAC/Mesos on {}'.format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
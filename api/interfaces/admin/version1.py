@@ -14,6 +14,7 @@ class API(object):
 
         self.admin = self.providers.administration
         self.reporting = self.providers.reporting
+        self.metrics = self.providers.metrics
 
     @staticmethod
     def api_versions():
@@ -139,6 +140,18 @@ class API(object):
                 "ERR retrieving system config: exception {0}".format(traceback.format_exc()))
             raise exc_type, exc_val, exc_trace
 
+    def flush_local_caches(self):
+        """
+        empty the in-process caches of every worker
+        :return: dict
+        """
+        try:
+            response = {'namespace': self.admin.flush_local_caches()}
+        except:
+            logger.critical("ERR version1 flush_local_caches traceback {0}".format(traceback.format_exc()))
+            response = default_error_message
+        return response
+
     def available_stats(self):
         """
         returns list of available statistics
@@ -164,6 +177,19 @@ class API(object):
             response = default_error_message
         return response
 
+    def get_metrics(self):
+        """
+        Request, order, external service and cache metrics, summed across
+        all workers
+        :return: str in the Prometheus text format
+        """
+        try:
+            response = self.metrics.export()
+        except:
+            logger.critical("ERR version1 get_metrics traceback {0}".format(traceback.format_exc()))
+            response = default_error_message
+        return response
+
     def get_multistat(self, name):
         """
         retrieve requested statistic value
@@ -126,6 +126,25 @@ class API(object):
 
         return response
 
+    def order_status_fingerprint(self, ordernum):
+        """ Returns a summary of an order's state, used for conditional GETs
+
+        Args:
+            ordernum (str): the order id of a submitted order
+
+        Returns:
+            dict: status, completion_date, scene_count and last_modified,
+                  or None if the order is not found or the lookup fails
+        """
+        try:
+            response = self.ordering.order_status_fingerprint(ordernum)
+        except:
+            logger.critical("ERR version1 order_status_fingerprint arg: {0}\n"
+                            "exception {1}".format(ordernum, traceback.format_exc()))
+            response = None
+
+        return response
+
     def place_order(self, order, user):
         """Enters a new order into the system.
 
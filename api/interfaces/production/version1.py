@@ -87,10 +87,12 @@ class API(object):
         """Handler for accepting orders and products into the processing system
 
         Args:
-            params (dict): args for the action. valid keys: username
+            params (dict): args for the action. valid keys: username,
+                report (per-stage timings), profile (cProfile the run),
+                shards (number of processes to split orders between)
 
         Returns:
-            True if successful
+            True if successful, or the stage summary if report/profile set
         """
         try:
             response = self.production.handle_orders(**params)
@@ -1,34 +1,70 @@
 """ Module to glue interfaces to implementations """
+import importlib
+import threading
 
-from api.providers.inventory.inventory_provider import MockInventoryProvider, InventoryProvider
-from api.providers.metrics import MockMetricsProvider, MetricsProvider
+from api.system.logger import ilogger as logger
+from api.util.querystats import query_stats
+
+from api.providers.inventory.inventory_provider import MockInventoryProvider
+from api.providers.metrics import MockMetricsProvider
 from api.providers.ordering import MockOrderingProvider
-from api.providers.ordering.ordering_provider import OrderingProvider
-from api.providers.production.production_provider import ProductionProvider
-from api.providers.reporting.reporting_provider import ReportingProvider
 from api.providers.validation import MockValidationProvider
-from api.providers.validation.validictory import ValidationProvider
-from api.providers.configuration.configuration_provider import ConfigurationProvider
-from api.providers.administration.administration_provider import AdministrationProvider
+
+
+class LazyProvider(object):
+    """
+    Stand-in for a provider, which imports and builds the provider on first
+    use, so that importing the interfaces does not pull in every provider
+    module (and their configuration, database, and cache setup) up front
+    """
+    def __init__(self, path):
+        self._path = path
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    module, _, name = self._path.rpartition('.')
+                    self._instance = getattr(importlib.import_module(module), name)()
+        return self._instance
+
+    def __getattr__(self, item):
+        attr = getattr(self._resolve(), item)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            with query_stats.scope('{}.{}'.format(type(self._instance).__name__, item)) as counter:
+                try:
+                    return attr(*args, **kwargs)
+                finally:
+                    if counter.queries:
+                        logger.debug('db_stats %s', counter)
+        return counted
+
+    def __repr__(self):
+        return '<LazyProvider {}>'.format(self._path)
 
 
 class DefaultProviders(object):
 
-    ordering = OrderingProvider()
+    ordering = LazyProvider('api.providers.ordering.ordering_provider.OrderingProvider')
 
-    validation = ValidationProvider()
+    validation = LazyProvider('api.providers.validation.validictory.ValidationProvider')
 
-    metrics = MetricsProvider()
+    metrics = LazyProvider('api.providers.metrics.MetricsProvider')
 
-    inventory = InventoryProvider()
+    inventory = LazyProvider('api.providers.inventory.inventory_provider.InventoryProvider')
 
-    production = ProductionProvider()
+    production = LazyProvider('api.providers.production.production_provider.ProductionProvider')
 
-    configuration = ConfigurationProvider()
+    configuration = LazyProvider('api.providers.configuration.configuration_provider.ConfigurationProvider')
 
-    reporting = ReportingProvider()
+    reporting = LazyProvider('api.providers.reporting.reporting_provider.ReportingProvider')
 
-    administration = AdministrationProvider()
+    administration = LazyProvider('api.providers.administration.administration_provider.AdministrationProvider')
 
 
 class MockProviders(object):
@@ -18,6 +18,7 @@ from validate_email import validate_email
 from api.domain.order import Order
 from api.domain.scene import Scene
 from api.providers.configuration.configuration_provider import ConfigurationProvider
+from api.providers.metrics.registry import registry
 
 from api.system.logger import ilogger as logger
 
@@ -61,9 +62,10 @@ class Emails(object):
         msg['Subject'] = subject
         msg['To'] = to_header
         msg['From'] = config.get('email.espa_address')
-        s = SMTP(host=config.get('email.espa_server'), timeout=float(config.get('email.smtp_timeout')))
-        s.sendmail(msg['From'], recipient, msg.as_string())
-        s.quit()
+        with registry.timed('espa_external_request', service='smtp'):
+            s = SMTP(host=config.get('email.espa_server'), timeout=float(config.get('email.smtp_timeout')))
+            s.sendmail(msg['From'], recipient, msg.as_string())
+            s.quit()
 
         return True
 
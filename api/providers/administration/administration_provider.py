@@ -3,18 +3,18 @@ from api.util.sshcmd import RemoteHost
 from api.providers.administration import AdminProviderInterfaceV0
 from api.providers.administration import AdministrationProviderException
 from api.providers.configuration.configuration_provider import ConfigurationProvider
+from api.providers.caching.caching_provider import CachingProvider
 from api.external.onlinecache import OnlineCache
 from api.system.logger import ilogger as logger
 from api.util.dbconnect import db_instance
 from api.util.dbconnect import DBConnectException
 from api.domain.order import Order
 from api.domain.scene import SceneException, Scene
-from api.util import api_cfg
+from api.util.ipfilter import config_lists
 
 
 class AdministrationProvider(AdminProviderInterfaceV0):
     config = ConfigurationProvider()
-    db = db_instance()
 
     def orders(self, query=None, cancel=False):
         pass
@@ -120,10 +120,19 @@ class AdministrationProvider(AdminProviderInterfaceV0):
     def get_system_config():
         return ConfigurationProvider()._retrieve_config()
 
+    @staticmethod
+    def flush_local_caches():
+        """
+        Empty the in-process cache of every worker, within a few seconds
+
+        :return: the new cache namespace version
+        """
+        return CachingProvider().bump_namespace()
+
     @staticmethod
     def admin_whitelist():
-        return api_cfg()['admin_whitelist']
+        return config_lists.get('admin_whitelist')
 
     @staticmethod
     def stat_whitelist():
-        return api_cfg()['stat_whitelist']
+        return config_lists.get('stat_whitelist')
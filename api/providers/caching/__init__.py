@@ -24,3 +24,12 @@ class CachingProviderInterfaceV0(object):
         :param expirey: time in seconds an object will live in the cache
         :return: True if successful, else False
         """
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """
+        Remove an item from the cache
+
+        :param key: identifying key to the stored object
+        :return: True if successful, else False
+        """
@@ -1,6 +1,13 @@
 import os
+import time
+import random
+import threading
+import cPickle as pickle
+from collections import OrderedDict
 
 from api.providers.caching import CachingProviderInterfaceV0
+from api.system.logger import ilogger as logger
+from api.providers.metrics.registry import registry
 
 import memcache
 
@@ -9,34 +16,282 @@ class CachingProviderException(Exception):
     pass
 
 
+class LocalCache(object):
+    """
+    In-process LRU which sits in front of memcache
+
+    Values are held pickled, so callers never share mutable objects, and
+    so the memory held can be bounded by both entry count and bytes
+    """
+    def __init__(self, max_entries=2048, max_bytes=8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_bytes // 16
+        self.namespace = None
+        self.namespace_checked = 0
+        self.nbytes = 0
+        self.counters = {'local_hits': 0, 'local_misses': 0,
+                         'remote_hits': 0, 'remote_misses': 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :return: (found, value)
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False, None
+            expires, blob = entry
+            if expires < time.time():
+                self.nbytes -= len(blob)
+                return False, None
+            self._entries[key] = entry
+        return True, pickle.loads(blob)
+
+    def set(self, key, value, timeout):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._discard(key)
+            if len(blob) > self.max_item_bytes:
+                return
+            self._entries[key] = (time.time() + timeout, blob)
+            self.nbytes += len(blob)
+            while (len(self._entries) > self.max_entries
+                   or self.nbytes > self.max_bytes):
+                _, (_, old) = self._entries.popitem(last=False)
+                self.nbytes -= len(old)
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= len(entry[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every CachingProvider in the process, so short-lived providers
+# still benefit from it
+local = LocalCache(max_entries=int(os.getenv('ESPA_LOCAL_CACHE_ENTRIES', 2048)),
+                   max_bytes=int(os.getenv('ESPA_LOCAL_CACHE_BYTES', 8 * 1024 * 1024)))
+
+
+@registry.register_collector
+def cache_lookups():
+    results = {'hits': 'hit', 'misses': 'miss'}
+    return [('espa_cache_lookups_total',
+             {'tier': name.split('_')[0], 'result': results[name.split('_')[1]]}, value)
+            for name, value in local.counters.items()]
+
+
 class CachingProvider(CachingProviderInterfaceV0):
+    # bumping the value stored here empties the local cache of every worker
+    namespace_key = 'espa-cache-namespace'
+    # seconds between checks of the namespace, per worker
+    namespace_interval = 5
 
-    def __init__(self, memcache_hosts=None, timeout=600, debug=0):
+    def __init__(self, memcache_hosts=None, timeout=600, debug=0, local_timeout=0):
         if not memcache_hosts:
             memcache_hosts = os.getenv('ESPA_MEMCACHE_HOST', '127.0.0.1:11211').split(',')
         self.cache = memcache.Client(memcache_hosts, debug=debug)
         self.timeout = timeout # seconds
+        # seconds values are also kept in-process, 0 to disable
+        # always less than what they are kept in memcache for
+        self.local_timeout = min(local_timeout, timeout)
 
     def get(self, cache_key):
-        return self.cache.get(cache_key)
+        if not self.local_timeout:
+            return self.cache.get(cache_key)
+
+        self._check_namespace()
+        found, value = local.get(cache_key)
+        if found:
+            local.count('local_hits')
+            return value
+        local.count('local_misses')
+
+        value = self.cache.get(cache_key)
+        if value is None:
+            local.count('remote_misses')
+        else:
+            local.count('remote_hits')
+            local.set(cache_key, value, self.local_timeout)
+        return value
 
     def set(self, cache_key, value, expirey=None):
         timeout = expirey or self.timeout
+        if self.local_timeout:
+            local.set(cache_key, value, min(self.local_timeout, timeout))
         success = self.cache.set(cache_key, value, timeout)
         if not success:
             return False
         return True
 
+    def add(self, cache_key, value, expirey=None):
+        """
+        Store the value only if nothing is cached under the key, atomically
+
+        :return: bool, whether it was stored
+        """
+        timeout = expirey or self.timeout
+        return bool(self.cache.add(cache_key, value, timeout))
+
+    def delete(self, cache_key):
+        local.delete(cache_key)
+        return bool(self.cache.delete(cache_key))
+
     def get_multi(self, cache_keys):
         if not isinstance(cache_keys, list):
             raise TypeError('Cached get multiple keys must list keys')
-        return self.cache.get_multi(cache_keys)
+        if not self.local_timeout:
+            return self.cache.get_multi(cache_keys)
+
+        self._check_namespace()
+        values = dict()
+        for cache_key in cache_keys:
+            found, value = local.get(cache_key)
+            if found:
+                local.count('local_hits')
+                values[cache_key] = value
+            else:
+                local.count('local_misses')
+
+        missing = [k for k in cache_keys if k not in values]
+        if missing:
+            remote = self.cache.get_multi(missing)
+            for cache_key, value in remote.items():
+                local.count('remote_hits')
+                local.set(cache_key, value, self.local_timeout)
+            for _ in range(len(missing) - len(remote)):
+                local.count('remote_misses')
+            values.update(remote)
+        return values
 
     def set_multi(self, cache_dict, expirey=None):
         timeout = expirey or self.timeout
         if not isinstance(cache_dict, dict):
             raise TypeError('Cache set multiple must be dict (key/value) pairs')
+        if self.local_timeout:
+            for cache_key, value in cache_dict.items():
+                local.set(cache_key, value, min(self.local_timeout, timeout))
         failures = self.cache.set_multi(cache_dict, timeout)
         if failures:
             return False
         return True
+
+    def get_or_compute(self, cache_key, compute, expirey=None, stale=None,
+                       lock_timeout=60, wait=5):
+        """
+        Return the cached value for cache_key, calling compute() to (re)build
+        it when missing or due for refresh
+
+        Only the worker holding the memcache lock for the key recomputes,
+        the others keep serving the previous value for up to stale seconds
+        past its refresh time.  Each caller starts refreshing at a random
+        point in the last tenth of the value's life, so workers do not all
+        find it expired at once.  Values stored this way are wrapped, so the
+        key should only be read back through this method.
+
+        :param cache_key: identifying key to the stored object
+        :param compute: callable, with no arguments, building the value
+        :param expirey: seconds before the value is refreshed
+        :param stale: seconds the previous value is served past expirey
+        :param lock_timeout: seconds before an abandoned lock is released
+        :param wait: seconds to wait for another worker when nothing is cached
+        :return: object
+        """
+        expirey = expirey or self.timeout
+        if stale is None:
+            stale = expirey // 10
+
+        entry = self.get(cache_key)
+        now = time.time()
+        if entry is not None:
+            early = (entry['refresh_at'] - entry['stored_at']) / 10.0
+            if now < entry['refresh_at'] - random.uniform(0, early):
+                return entry['value']
+
+        lock_key = '{}.lock'.format(cache_key)
+        locked = self.cache.add(lock_key, 1, lock_timeout)
+        if not locked:
+            if entry is not None:
+                # the local copy should not hide the refreshed value
+                local.delete(cache_key)
+                return entry['value']
+            deadline = now + wait
+            while time.time() < deadline:
+                time.sleep(0.1)
+                entry = self.cache.get(cache_key)
+                if entry is not None:
+                    return entry['value']
+            # give up waiting, and build it ourselves
+
+        try:
+            value = compute()
+        except Exception:
+            if entry is None:
+                raise
+            logger.exception('Could not refresh {}, serving previous value'
+                             .format(cache_key))
+            return entry['value']
+        else:
+            now = time.time()
+            local.delete(cache_key)
+            self.set(cache_key, {'value': value, 'stored_at': now,
+                                 'refresh_at': now + expirey},
+                     expirey + stale)
+            return value
+        finally:
+            if locked:
+                self.cache.delete(lock_key)
+
+    def bump_namespace(self):
+        """
+        Invalidate the local cache of every worker, within namespace_interval
+
+        :return: the new namespace version
+        """
+        version = self.cache.incr(self.namespace_key)
+        if version is None:
+            self.cache.add(self.namespace_key, 1, 0)
+            version = self.cache.incr(self.namespace_key)
+        local.clear()
+        return version
+
+    @staticmethod
+    def stats():
+        """
+        Hit/miss counters for the local cache and the memcache lookups
+        behind it, for providers using the local cache
+
+        :return: dict
+        """
+        stats = dict(local.counters)
+        stats.update(local_entries=len(local), local_bytes=local.nbytes,
+                     namespace=local.namespace)
+        return stats
+
+    def _check_namespace(self):
+        now = time.time()
+        if now - local.namespace_checked < self.namespace_interval:
+            return
+        local.namespace_checked = now
+        namespace = self.cache.get(self.namespace_key)
+        if namespace != local.namespace:
+            local.clear()
+            local.namespace = namespace
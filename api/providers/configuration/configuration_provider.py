@@ -36,12 +36,15 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
 
     def url_for(self, service_name):
         key = "url.{0}.{1}".format(self.mode, service_name)
-        current = self._retrieve_config()
+        current = self._retrieve_config([key])
 
         return current.get(key)
 
     def get(self, key):
-        current = self._retrieve_config()
+        keys = list(key) if isinstance(key, (list, tuple)) else [key]
+        if 'ESPA_API_EMAIL_RECEIVE' in key:
+            keys.append('apiemailreceive')
+        current = self._retrieve_config(keys)
 
         if isinstance(key, (list, tuple)):
             ret = [current.get(k) for k in key]
@@ -87,7 +90,7 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
         return self.get(key)
 
     def exists(self, key):
-        current = self._retrieve_config()
+        current = self._retrieve_config([key])
 
         if key in current:
             return True
@@ -168,11 +171,20 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
                                                  ".cfgnfo not found".format(self.explorer_yaml))
 
     @staticmethod
-    def _retrieve_config():
+    def _retrieve_config(keys=None):
+        """
+        :param keys: only read these keys, rather than the whole table
+        :return: dict
+        """
         config = {}
+        if keys is not None and not keys:
+            return config
         with db_instance() as db:
             con_query = 'select key, value from ordering_configuration'
-            db.select(con_query)
+            if keys is None:
+                db.select(con_query)
+            else:
+                db.select(con_query + ' where key in %s', (tuple(keys),))
             for i in db:
                 config[i['key']] = i['value']
 
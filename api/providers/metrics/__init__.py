@@ -1,5 +1,7 @@
 import abc
 
+from api.providers.metrics.registry import registry as _registry
+
 
 class MetricsProviderInterface(object):
     __metaclass__ = abc.ABCMeta
@@ -8,14 +10,39 @@ class MetricsProviderInterface(object):
     def collect(self, order):
         pass
 
+    @abc.abstractmethod
+    def export(self):
+        """
+        Metrics summed across all workers, in the Prometheus text format
+
+        :return: str
+        """
+
 
 class MockMetricsProvider(MetricsProviderInterface):
 
     def collect(self, order):
         pass
 
+    def export(self):
+        return ''
+
 
 class MetricsProvider(MetricsProviderInterface):
+    # scenes per order
+    order_buckets = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
 
     def collect(self, order):
-        pass
+        """
+        Record the size of a validated order, per sensor
+
+        :param order: validated order dict
+        """
+        for key, value in order.items():
+            if isinstance(value, dict) and 'inputs' in value:
+                _registry.observe('espa_order_scenes', len(value['inputs']),
+                                 buckets=self.order_buckets, sensor=key)
+        _registry.inc('espa_orders_total')
+
+    def export(self):
+        return _registry.render()
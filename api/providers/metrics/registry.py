@@ -0,0 +1,221 @@
+"""
+Purpose: in-process counters and histograms, shared between uwsgi workers
+through per-process snapshot files, rendered in the Prometheus text format
+"""
+import os
+import json
+import time
+import errno
+import fcntl
+import tempfile
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+
+class Registry(object):
+    """
+    Counters and histograms for this process
+
+    Every flush_interval seconds, at most, recording writes a snapshot to
+    <directory>/<pid>.json, which collect() sums across workers.  Snapshots
+    of processes which have gone away are folded into archive.json, so
+    counts survive worker recycling
+    """
+    def __init__(self, directory=None, flush_interval=5):
+        self.directory = directory or os.getenv(
+            'ESPA_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'espa-api-metrics'))
+        self.flush_interval = flush_interval
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.flushed = 0
+        self._counters = dict()
+        # {key: [bucket bounds, bucket counts, sum, count]}
+        self._histograms = dict()
+
+    def _check_fork(self):
+        # values inherited across a fork belong to the parent
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._check_fork()
+            self._counters[key] = self._counters.get(key, 0) + value
+        self.flush()
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._check_fork()
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [list(buckets), [0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(hist[0]):
+                if value <= bound:
+                    hist[1][i] += 1
+            hist[2] += value
+            hist[3] += 1
+        self.flush()
+
+    @contextmanager
+    def timed(self, name, **labels):
+        """
+        Record the time taken as <name>_seconds, and count exceptions raised
+        as <name>_errors_total
+        """
+        start = time.time()
+        try:
+            yield
+        except Exception:
+            self.inc(name + '_errors_total', **labels)
+            raise
+        finally:
+            self.observe(name + '_seconds', time.time() - start, **labels)
+
+    def register_collector(self, func):
+        """
+        :param func: callable returning [(counter name, labels dict, value)],
+                     read each time a snapshot is taken
+        """
+        self.collectors.append(func)
+        return func
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            counters = [[n, [list(p) for p in l], v]
+                        for (n, l), v in self._counters.items()]
+            histograms = [[n, [list(p) for p in l], list(h[0]), list(h[1]), h[2], h[3]]
+                          for (n, l), h in self._histograms.items()]
+        for func in self.collectors:
+            for name, labels, value in func():
+                counters.append([name, [list(p) for p in _key(name, labels)[1]], value])
+        return {'counters': counters, 'histograms': histograms}
+
+    def flush(self, force=False):
+        now = time.time()
+        if not force and now - self.flushed < self.flush_interval:
+            return
+        self.flushed = now
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            self._write(os.path.join(self.directory, '{}.json'.format(os.getpid())),
+                        self.snapshot())
+        except (IOError, OSError):
+            # metrics are never worth failing a request over
+            pass
+
+    def _write(self, path, snapshot):
+        tmp = '{}.{}.tmp'.format(path, threading.current_thread().ident)
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.rename(tmp, path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    @staticmethod
+    def merge(snapshots):
+        counters = dict()
+        histograms = dict()
+        for snap in snapshots:
+            for name, labels, value in snap.get('counters', []):
+                key = (name, tuple(tuple(l) for l in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, bounds, counts, total, count in snap.get('histograms', []):
+                key = (name, tuple(tuple(l) for l in labels))
+                hist = histograms.get(key)
+                if hist is None or hist[0] != bounds:
+                    hist = histograms[key] = [bounds, [0] * len(bounds), 0.0, 0]
+                hist[1] = [a + b for a, b in zip(hist[1], counts)]
+                hist[2] += total
+                hist[3] += count
+        return {'counters': [[n, l, v] for (n, l), v in counters.items()],
+                'histograms': [[n, l] + h for (n, l), h in histograms.items()]}
+
+    def collect(self):
+        """
+        Sum the snapshots of every worker, this one's brought up to date
+
+        :return: merged snapshot
+        """
+        self.flush(force=True)
+        archive = os.path.join(self.directory, 'archive.json')
+        snapshots = []
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                dead = []
+                for name in os.listdir(self.directory):
+                    pid, ext = os.path.splitext(name)
+                    if ext != '.json' or not pid.isdigit():
+                        continue
+                    snap = self._read(os.path.join(self.directory, name))
+                    if snap is None:
+                        continue
+                    if _alive(int(pid)):
+                        snapshots.append(snap)
+                    else:
+                        dead.append((name, snap))
+
+                archived = self._read(archive) or {}
+                if dead:
+                    archived = self.merge([archived] + [s for _, s in dead])
+                    self._write(archive, archived)
+                    for name, _ in dead:
+                        os.remove(os.path.join(self.directory, name))
+                snapshots.append(archived)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return self.merge(snapshots)
+
+    def render(self):
+        """
+        :return: str, in the Prometheus text exposition format
+        """
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join('{}="{}"'.format(k, str(v).replace('"', '\\"'))
+                                  for k, v in pairs) + '}'
+
+        merged = self.collect()
+        lines = []
+        for name, labels, value in sorted(merged['counters']):
+            lines.append('{}{} {}'.format(name, fmt(labels), value))
+        for name, labels, bounds, counts, total, count in sorted(merged['histograms']):
+            for bound, bucket in zip(bounds, counts):
+                lines.append('{}_bucket{} {}'.format(name, fmt(labels, [('le', bound)]), bucket))
+            lines.append('{}_bucket{} {}'.format(name, fmt(labels, [('le', '+Inf')]), count))
+            lines.append('{}_sum{} {}'.format(name, fmt(labels), total))
+            lines.append('{}_count{} {}'.format(name, fmt(labels), count))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
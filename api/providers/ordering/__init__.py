@@ -28,6 +28,11 @@ class ProviderInterfaceV0(object):
         """Returns details for a given order"""
         return
 
+    @abc.abstractmethod
+    def order_status_fingerprint(self, ordernum):
+        """Returns a cheap summary of an order's current state"""
+        return
+
     @abc.abstractmethod
     def place_order(self, username, order):
         """Method for placing a processing order"""
@@ -1,5 +1,4 @@
 import datetime
-import os
 
 from api.domain import sensor
 from api.domain.order import Order
@@ -15,11 +14,9 @@ from api.providers.caching.caching_provider import CachingProvider
 from api.system.logger import ilogger as logger  # TODO: is this the best place for these?
 
 import copy
-import yaml
 
 cache = CachingProvider()
 config = ConfigurationProvider()
-from api import __location__
 
 
 class OrderingProviderException(Exception):
@@ -37,22 +34,24 @@ class OrderingProvider(ProviderInterfaceV0):
 
         return sensor.available_products(prod_list)
 
-    def available_products(self, product_id, username):
+    def available_products(self, product_id, username, staff=None):
         """
         Check to see what products are available to user based on
         an input list of scenes
 
         :param product_id: list of desired inputs
         :param username: username
+        :param staff: staff role of the user, if already known
         :return: dictionary
         """
-        user = User.by_username(username)
+        if staff is None:
+            staff = User.by_username(username).is_staff()
         pub_prods = copy.deepcopy(OrderingProvider.sensor_products(product_id))
 
-        with open(os.path.join(__location__, 'domain/restricted.yaml')) as f:
-                restricted = yaml.safe_load(f.read())
+        # Parsed once at import by the sensor module
+        restricted = sensor.restricted
 
-        role = False if user.is_staff() else True
+        role = False if staff else True
 
         restrict_all = restricted.get('all', {})
         all_role = restrict_all.get('role', [])
@@ -68,7 +67,7 @@ class OrderingProvider(ProviderInterfaceV0):
 
             sensor_restr = restricted.get(stype, {})
             role_restr = sensor_restr.get('role', []) + all_role
-            by_date_restr = sensor_restr.get('by_date', {})
+            by_date_restr = dict(sensor_restr.get('by_date', {}))
 
             # All overrides any sensor related dates
             by_date_restr.update(all_by_date)
@@ -110,12 +109,14 @@ class OrderingProvider(ProviderInterfaceV0):
                     except ValueError:
                         continue
 
+            dates = None
             for prod in outs:
                 if prod in by_date_restr:
-                    r = sensor_restr['by_date'][prod]
+                    r = by_date_restr[prod]
+                    if dates is None:
+                        dates = sensor.classify(ins)[sensor_type]['dates']
                     for sc_id in ins:
-                        obj = sensor.instance(sc_id)
-                        julian = '{}{}'.format(obj.year, obj.doy)
+                        julian = '{}{}'.format(*dates[sc_id])
 
                         if not julian_date_check(julian, r):
                             remove_me.append(prod)
@@ -176,34 +177,36 @@ class OrderingProvider(ProviderInterfaceV0):
         Perform a check to determine if the new order plus current open scenes for the current user
         is less than the maximum allowed open scene limit (currently 10,000).
         """
-        limit = config.configuration_keys['policy.open_scene_limit']
-
         if filters and not isinstance(filters, dict):
             raise OrderingProviderException('filters must be dict')
 
-        # See if the user has any open orders first
-        user_orders = Order.where({'user_id': user_id, 'status': 'ordered'})
+        # Only scenes in the user's open orders count against the limit
+        open_scenes = Order.user_scene_count(user_id=user_id, params=filters,
+                                             order_status='ordered')
+        if not open_scenes:
+            return
 
-        if len(user_orders) > 0:
-            scenes = Order.get_user_scenes(user_id=user_id, params=filters)
+        ids = sensor.SensorCONST.instances.keys()
+        # count number of scenes in the order
+        order_scenes = 0
+        for key in order:
+            if key in ids:
+                order_scenes += len(order[key]['inputs'])
 
-            ids = sensor.SensorCONST.instances.keys()
-            # count number of scenes in the order
-            order_scenes = 0
-            for key in order:
-                if key in ids:
-                    order_scenes += len(order[key]['inputs'])
+        limit = config.get('policy.open_scene_limit')
+        if (open_scenes + order_scenes) > int(limit):
+            diff = (open_scenes + order_scenes) - int(limit)
 
-            if (len(scenes) + order_scenes) > int(limit):
-                diff = (len(scenes) + order_scenes) - int(limit)
-
-                msg = "Order will exceed open scene limit of {lim}, please reduce number of ordered scenes by {diff}"
-                raise OpenSceneLimitException(msg.format(lim=limit, diff=diff))
+            msg = "Order will exceed open scene limit of {lim}, please reduce number of ordered scenes by {diff}"
+            raise OpenSceneLimitException(msg.format(lim=limit, diff=diff))
 
     def fetch_order(self, ordernum):
         orders = Order.where({'orderid': ordernum})
         return orders
 
+    def order_status_fingerprint(self, ordernum):
+        return Order.status_fingerprint(ordernum)
+
     def place_order(self, new_order, user):
         """
         Build an order dictionary to be place into the system
@@ -121,7 +121,7 @@ class ProductionProviderInterfaceV0(object):
         return
 
     @abc.abstractmethod
-    def handle_orders(self):
+    def handle_orders(self, username=None, report=False, profile=False, shards=None):
         '''Logic handler for how we accept orders + products into the system'''
         return
 
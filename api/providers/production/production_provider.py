@@ -11,6 +11,7 @@ from api.notification import emails
 from api.domain.user import User
 from api import util as utils
 
+import bisect
 import copy
 import datetime
 import urllib
@@ -25,9 +26,15 @@ import requests
 from cStringIO import StringIO
 
 from api.system.logger import ilogger as logger
+from api.util.locks import AdvisoryLock
+from api.util.parallel import parallel_map
+from api.util.stages import StageScheduler, StageTimer, profiled
+from api.providers.production.shards import merge as shard_merge, run_shards, shard_of
 
 config = ConfigurationProvider()
 cache = CachingProvider()
+# read on every production request, also kept in-process
+local_cache = CachingProvider(local_timeout=300)
 
 
 class ProductionProviderException(Exception):
@@ -506,8 +513,8 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         query = ' '.join(sql)
 
         with db_instance() as db:
-            log_sql = db.cursor.mogrify(query, params)
-            logger.warn("QUERY:{0}".format(log_sql))
+            log_sql = db.mogrify_later(query, params)
+            logger.warn("QUERY:%s", log_sql)
             db.select(query, params)
 
         # Columns: ['contactid', 'name', 'sensor_type', 'orderid',
@@ -775,27 +782,46 @@ class ProductionProvider(ProductionProviderInterfaceV0):
                         order.update('completion_email_sent', datetime.datetime.now())
         return True
 
-    def handle_onorder_landsat_products(self, products):
+    def handle_onorder_landsat_products(self, products, cursor_key='onorder_landsat_cursor'):
         """
         Handles landsat products still on order
+
+        At most 500 tram orders are polled per call, concurrently, starting
+        after the last one polled by the previous call so that every order is
+        polled in turn however large the backlog
+
+        :param products: scenes with status onorder
+        :param cursor_key: cache key remembering the last tram order polled
         :return: True
         """
-        # lets control how many scenes were going to ping LTA for status updates
-        # every 7 (currently) minutes
         # tram_order_id is sequential (looks like a timestamp), so we can sort
         # by that, running with the 'oldest' orders assuming they process FIFO
         # converting to a set eliminates duplicate calls to lta
-        product_tram_ids = set([product.tram_order_id for product in products])
-        sorted_tram_ids = sorted(product_tram_ids)[:500]
-
-        rejected = []
-        available = []
-
-        token = inventory.get_cached_session()
-
-        for tid in sorted_tram_ids:
-            order_status = inventory.get_order_status(token, tid)
-
+        sorted_tram_ids = sorted(set([product.tram_order_id for product in products]))
+        limit = 500
+        if len(sorted_tram_ids) > limit:
+            cursor = cache.get(cursor_key)
+            start = bisect.bisect_right(sorted_tram_ids, cursor) if cursor is not None else 0
+            sorted_tram_ids = (sorted_tram_ids[start:] + sorted_tram_ids[:start])[:limit]
+            cache.set(cursor_key, sorted_tram_ids[-1], 86400)
+
+        rejected = set()
+        available = set()
+
+        # one service for all the workers, building it reads the configuration
+        service = inventory.LTAService(inventory.get_cached_session(),
+                                       timeout=inventory.request_timeout())
+        workers = int(config.get('system.m2m_status_workers') or 8)
+        # requests per second, 0 for no limit
+        rate = config.get('system.m2m_status_rate')
+        rate = float(rate if rate is not None else 10)
+        statuses = parallel_map(service.get_order_status, sorted_tram_ids,
+                                workers=workers, rate=rate)
+
+        for tid, order_status, error in statuses:
+            if error or not order_status:
+                logger.error('Unable to retrieve status for tram order {}: {}'.format(tid, error))
+                continue
             # There are a variety of product statuses that come back from tram
             # on this call.  I is inprocess, Q is queued for the backend system,
             # D is duplicate, C is complete and R is rejected.  We are ignoring
@@ -804,23 +830,23 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             # duplicates will also be marked C
             for unit in order_status['units']:
                 if unit['statusCode'] == 'R':
-                    rejected.append(unit['orderingId']) # or 'displayId', 'entityId'
+                    rejected.add(unit['orderingId']) # or 'displayId', 'entityId'
                 elif unit['statusCode'] == 'C':
-                    available.append(unit['orderingId'])
+                    available.add(unit['orderingId'])
 
         # Go find all the tram units that were rejected and mark them
         # unavailable in our database.  Note that we are not looking for
         # specific tram_order_id/sceneids as duplicate tram orders may have been
         # submitted and we want to bulk update all scenes that are onorder but
         # have been rejected
-        if len(rejected) > 0:
+        if rejected:
             rejected_products = [p for p in products if p.name in rejected]
             # scene may not be rejected or complete
             if rejected_products:
                 self.set_products_unavailable(rejected_products, 'Level 1 product could not be produced')
 
-        if len(available) > 0:
-            products = filter(lambda a: a.name in available, products)
+        if available:
+            products = [p for p in products if p.name in available]
             # scene may not be rejected or complete
             if products:
                 Scene.bulk_update([p.id for p in products], {'status': 'oncache', 'note': ''})
@@ -856,155 +882,101 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         Check if scene/product combination will require external data, and
             filter the list if the service is unreachable at the moment
 
+        Each service is probed once per call (concurrently, if there are
+        several), and the answer reused for a minute
+
         :param scene_list: list of api.domain.scene.Scene instances
         :return: list
         """
         products_need_check = {
             'st': config.url_for('modis.datapool')  # ST requires ASTER GED
         }
-        passed_dep_check = list()
+        product_opts = Scene.order_attrs(scene_list, 'product_opts')
+
+        needs = dict()
         for s in scene_list:
-            opts = s.order_attr('product_opts')
             sn = sensor.instance(s.name).shortname
-            prods = opts[sn]['products']
-            passed_all = True
-            for p in prods:
-                need_check = p in products_need_check
-                if need_check:
-                    passed_all &= utils.connections.is_reachable(products_need_check[p], timeout=4)
-            if passed_all:
-                passed_dep_check.append(s)
-        return passed_dep_check
+            prods = product_opts[s.id][sn]['products']
+            needs[s.id] = set(products_need_check[p] for p in prods if p in products_need_check)
 
-    def handle_submitted_landsat_products(self, scenes):
+        urls = set().union(*needs.values()) if needs else set()
+        probes = parallel_map(lambda url: utils.connections.cached_is_reachable(url, timeout=4), urls)
+        reachable = set(url for url, result, _ in probes if result)
+
+        return [s for s in scene_list if needs[s.id] <= reachable]
+
+    def handle_submitted_products(self, scenes, sensor_type):
         """
-        Handles all submitted landsat products
-        :return: True
+        Moves submitted products still found in the archive to oncache, and
+        the rest to unavailable, checking them with M2M in chunks of
+        system.submitted_chunk_size
+
+        :param scenes: submitted scenes
+        :param sensor_type: for logging, e.g. landsat
+        :return: True, False if M2M is down
         """
         if not inventory.available():
-            logger.warning('M2M down. Skip handle_submitted_landsat_products...')
+            logger.warning('M2M down. Skip handle_submitted_{}_products...'.format(sensor_type))
             return False
+        logger.info("Handling submitted {} products...".format(sensor_type))
 
-        try:
-            logger.info('Handling submitted landsat products...')
-
-            token = inventory.get_cached_session()
-            prod_name_list, valid, invalid = set(), set(), set()
+        logger.info("Found {0} submitted {1} products".format(len(scenes), sensor_type))
+        if not scenes:
+            return True
 
-            for s in scenes:
-                prod_name_list.add(s.name)
+        chunk_size = int(config.get('system.submitted_chunk_size') or 500)
+        token = inventory.get_cached_session()
+        failed = 0
+        for start in range(0, len(scenes), chunk_size):
+            chunk = scenes[start:start + chunk_size]
+            try:
+                results = inventory.check_valid(token, list(set(s.name for s in chunk)))
+                valid = set(r for r, v in results.items() if v)
 
-            for r, v in inventory.check_valid(token, prod_name_list).items():
-                valid.add(r) if v else invalid.add(r)
+                available_ids = [s.id for s in chunk if s.name in valid]
+                if available_ids:
+                    Scene.bulk_update(available_ids, {'status': 'oncache', 'note': "''"})
 
-            for scene in scenes:
-                if scene.name in valid:
-                    scene.status = 'oncache'
-                    scene.note = "''"
-                    scene.save()
-                else:
-                    scene.status = 'unavailable'
-                    scene.note = 'No longer found in the archive, please search again'
-                    scene.save()
-        except Exception, e:
-            msg = ('Exception running handle_submitted_landsat_products: {}'.format(e))
-            logger.critical(msg)
+                invalids = [s for s in chunk if s.name not in valid]
+                if invalids:
+                    self.set_products_unavailable(invalids, 'No longer found in the archive, please search again')
+            except Exception as e:
+                # the remaining chunks may still go through
+                logger.critical('Exception running handle_submitted_{}_products: {}'.format(sensor_type, e))
+                failed += len(chunk)
 
+        if failed:
+            raise ProductionProviderException('{} of {} submitted {} products were not handled'
+                                              .format(failed, len(scenes), sensor_type))
         return True
 
+    def handle_submitted_landsat_products(self, scenes):
+        """
+        Handles all submitted landsat products
+        :return: True
+        """
+        return self.handle_submitted_products(scenes, 'landsat')
+
     def handle_submitted_modis_products(self, modis_products):
         """
         Moves all submitted modis products to oncache if true
         :return: True
         """
-        if not inventory.available():
-            logger.warning('M2M down. Skip handle_submitted_modis_products...')
-            return False
-        logger.info("Handling submitted modis products...")
-
-        logger.warn("Found {0} submitted modis products".format(len(modis_products)))
-
-        if len(modis_products) > 0:
-            lpdaac_ids = []
-            nonlp_ids = []
-
-            prod_name_list = [p.name for p in modis_products]
-            token = inventory.get_cached_session()
-            results = inventory.check_valid(token, prod_name_list)
-            valid = list(set(r for r,v in results.items() if v))
-            invalid = list(set(prod_name_list)-set(valid))
-
-            available_ids = [p.id for p in modis_products if p.name in valid]
-            if len(available_ids):
-                Scene.bulk_update(available_ids, {'status': 'oncache', 'note': "''"})
-
-            invalids = [p for p in modis_products if p.name in invalid]
-            if len(invalids):
-                self.set_products_unavailable(invalids, 'No longer found in the archive, please search again')
-
-        return True
+        return self.handle_submitted_products(modis_products, 'modis')
 
     def handle_submitted_sentinel_products(self, sentinel_products):
         """
         Moves all submitted sentinel products to oncache if true
         :return: True
         """
-        if not inventory.available():
-            logger.warning('M2M down. Skip handle_submitted_sentinel_orders...')
-            return False
-        logger.info("Handling submitted sentinel products...")
-
-        logger.warn("Found {0} submitted sentinel products".format(len(sentinel_products)))
-
-        if len(sentinel_products) > 0:
-            prod_name_list = [p.name for p in sentinel_products]
-            token = inventory.get_cached_session()
-            results = inventory.check_valid(token, prod_name_list)
-            valid = list(set(r for r, v in results.items() if v))
-            invalid = list(set(prod_name_list) - set(valid))
-
-            available_ids = [p.id for p in sentinel_products if p.name in valid]
-            if len(available_ids):
-                Scene.bulk_update(available_ids, {'status': 'oncache', 'note': "''"})
-
-            invalids = [p for p in sentinel_products if p.name in invalid]
-            if len(invalids):
-                self.set_products_unavailable(invalids, 'No longer found in the archive, please search again')
-
-        return True
-
+        return self.handle_submitted_products(sentinel_products, 'sentinel')
 
     def handle_submitted_viirs_products(self, viirs_products):
         """
         Moves all submitted viirs products to oncache if true
         :return: True
         """
-        if not inventory.available():
-            logger.warning('M2M down. Skip handle_submitted_viirs_products...')
-            return False
-        logger.info("Handling submitted viirs products...")
-
-        logger.warn("Found {0} submitted viirs products".format(len(viirs_products)))
-
-        if len(viirs_products) > 0:
-            lpdaac_ids = []
-            nonlp_ids = []
-
-            prod_name_list = [p.name for p in viirs_products]
-            token = inventory.get_cached_session()
-            results = inventory.check_valid(token, prod_name_list)
-            valid = list(set(r for r,v in results.items() if v))
-            invalid = list(set(prod_name_list)-set(valid))
-
-            available_ids = [p.id for p in viirs_products if p.name in valid]
-            if len(available_ids):
-                Scene.bulk_update(available_ids, {'status': 'oncache', 'note': "''"})
-
-            invalids = [p for p in viirs_products if p.name in invalid]
-            if len(invalids):
-                self.set_products_unavailable(invalids, 'No longer found in the archive, please search again')
-
-        return True
+        return self.handle_submitted_products(viirs_products, 'viirs')
 
     def handle_submitted_plot_products(self, plot_scenes):
         """
@@ -1187,11 +1159,153 @@ class ProductionProvider(ProductionProviderInterfaceV0):
                             'scene {}\n{}'.format(s.id, e))
         return True
 
-    def handle_orders(self, username=None):
+    def handle_orders(self, username=None, report=False, profile=False, shards=None):
         """
         Logic handler for how we accept orders + products into the system
-        :return: True
+
+        Independent stages run concurrently, a stage which fails or times out
+        is logged and does not hold up the others. Only one cycle runs at a
+        time, across every host, guarded by the handle_orders advisory lock
+
+        With shards > 1 pending orders are split by user, each shard handled
+        by its own process, so one large user does not hold up the rest
+
+        :param username: only handle orders for this user
+        :param report: return a per-stage timing summary, rather than True
+        :param profile: run under cProfile, the dump's location and the top
+                        functions are added to the summary
+        :param shards: number of processes to split the work between,
+                       defaults to system.handle_orders_shards (1)
+        :return: True, or the summary dict when report or profile is set,
+                 or when another cycle is running, a dict with its start time
+        """
+        timer = StageTimer('handle_orders')
+        with AdvisoryLock('handle_orders') as lock:
+            if not lock.acquired:
+                holder = lock.holder() or dict()
+                logger.warning('handle_orders already running, since {} from {}'
+                               .format(holder.get('started'), holder.get('client_addr')))
+                return {'result': False, 'msg': 'handle_orders already running',
+                        'started': holder.get('started')}
+
+            if shards is None:
+                shards = config.get('system.handle_orders_shards')
+            shards = int(shards or 1)
+            if shards > 1 and not (username or profile):
+                result, status = self._handle_sharded(timer, shards)
+            else:
+                with profiled('handle_orders', enabled=profile) as profile_report:
+                    # cProfile only sees this thread, so profiled stages run in it
+                    result, status = self._handle_orders(timer, username,
+                                                         workers=0 if profile else None)
+
+        summary = timer.summary()
+        summary['status'] = status
+        logger.info('handle_orders summary: {}'.format(
+            ', '.join('{stage}={seconds}s/{rows}'.format(**s) for s in summary['stages'])))
+        if not (report or profile):
+            return result
+
+        summary['result'] = result
+        if profile:
+            summary['profile'] = profile_report
+        return summary
+
+    def handle_shard(self, index, count, username=None):
+        """
+        Handle the pending orders of the users in one shard, leaving loading
+        EE orders and the stages not tied to pending orders to the
+        coordinating process
+
+        :param index: this shard
+        :param count: number of shards
+        :param username: only handle orders for this user
+        :return: summary dict
+        """
+        timer = StageTimer('handle_orders')
+        result, status = self._handle_orders(timer, username, shard=(index, count))
+        summary = timer.summary()
+        summary.update(result=result, status=status, shard=index)
+        return summary
+
+    def _handle_sharded(self, timer, count):
+        self._load_ee_orders_stage(timer)
+
+        timeout = int(config.get('system.handle_orders_stage_timeout') or 1800)
+        scheduler = StageScheduler(timer, timeout=timeout, lock=AdvisoryLock)
+        shard_summaries = []
+
+        def run():
+            shard_summaries.extend(run_shards(count, timeout=timeout))
+            return count
+
+        # shards time themselves out, give them a moment to report it
+        scheduler.add('shards', run, timeout=timeout + 60)
+        self._add_global_stages(scheduler)
+        status = scheduler.run()
+        # the cycle's lock is released on return, give timed out stages,
+        # whose M2M requests time out too, a chance to finish first
+        scheduler.join(timeout)
+
+        merged = shard_merge(shard_summaries)
+        for span in merged['stages']:
+            span['stage'] = 'shards.{}'.format(span['stage'])
+        timer.spans.extend(merged['stages'])
+        status.update(('shards.{}'.format(k), v) for k, v in merged['status'].items())
+        return merged['result'], status
+
+    def _load_ee_orders_stage(self, timer, user=None):
+        contactid = user.contactid if user else None
+        with timer.stage('load_ee_orders'):
+            try:
+                self.load_ee_orders(contactid)
+            except Exception as e:
+                logger.debug("Unable to load_ee_orders: {}".format(e))
+
+    def _add_global_stages(self, scheduler, user=None):
         """
+        Stages not tied to the pending orders, run once per cycle
+
+        :param user: only handle this user's stuck jobs and cancelled orders
+        """
+        # handle jobs stuck in processing
+        def stuck_jobs():
+            time_jobs_stuck = datetime.datetime.now() - datetime.timedelta(hours=6)
+            search = {'status': ('tasked', 'scheduled', 'processing'),
+                      'status_modified <': time_jobs_stuck}
+            if user:
+                search.update(order_id=[o.id for o in Order.where({'user_id': user.id})])
+            products = Scene.where(search) if search.get('order_id', True) else []
+            self.handle_stuck_jobs(products)
+            return len(products)
+
+        # handle cancelled orders
+        def cancelled_orders():
+            days = config.get('policy.purge_orders_after')
+            cutoff = datetime.datetime.now() - datetime.timedelta(days=int(days))
+            search = {'status': 'cancelled', 'completion_email_sent IS': None, 'order_date >': cutoff}
+            if user:
+                search.update(user_id=user.id)
+            self.handle_cancelled_orders(search)
+
+        def purge():
+            cache_key = 'orders_last_purged'
+            timeout = int(config.get('system.run_order_purge_every'))
+
+            # dont run this unless the cached marker has expired, add is atomic
+            if cache.add(cache_key, datetime.datetime.now(), timeout):
+                logger.info('Purge lock expired... running')
+
+                #purge the orders from disk now
+                self.purge_orders(send_email=True)
+            else:
+                logger.info('Purge lock detected... skipping')
+
+        scheduler.add('stuck_jobs', stuck_jobs)
+        scheduler.add('cancelled_orders', cancelled_orders)
+        scheduler.add('purge', purge, lock=True)
+
+    def _handle_orders(self, timer, username=None, workers=None, shard=None):
         filters = {'status': 'ordered'}
 
         user = None
@@ -1200,99 +1314,113 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             logger.warn('@USER {} ({})'.format(user.username, user.email))
             filters.update(user_id=user.id)
 
-        contactid = user.contactid if user else None
-        try:
-            self.load_ee_orders(contactid)
-        except Exception as e:
-            logger.debug("Unable to load_ee_orders: {}".format(e))
+        if shard is None:
+            self._load_ee_orders_stage(timer, user)
 
-        pending_orders = Order.where(filters)
-        pending_order_ids = [o.id for o in pending_orders]
+        with timer.stage('pending_orders') as span:
+            pending_orders = Order.where(filters)
+            if shard is not None:
+                index, count = shard
+                pending_orders = [o for o in pending_orders if shard_of(o.user_id, count) == index]
+            pending_order_ids = [o.id for o in pending_orders]
+            span['rows'] = len(pending_orders)
 
         if len(pending_orders) < 1:
             logger.error('No pending orders found: {}'.format(filters))
-            return False
+            return False, dict()
         logger.info('# Pending orders to handle: {}'.format(len(pending_orders)))
 
+        if workers is None:
+            workers = int(config.get('system.handle_orders_workers') or 4)
+        timeout = int(config.get('system.handle_orders_stage_timeout') or 1800)
+        scheduler = StageScheduler(timer, workers=workers, timeout=timeout, lock=AdvisoryLock)
+
         # send confirmation emails for new orders
-        orders_send_email = filter(lambda i: i.initial_email_sent is None, pending_orders)
-        if len(orders_send_email):
-            self.send_initial_emails(orders_send_email)
-        orders_send_email = None
+        def initial_emails():
+            orders = filter(lambda i: i.initial_email_sent is None, pending_orders)
+            if len(orders):
+                self.send_initial_emails(orders)
+            return len(orders)
 
         # handle landsat products still on order
-        products = Scene.where({'status': 'onorder', 'tram_order_id IS NOT': None, 'order_id': pending_order_ids})
-        self.handle_onorder_landsat_products(products)
-
-        # handle orphaned Mesos tasks
-        time_jobs_stuck = datetime.datetime.now() - datetime.timedelta(hours=6)
-        products = Scene.where({'status': ('tasked', 'scheduled', 'processing'), 'status_modified <': time_jobs_stuck})
-        self.handle_stuck_jobs(products)
+        def onorder_landsat():
+            products = Scene.where({'status': 'onorder', 'tram_order_id IS NOT': None,
+                                    'order_id': pending_order_ids})
+            cursor_key = 'onorder_landsat_cursor'
+            if shard is not None:
+                cursor_key += '.{}.{}'.format(*shard)
+            self.handle_onorder_landsat_products(products, cursor_key)
+            return len(products)
 
         # handle retry products
-        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-        retry_products = Scene.where({'status': 'retry', 'retry_after <': now, 'order_id': pending_order_ids})
-        self.handle_retry_products(retry_products)
-        retry_products = None
+        def retry():
+            now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+            products = Scene.where({'status': 'retry', 'retry_after <': now,
+                                    'order_id': pending_order_ids})
+            self.handle_retry_products(products)
+            return len(products)
 
         # handle failed EE order updates
-        scenes = Scene.where({'failed_lta_status_update IS NOT': None, 'order_id': pending_order_ids})
-        self.handle_failed_ee_updates(scenes)
-        scenes = None
-
-        # handle cancelled orders
-        days = config.get('policy.purge_orders_after')
-        cutoff = datetime.datetime.now() - datetime.timedelta(days=int(days))
-        search = {'status': 'cancelled',  'completion_email_sent IS': None, 'order_date >': cutoff}
-        if user:
-                search.update(user_id=user.id)
-        self.handle_cancelled_orders(search)
-
-        # retrieve all scenes in submitted state
-        submitted_scenes = Scene.where({'status': 'submitted', 'order_id': pending_order_ids})
-
-        submitted_landsat = filter(lambda s: s.sensor_type == 'landsat', submitted_scenes)[:500]
-        self.handle_submitted_landsat_products(submitted_landsat)
-        submitted_landsat = None
-
-        submitted_modis = filter(lambda s: s.sensor_type == 'modis', submitted_scenes)
-        self.handle_submitted_modis_products(submitted_modis)
-        submitted_modis = None
-
-        submitted_viirs = filter(lambda s: s.sensor_type == 'viirs', submitted_scenes)
-        self.handle_submitted_viirs_products(submitted_viirs)
-        submitted_viirs = None
-
-        submitted_sentinel = filter(lambda s: s.sensor_type == 'sentinel', submitted_scenes)
-        self.handle_submitted_sentinel_products(submitted_sentinel)
-        submitted_sentinel = None
-
-        submitted_plot = filter(lambda s: s.sensor_type == 'plot', submitted_scenes)
-        self.handle_submitted_plot_products(submitted_plot)
-        submitted_plot = None
-
-        self.calc_scene_download_sizes(pending_order_ids)
+        def failed_ee_updates():
+            scenes = Scene.where({'failed_lta_status_update IS NOT': None,
+                                  'order_id': pending_order_ids})
+            self.handle_failed_ee_updates(scenes)
+            return len(scenes)
+
+        # retrieve all scenes in submitted state, including those just retried
+        submitted = dict()
+
+        def submitted_scenes():
+            submitted['scenes'] = Scene.where({'status': 'submitted', 'order_id': pending_order_ids})
+            return len(submitted['scenes'])
+
+        def submitted_handler(sensor_type, handler, limit=None):
+            def handle():
+                scenes = filter(lambda s: s.sensor_type == sensor_type, submitted['scenes'])[:limit]
+                handler(scenes)
+                return len(scenes)
+            return handle
+
+        def download_sizes():
+            self.calc_scene_download_sizes(pending_order_ids)
+            return len(pending_order_ids)
 
         # finalize orders
-        for order in pending_orders:
-            self.update_order_if_complete(order)
-
-        cache_key = 'orders_last_purged'
-        result = cache.get(cache_key)
-
-        # dont run this unless the cached lock has expired
-        if result is None:
-            logger.info('Purge lock expired... running')
-
-            # first thing, populate the cached lock field
-            timeout = int(config.get('system.run_order_purge_every'))
-            cache.set(cache_key, datetime.datetime.now(), timeout)
-
-            #purge the orders from disk now
-            self.purge_orders(send_email=True)
-        else:
-            logger.info('Purge lock detected... skipping')
-        return True
+        def finalize():
+            for order in pending_orders:
+                self.update_order_if_complete(order)
+            return len(pending_orders)
+
+        # the landsat cap is for the whole cycle, split it between the shards
+        landsat_limit = 500 if shard is None else -(-500 // shard[1])
+
+        scheduler.add('initial_emails', initial_emails)
+        scheduler.add('onorder_landsat', onorder_landsat)
+        scheduler.add('retry', retry)
+        scheduler.add('failed_ee_updates', failed_ee_updates)
+        if shard is None:
+            self._add_global_stages(scheduler, user)
+        scheduler.add('submitted_scenes', submitted_scenes, after=['retry'])
+        for sensor_type, handler, limit in (
+                ('landsat', self.handle_submitted_landsat_products, landsat_limit),
+                ('modis', self.handle_submitted_modis_products, None),
+                ('viirs', self.handle_submitted_viirs_products, None),
+                ('sentinel', self.handle_submitted_sentinel_products, None),
+                ('plot', self.handle_submitted_plot_products, None)):
+            name = 'submitted_{}'.format(sensor_type)
+            scheduler.add(name, submitted_handler(sensor_type, handler, limit),
+                          needs=['submitted_scenes'])
+        scheduler.add('download_sizes', download_sizes)
+        # not while a timed out stage may still be changing the same scenes
+        scheduler.add('finalize', finalize,
+                      settled=[st['name'] for st in scheduler.stages
+                               if st['name'] != 'purge'])
+
+        status = scheduler.run()
+        # the cycle's lock is released on return, give timed out stages,
+        # whose M2M requests time out too, a chance to finish first
+        scheduler.join(timeout)
+        return True, status
 
     @staticmethod
     def strip_unrelated(sceneid, opts):
@@ -1323,31 +1451,30 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             match = re.search("[0-9]{2,3}.[0-9]{1,2}.[0-9]{2}.[0-9]{1,3}", instr)
             return match.group(0)
 
-        cache_key = 'prod_whitelist'
-        prodlist  = cache.get(cache_key)
         mesos_url = config.url_for('mesos_master') # url.<mode>.mesos_master
 
         whitelist_additions = []
         if 'prod_whitelist_additions' in config.__dict__.keys():
             whitelist_additions = config.prod_whitelist_additions.replace("'","").split(",")
 
-        if prodlist is None:
+        def regenerate():
             logger.info("Regenerating production whitelist...")
-            # timeout in 6 hours
-            timeout = 60 * 60 * 6
-            try:
-                slaves   = requests.get(mesos_url + "/slaves", verify=False)
-                pids     = list(map(getpid, slaves.json()['slaves']))
-                prodlist = list(map(getip, pids))
-                prodlist.append('127.0.0.1')
-                prodlist.append(socket.gethostbyname(socket.gethostname()))
-                if whitelist_additions:
-                    prodlist.extend(whitelist_additions)
-            except BaseException, e:
-                logger.exception('Could not access Mesos!')
-            cache.set(cache_key, prodlist, timeout)
-
-        return prodlist
+            slaves   = requests.get(mesos_url + "/slaves", verify=False)
+            pids     = list(map(getpid, slaves.json()['slaves']))
+            prodlist = list(map(getip, pids))
+            prodlist.append('127.0.0.1')
+            prodlist.append(socket.gethostbyname(socket.gethostname()))
+            if whitelist_additions:
+                prodlist.extend(whitelist_additions)
+            return prodlist
+
+        # refresh every 6 hours, one worker at a time
+        timeout = 60 * 60 * 6
+        try:
+            return local_cache.get_or_compute('prod_whitelist', regenerate, timeout)
+        except BaseException, e:
+            logger.exception('Could not access Mesos!')
+            return None
 
     @staticmethod
     def reset_processing_status():
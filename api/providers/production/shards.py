@@ -0,0 +1,126 @@
+"""
+Purpose: run handle_orders as several processes, each over the pending orders
+of the users hashed to its shard, and merge what they report
+
+Shards are fresh interpreters rather than forks, so no database, memcache or
+advisory lock connection is shared with the coordinator
+
+    python -m api.providers.production.shards <index> <count> <result path> [username]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import tempfile
+import subprocess
+
+from api.system.logger import ilogger as logger
+
+# a stage's merged status is the worst reported by any shard
+STATUS_RANK = ('ok', 'skipped', 'locked', 'timeout', 'error')
+
+
+def shard_of(user_id, count):
+    """
+    :return: int, the shard handling the user's orders, stable across runs
+    """
+    return (zlib.crc32(str(user_id)) & 0xffffffff) % count
+
+
+def python_executable():
+    # under uwsgi, sys.executable is the uwsgi binary
+    if 'python' in os.path.basename(sys.executable or ''):
+        return sys.executable
+    return os.path.join(sys.exec_prefix, 'bin', 'python')
+
+
+def merge(summaries):
+    """
+    Sum the stage timings of each shard, by stage
+
+    :param summaries: [shard summary dict]
+    :return: dict, result (any shard's), status and stages
+    """
+    stages = []
+    by_name = dict()
+    status = dict()
+    for summary in summaries:
+        for span in summary.get('stages', []):
+            merged = by_name.get(span['stage'])
+            if merged is None:
+                merged = by_name[span['stage']] = {'stage': span['stage'], 'rows': None,
+                                                   'seconds': 0, 'queries': 0, 'shards': 0}
+                stages.append(merged)
+            if span.get('rows') is not None:
+                merged['rows'] = (merged['rows'] or 0) + span['rows']
+            merged['seconds'] = round(merged['seconds'] + span.get('seconds', 0), 3)
+            merged['queries'] += span.get('queries') or 0
+            merged['shards'] += 1
+        for name, value in summary.get('status', {}).items():
+            current = status.get(name, 'ok')
+            status[name] = max(current, value, key=STATUS_RANK.index)
+    return {'result': any(s.get('result') for s in summaries),
+            'status': status, 'stages': stages}
+
+
+def run_shards(count, username=None, timeout=3600):
+    """
+    Run every shard to completion, or until the timeout, when those still
+    running are terminated and reported as timed out
+
+    :return: [shard summary dict], in shard order
+    """
+    directory = tempfile.mkdtemp(prefix='espa-shards-')
+    procs = []
+    try:
+        for index in range(count):
+            path = os.path.join(directory, '{}.json'.format(index))
+            cmd = [python_executable(), '-m', __name__, str(index), str(count), path]
+            if username:
+                cmd.append(username)
+            procs.append((index, path, subprocess.Popen(cmd)))
+
+        deadline = time.time() + timeout
+        while any(p.poll() is None for _, _, p in procs) and time.time() < deadline:
+            time.sleep(.5)
+
+        summaries = []
+        for index, path, proc in procs:
+            if proc.poll() is None:
+                logger.critical('ERR handle_orders shard {} timed out, terminating'.format(index))
+                proc.terminate()
+                proc.wait()
+                summaries.append({'shard': index, 'result': False, 'status': {'shard': 'timeout'}})
+                continue
+            try:
+                with open(path) as f:
+                    summaries.append(json.load(f))
+            except (IOError, ValueError):
+                logger.critical('ERR handle_orders shard {} exited {} without a summary'
+                                .format(index, proc.returncode))
+                summaries.append({'shard': index, 'result': False, 'status': {'shard': 'error'}})
+        return summaries
+    finally:
+        for _, _, proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv):
+    index, count, path = int(argv[0]), int(argv[1]), argv[2]
+    username = argv[3] if len(argv) > 3 else None
+
+    from api.providers.metrics.registry import registry
+    from api.providers.production.production_provider import ProductionProvider
+
+    summary = ProductionProvider().handle_shard(index, count, username)
+    registry.flush(force=True)
+    with open(path, 'w') as f:
+        json.dump(summary, f)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
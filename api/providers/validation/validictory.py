@@ -1,9 +1,7 @@
 from __future__ import absolute_import
 from decimal import Decimal
 import copy
-import yaml
 import re
-import os
 import math
 
 import validictory
@@ -13,8 +11,7 @@ from api.providers.validation import ValidationInterfaceV0
 from api import ValidationException
 import api.providers.ordering.ordering_provider as ordering
 import api.domain.sensor as sn
-
-from api import __location__
+from api.domain.user import User
 
 
 class OrderValidatorV0(validictory.SchemaValidator):
@@ -24,15 +21,24 @@ class OrderValidatorV0(validictory.SchemaValidator):
         self.data_source = None
         self.base_schema = None
         self._itemcount = None
-        with open(os.path.join(__location__, 'domain/restricted.yaml')) as f:
-            self.restricted = yaml.safe_load(f.read())
+        self._staff = None
+        # Parsed once at import by the sensor module
+        self.restricted = sn.restricted
 
     def validate(self, data, schema):
         self.data_source = data
         self.base_schema = schema
         self._itemcount = {}
+        self._staff = None
         super(OrderValidatorV0, self).validate(data, schema)
 
+    @property
+    def staff(self):
+        """Staff role of the ordering user, looked up once per validation"""
+        if self._staff is None:
+            self._staff = User.by_username(self.username).is_staff()
+        return self._staff
+
     def validate_pixel_units(self, x, fieldname, schema, path, valid_cs_units=('meters',)):
         """Validates that the coordinate system output units match as required for the projection (+units=m)"""
         if fieldname in x:
@@ -367,7 +373,7 @@ class OrderValidatorV0(validictory.SchemaValidator):
         inst = sn.instance(req_scene)
 
         avail_prods = (ordering.OrderingProvider()
-                       .available_products(x['inputs'], self.username))
+                       .available_products(x['inputs'], self.username, staff=self.staff))
 
         not_implemented = avail_prods.pop('not_implemented', None)
         date_restricted = avail_prods.pop('date_restricted', None)
@@ -1,6 +1,11 @@
 import os
 import sys
+import copy
+import time
+import atexit
 import logging
+import threading
+import Queue
 
 from logging import StreamHandler, FileHandler
 from logging import Formatter
@@ -10,6 +15,155 @@ from api.providers.configuration.configuration_provider import ConfigurationProv
 
 config = ConfigurationProvider()
 
+
+class ConfiguredSMTPHandler(SMTPHandler):
+    """
+    SMTPHandler taking its addresses from the configuration on first use,
+    so that importing the logger does not reach the database
+
+    At most `limit` emails are sent per `period` seconds, the count of any
+    suppressed in between is noted in the next one sent
+    """
+    def __init__(self, mailhost, subject, limit=10, period=3600):
+        SMTPHandler.__init__(self, mailhost, None, [], subject)
+        self.configured = False
+        self.limit = limit
+        self.period = period
+        self.sent = []
+        self.suppressed = 0
+
+    def emit(self, record):
+        now = time.time()
+        self.sent = [t for t in self.sent if now - t < self.period]
+        if len(self.sent) >= self.limit:
+            self.suppressed += 1
+            return
+        self.sent.append(now)
+
+        if not self.configured:
+            try:
+                self.fromaddr = config.get('apiemailsender')
+                self.toaddrs = config.get('ESPA_API_EMAIL_RECEIVE').split(',')
+            except Exception:
+                self.handleError(record)
+                return
+            self.configured = True
+
+        if self.suppressed:
+            # the record is shared with the other handlers
+            record = copy.copy(record)
+            record.msg = '{}\n\n({} similar messages suppressed)'.format(record.msg, self.suppressed)
+            self.suppressed = 0
+        SMTPHandler.emit(self, record)
+
+
+class QueueListener(object):
+    """
+    Background thread handing records taken off a queue to its handlers
+
+    The thread is (re)started on demand in each process, as threads do not
+    survive the fork into uwsgi workers
+    """
+    _sentinel = None
+
+    def __init__(self, queue, *handlers):
+        self.queue = queue
+        self.handlers = handlers
+        self.pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._monitor, name='log-listener')
+            self._thread.daemon = True
+            self._thread.start()
+            self.pid = os.getpid()
+
+    def handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _monitor(self):
+        while True:
+            record = self.queue.get()
+            if record is self._sentinel:
+                break
+            try:
+                self.handle(record)
+            except Exception:
+                # keep the listener alive, whatever a handler does
+                pass
+
+    def stop(self):
+        """
+        Flush what is queued, and stop the thread
+        """
+        if self.pid != os.getpid():
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join(5)
+        self.pid = None
+
+
+class QueueHandler(logging.Handler):
+    """
+    Hand records to a QueueListener instead of writing them in the caller
+
+    The message is rendered here, so arguments (e.g. lazily rendered SQL)
+    are only formatted for records which pass this handler's level
+
+    Records arriving while the queue is full are dropped, their count is
+    logged once there is room again
+    """
+    def __init__(self, listener):
+        logging.Handler.__init__(self)
+        self.listener = listener
+        self.dropped = 0
+        self.unreported = 0
+
+    def prepare(self, record):
+        # the record is shared with the other handlers, render a copy
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging._defaultFormatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.listener.ensure_started()
+            self.listener.queue.put_nowait(self.prepare(record))
+        except Queue.Full:
+            self.dropped += 1
+            self.unreported += 1
+            return
+        except Exception:
+            self.handleError(record)
+            return
+        if self.unreported:
+            self.report_dropped(record)
+
+    def report_dropped(self, record):
+        notice = logging.makeLogRecord({
+            'name': record.name, 'levelno': max(logging.WARNING, self.level),
+            'levelname': logging.getLevelName(max(logging.WARNING, self.level)),
+            'pathname': __file__, 'lineno': 0,
+            'msg': '{} log records dropped, the queue was full'.format(self.unreported)})
+        try:
+            self.listener.queue.put_nowait(notice)
+            self.unreported = 0
+        except Queue.Full:
+            pass
+
+
 if config.mode not in ('tst', 'dev'):
     logging.getLogger("requests").setLevel(logging.WARNING)
     logging.getLogger("passlib.registry").setLevel(logging.WARNING)
@@ -20,24 +174,35 @@ else:
 LOG_FORMAT = ("%(asctime)s [%(levelname)s]: %(message)s in %(pathname)s:%(lineno)d")
 
 ilogger = logging.getLogger("api")
-ilogger.setLevel(logging.DEBUG)
 
 espa_log_dir = os.getenv('ESPA_LOG_DIR')
 if espa_log_dir and not os.getenv('ESPA_LOG_STDOUT'):
     ih = FileHandler(os.path.join(espa_log_dir, 'espa-api-info.log'))
 else:
     ih = StreamHandler(stream=sys.stdout)
-eh = SMTPHandler(mailhost='localhost', fromaddr=config.get('apiemailsender'), toaddrs=config.get('ESPA_API_EMAIL_RECEIVE').split(','), subject='ESPA API ERROR')
+eh = ConfiguredSMTPHandler(mailhost='localhost', subject='ESPA API ERROR')
 
 if config.mode not in ('tst', 'dev'):
     ih.setLevel(logging.INFO)
 else:
     ih.setLevel(logging.DEBUG)
 eh.setLevel(logging.CRITICAL)
+ih.setFormatter(Formatter(LOG_FORMAT))
+
+# nothing below what gets written is even built
+ilogger.setLevel(ih.level)
 
+# email gets its own thread, so a slow mail server never holds up the log
+listeners = []
 for handler in [ih, eh]:
-    ilogger.addHandler(handler)
+    listener = QueueListener(Queue.Queue(10000), handler)
+    queue_handler = QueueHandler(listener)
+    queue_handler.setLevel(handler.level)
+    ilogger.addHandler(queue_handler)
+    listeners.append(listener)
 
-    if isinstance(handler, logging.StreamHandler):
-        handler.setFormatter(Formatter(LOG_FORMAT))
 
+@atexit.register
+def flush():
+    for listener in listeners:
+        listener.stop()
@@ -1,12 +1,15 @@
 # Tie together the urls for functionality
 
 import os
+import time
 
-from flask import Flask, request, make_response, jsonify
+from flask import Flask, request, make_response, jsonify, g
 from flask_restful import Api, Resource, reqparse, fields, marshal
 
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.util import api_cfg
+from api.util.querystats import query_stats
+from api.providers.metrics.registry import registry
 from api.system.logger import ilogger as logger
 
 from http_user import Index, VersionInfo, AvailableProducts, ValidationInfo,\
@@ -14,7 +17,7 @@ from http_user import Index, VersionInfo, AvailableProducts, ValidationInfo,\
 
 from http_production import ProductionVersion, ProductionConfiguration, ProductionOperations, ProductionManagement
 
-from http_admin import Reports, SystemStatus, OrderResets, ProductionStats
+from http_admin import Reports, SystemStatus, OrderResets, ProductionStats, Metrics, CacheFlush
 from http_json import MessagesResponse, BadRequestResponse, SystemErrorResponse
 
 config = ConfigurationProvider()
@@ -23,6 +26,31 @@ app = Flask(__name__)
 app.secret_key = api_cfg('config').get('key')
 
 
+@app.before_request
+def count_queries():
+    query_stats.reset()
+    g.db_counter = query_stats.begin('{} {}'.format(request.method,
+                                                    request.url_rule or request.path))
+
+
+@app.after_request
+def report_queries(response):
+    counter = g.get('db_counter')
+    if counter is None:
+        return response
+    query_stats.end(counter)
+    logger.info('db_stats %s', counter)
+    endpoint = str(request.url_rule or 'unmatched')
+    registry.observe('espa_http_request_seconds', time.time() - counter.started,
+                     endpoint=endpoint, method=request.method)
+    registry.inc('espa_http_requests_total', endpoint=endpoint,
+                 method=request.method, status=response.status_code)
+    if config.mode != 'ops':
+        for header, value in counter.headers().items():
+            response.headers[header] = value
+    return response
+
+
 @app.errorhandler(404)
 def page_not_found(e):
     errors = MessagesResponse(errors=['{} not found on the server'
@@ -105,6 +133,9 @@ transport_api.add_resource(SystemStatus,
                            '/api/v<version>/system-status-update',
                            '/api/v<version>/system/config')
 
+transport_api.add_resource(CacheFlush,
+                           '/api/v<version>/system/cache-flush')
+
 transport_api.add_resource(OrderResets,
                            '/api/v<version>/error_to_submitted/<orderid>',
                            '/api/v<version>/error_to_unavailable/<orderid>')
@@ -120,6 +151,8 @@ transport_api.add_resource(ProductionOperations,
                            '/production-api/v<version>/handle-orders',
                            '/production-api/v<version>/queue-products')
 
+transport_api.add_resource(Metrics, '/metrics')
+
 transport_api.add_resource(ProductionStats,
                            '/production-api/v<version>/statistics/<name>',
                            '/production-api/v<version>/multistat/<name>')
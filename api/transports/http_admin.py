@@ -10,7 +10,7 @@ from api.interfaces.admin.version1 import API as APIv1
 from api.system.logger import ilogger as logger
 from api.domain.user import User
 from api.transports.http_json import MessagesResponse
-from api.providers.caching.caching_provider import CachingProvider
+from api.util import ipfilter
 
 from flask import jsonify
 from flask import make_response
@@ -21,7 +21,6 @@ from flask_restful import Resource
 
 espa = APIv1()
 auth = HTTPBasicAuth()
-cache = CachingProvider()
 
 
 def user_ip_address():
@@ -48,7 +47,7 @@ def whitelist(func):
     and http://github.com/mattupsate/flask-security
     """
     def decorated(*args, **kwargs):
-        white_ls = espa.get_admin_whitelist()
+        white_ls = ipfilter.compiled(espa.get_admin_whitelist())
         denied_response = MessagesResponse(errors=['Access Denied'], code=403)
         remote_addr = user_ip_address()
 
@@ -66,7 +65,7 @@ def stats_whitelist(func):
     Provide a decorator to whitelist hosts accessing stats
     """
     def decorated(*args, **kwargs):
-        white_ls = espa.get_stat_whitelist()
+        white_ls = ipfilter.compiled(espa.get_stat_whitelist())
         denied_response = MessagesResponse(errors=['Access Denied'], code=403)
         remote_addr = user_ip_address()
 
@@ -106,26 +105,8 @@ def unauthorized():
 @auth.verify_password
 def verify_user(username, password):
     try:
-        cache_key = '{}-credentials'.format(username.replace(' ', '_espa_cred_insert_'))
-        cache_entry = cache.get(cache_key)
-
-        if cache_entry:
-            # Need to be encrypted?
-            if cache_entry['password'] == password:
-                user_entry = cache_entry['user_entry']
-
-            # User may have changed their password while it was still cached
-            else:
-                user_entry = User.get(username, password)
-        else:
-            user_entry = User.get(username, password)
-
-        cache_entry = {'password': password,
-                       'user_entry': user_entry}
-        cache.set(cache_key, cache_entry, 7200)
-
-        user = User(*user_entry)
-        if not user.is_staff:
+        user = User.authenticate(username, password)
+        if not user.is_staff():
             return False
         flask.g.user = user  # Replace usage with cached version
     except Exception:
@@ -166,6 +147,19 @@ class ProductionStats(Resource):
             return espa.get_multistat(name)
 
 
+class Metrics(Resource):
+    decorators = [stats_whitelist]
+
+    @staticmethod
+    def get():
+        metrics = espa.get_metrics()
+        if not isinstance(metrics, basestring):
+            return jsonify(metrics), 500
+        response = make_response(metrics)
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4'
+        return response
+
+
 class SystemStatus(Resource):
     decorators = [auth.login_required, whitelist, version_filter]
 
@@ -196,6 +190,17 @@ class SystemStatus(Resource):
         return resp()
 
 
+class CacheFlush(Resource):
+    decorators = [auth.login_required, whitelist, version_filter]
+
+    @staticmethod
+    def post(version):
+        response = espa.flush_local_caches()
+        if 'namespace' not in response:
+            return jsonify(response), 500
+        return jsonify(response)
+
+
 class OrderResets(Resource):
     decorators = [auth.login_required, whitelist, version_filter]
 
@@ -3,6 +3,7 @@ from flask_restful import Api, Resource, reqparse, fields, marshal
 
 from api.interfaces.production.version1 import API as APIv1
 from api.domain import production_api_operations, default_error_message
+from api.util import ipfilter
 
 espa = APIv1()
 
@@ -15,7 +16,7 @@ def whitelist(func):
     and http://github.com/mattupsate/flask-security
     """
     def decorated(*args, **kwargs):
-        white_ls = espa.get_production_whitelist()
+        white_ls = ipfilter.compiled(espa.get_production_whitelist())
         if 'X-Forwarded-For' in request.headers:
             remote_addr = request.headers.getlist('X-Forwarded-For')[0].rpartition(' ')[-1]
         else:
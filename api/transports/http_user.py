@@ -1,4 +1,6 @@
 # Contains user facing REST functionality
+import hashlib
+import json
 import traceback
 
 import flask
@@ -7,8 +9,8 @@ import memcache
 from api.interfaces.ordering.version1 import API as APIv1
 from api.domain import user_api_operations
 from api.system.logger import ilogger as logger
-from api.util import api_cfg
 from api.util import lowercase_all
+from api.util.ipfilter import config_lists
 from api.domain.user import User, UserException
 from api.external.ers import (
     ERSApiErrorException, ERSApiConnectionException, ERSApiAuthFailedException)
@@ -18,7 +20,6 @@ from api.transports.http_json import (
     BadRequestResponse, SystemErrorResponse, AccessDeniedResponse, AuthFailedResponse,
     BadMethodResponse)
 from api.util.dbconnect import DBConnectException
-from api.providers.caching.caching_provider import CachingProvider
 
 from flask import jsonify
 from flask import make_response
@@ -32,7 +33,6 @@ from functools import wraps
 
 espa = APIv1()
 auth = HTTPBasicAuth()
-cache = CachingProvider()
 
 
 def user_ip_address():
@@ -51,6 +51,41 @@ def user_ip_address():
     return remote_addr
 
 
+def status_etag(fingerprint, *variant):
+    """
+    Build an entity tag for a status response from an order fingerprint
+
+    :param fingerprint: dict from the order_status_fingerprint lookup
+    :param variant: anything else the response body depends on
+    :return: string
+    """
+    parts = [fingerprint.get('status'), fingerprint.get('completion_date'),
+             fingerprint.get('scene_count'), fingerprint.get('last_modified')]
+    parts.extend(variant)
+    return hashlib.md5('|'.join(str(p) for p in parts)).hexdigest()
+
+
+def set_validators(response, etag, fingerprint):
+    """
+    Attach the ETag and Last-Modified headers to an outgoing response
+
+    :return: flask.Response
+    """
+    response.set_etag(etag)
+    if fingerprint.get('last_modified'):
+        response.last_modified = fingerprint['last_modified']
+    return response
+
+
+def not_modified(etag, fingerprint):
+    """
+    Empty 304 response, for clients which already hold the current body
+
+    :return: flask.Response
+    """
+    return set_validators(make_response('', 304), etag, fingerprint)
+
+
 def greylist(func):
     """
     Provide a decorator to enact black and white lists on user endpoints
@@ -60,17 +95,17 @@ def greylist(func):
     """
     @wraps(func)
     def decorated(*args, **kwargs):
-        black_ls = api_cfg().get('user_blacklist')
-        white_ls = api_cfg().get('user_whitelist')
+        black_ls = config_lists.filter('user_blacklist')
+        white_ls = config_lists.filter('user_whitelist')
         remote_addr = user_ip_address()
         # prohibited ip's
         if black_ls:
-            if remote_addr in black_ls.split(','):
+            if remote_addr in black_ls:
                 return AccessDeniedResponse()
 
         # for when were guarding access
         if white_ls:
-            if remote_addr not in white_ls.split(','):
+            if remote_addr not in white_ls:
                 return AccessDeniedResponse()
 
         return func(*args, **kwargs)
@@ -119,26 +154,7 @@ def verify_user(username, password):
         flask.g.error_reason = 'auth'
         return False
     try:
-        # usernames with spaces are valid in EE, though they can't be used for cache keys
-        cache_key = '{}-credentials'.format(username.replace(' ', '_espa_cred_insert_'))
-        cache_entry = cache.get(cache_key)
-
-        if cache_entry:
-            # Need to be encrypted?
-            if cache_entry['password'] == password:
-                user_entry = cache_entry['user_entry']
-
-            # User may have changed their password while it was still cached
-            else:
-                user_entry = User.get(username, password)
-        else:
-            user_entry = User.get(username, password)
-
-        cache_entry = {'password': password,
-                       'user_entry': user_entry}
-        cache.set(cache_key, cache_entry, 7200)
-
-        user = User(*user_entry)
+        user = User.authenticate(username, password)
         flask.g.user = user  # Replace usage with cached version
     except UserException as e:
         logger.info('Invalid login attempt, username: {}, {}'.format(username, e))
@@ -317,6 +333,16 @@ class Ordering(Resource):
                 return message()
             else:
                 ordernum = body.get('orderid')
+
+        etag, fingerprint = None, None
+        if 'order-status' in request.url:
+            # Pollers can skip the order lookup entirely if nothing changed
+            fingerprint = espa.order_status_fingerprint(ordernum)
+            if fingerprint:
+                etag = status_etag(fingerprint, request.path)
+                if request.if_none_match.contains(etag):
+                    return not_modified(etag, fingerprint)
+
         orders = espa.fetch_order(ordernum)
         response = OrderResponse(**orders[0].as_dict())
         response.code = 200
@@ -327,6 +353,8 @@ class Ordering(Resource):
                 response.limit = ('orderid','order_date','completion_date',
                                   'status', 'note', 'order_source',
                                   'product_opts')
+        if etag:
+            return set_validators(response(), etag, fingerprint)
         return response()
 
     @staticmethod
@@ -426,12 +454,24 @@ class ItemStatus(Resource):
             message = MessagesResponse(errors=['Invalid filters supplied'],
                                        code=400)
             return message()
+
+        etag, fingerprint = None, None
+        if orderid:
+            fingerprint = espa.order_status_fingerprint(orderid)
+            if fingerprint:
+                etag = status_etag(fingerprint, request.path, user.is_staff(),
+                                   json.dumps(filters, sort_keys=True))
+                if request.if_none_match.contains(etag):
+                    return not_modified(etag, fingerprint)
+
         item_status = espa.item_status(orderid, itemnum, user.username,
                                 filters=filters)
         message = ItemsResponse(item_status, code=200)
         if not user.is_staff():
             message.limit = ('name', 'status', 'note', 'completion_date',
                              'product_dload_url', 'cksum_download_url')
+        if etag:
+            return set_validators(message(), etag, fingerprint)
         return message()
 
     @staticmethod
@@ -8,10 +8,13 @@ import datetime
 import connections
 
 
-def get_cfg(cfgfile=None):
+_parsed_cfg = dict()
+
+
+def cached_cfg(cfgfile=None):
     """
-    Retrieve the configuration information from the .cfgnfo file
-    located in the current user's home directory
+    As get_cfg, but the dict is shared by every caller and must not be
+    modified. The file is only parsed again once it has been modified
 
     :return: dict
     """
@@ -20,16 +23,35 @@ def get_cfg(cfgfile=None):
     else:
         cfg_path = cfgfile
 
-    cfg_info = {}
-    config = ConfigParser.ConfigParser()
-    config.read(cfg_path)
+    try:
+        mtime = os.stat(cfg_path).st_mtime
+    except OSError:
+        mtime = None
+
+    parsed = _parsed_cfg.get(cfg_path)
+    if parsed is None or parsed[0] != mtime:
+        cfg_info = {}
+        config = ConfigParser.ConfigParser()
+        config.read(cfg_path)
+
+        for sect in config.sections():
+            cfg_info[sect] = {}
+            for opt in config.options(sect):
+                cfg_info[sect][opt] = config.get(sect, opt)
+
+        parsed = _parsed_cfg[cfg_path] = (mtime, cfg_info)
+    return parsed[1]
 
-    for sect in config.sections():
-        cfg_info[sect] = {}
-        for opt in config.options(sect):
-            cfg_info[sect][opt] = config.get(sect, opt)
 
-    return cfg_info
+def get_cfg(cfgfile=None):
+    """
+    Retrieve the configuration information from the .cfgnfo file
+    located in the current user's home directory
+
+    :return: dict
+    """
+    # callers are free to modify what they are given
+    return {sect: dict(opts) for sect, opts in cached_cfg(cfgfile).items()}
 
 
 def api_cfg(section='config', cfgfile=None):
@@ -1,22 +1,67 @@
+import time
+import threading
+
 import requests
 
 
-def is_reachable(url, timeout=0.001, allow_redirects=True, n_tries=3):
+def head_status(url, timeout=0.001, allow_redirects=True, n_tries=3, session=None):
     """
-    Determines if the provided URL is reachable
+    HEAD the URL, trying again after connection and server (5xx) errors
 
     :param url: URL to test
     :param timeout: Seconds to wait before failing (should be small)
     :param allow_redirects: If 3xx code shouldn't be treated as the final code
     :param n_tries: Max number of times to retry connection before fail
-    :return: bool
+    :param session: requests Session to reuse connections from
+    :return: int, the last status code, or None if nothing answered
     """
+    status = None
     for _ in range(n_tries):
         try:
-            resp = requests.head(url, timeout=timeout,
-                                 allow_redirects=allow_redirects)
-            if resp.status_code == 200:
-                return True
+            status = (session or requests).head(url, timeout=timeout,
+                                                allow_redirects=allow_redirects).status_code
         except Exception as e:
-            pass
-    return False
+            continue
+        if status < 500:
+            break
+    return status
+
+
+def is_reachable(url, timeout=0.001, allow_redirects=True, n_tries=3, session=None):
+    """
+    Determines if the provided URL is reachable
+
+    :param url: URL to test
+    :param timeout: Seconds to wait before failing (should be small)
+    :param allow_redirects: If 3xx code shouldn't be treated as the final code
+    :param n_tries: Max number of times to retry connection before fail
+    :param session: requests Session to reuse connections from
+    :return: bool
+    """
+    return head_status(url, timeout, allow_redirects, n_tries, session) == 200
+
+
+_reachable = dict()
+_reachable_lock = threading.Lock()
+
+
+def cached_is_reachable(url, ttl=60, **kwargs):
+    """
+    is_reachable, remembering the answer for each URL for ttl seconds, so
+    a batch of scenes needing the same host probes it once
+
+    :param url: URL to test
+    :param ttl: seconds to remember the answer
+    :param kwargs: passed on to is_reachable
+    :return: bool
+    """
+    now = time.time()
+    with _reachable_lock:
+        cached = _reachable.get(url)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    result = is_reachable(url, **kwargs)
+    with _reachable_lock:
+        _reachable[url] = (time.time() + ttl, result)
+    return result
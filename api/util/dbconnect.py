@@ -2,11 +2,14 @@
 # TODO built in functionality
 import psycopg2
 import psycopg2.extras as db_extras
+import psycopg2.extensions as db_extns
 import numbers
 import os
+import time
 
 from collections import OrderedDict
 from api.util import api_cfg
+from api.util.querystats import query_stats
 
 def dictfetchall(cursor, fetcharr):
     ''' Returns all rows from a cursor as a dict '''
@@ -17,18 +20,51 @@ def dictfetchall(cursor, fetcharr):
 class DBConnectException(Exception):
     pass
 
+
+class LazySQL(object):
+    """
+    SQL with its parameters, only rendered (via cursor.mogrify) when turned
+    into a string, e.g. by a log handler that will actually write it out
+    """
+    def __init__(self, cursor, sql, params=None):
+        self.cursor = cursor
+        self.sql = sql
+        self.params = params
+        self._rendered = None
+
+    def __str__(self):
+        if self._rendered is None:
+            try:
+                self._rendered = self.cursor.mogrify(self.sql, self.params)
+            except psycopg2.Error:
+                # the cursor has since been closed, e.g. logging a failure
+                self._rendered = self._quoted()
+        return self._rendered
+
+    def _quoted(self):
+        quote = lambda val: db_extns.adapt(val).getquoted()
+        try:
+            if isinstance(self.params, dict):
+                return self.sql % {k: quote(v) for k, v in self.params.items()}
+            return self.sql % tuple(quote(v) for v in self.params or ())
+        except Exception:
+            return '{} {!r}'.format(self.sql, self.params)
+
 class DBConnect(object):
     """
     Class for connecting to a postgresql database using a single with statement
     """
     def __init__(self, dbhost, db, dbuser, dbpass, dbport, autocommit=False,
                  cursor_factory=db_extras.DictCursor):
+        start = time.time()
         try:
             self.conn = psycopg2.connect(host=dbhost, database=db, user=dbuser,
                                          password=dbpass, port=dbport)
             self.cursor = self.conn.cursor(cursor_factory=cursor_factory)
         except psycopg2.Error as e:
             raise DBConnectException(e)
+        finally:
+            query_stats.connected(time.time() - start)
 
         self.autocommit = autocommit
         self.fetcharr = []
@@ -47,6 +83,7 @@ class DBConnect(object):
         if params and not self.verify_type(params):
             params = self.conv_totuple(params)
 
+        start = time.time()
         try:
             self.cursor.execute(sql_str, params)
             if self.cursor.description:
@@ -57,6 +94,8 @@ class DBConnect(object):
                 self.fetcharr = self.cursor.fetchall()
         except psycopg2.Error or psycopg2.Warning as e:
             raise DBConnectException(e)
+        finally:
+            query_stats.queried(sql_str, time.time() - start)
 
         if self.autocommit:
             self.commit()
@@ -70,12 +109,23 @@ class DBConnect(object):
         if params and not self.verify_type(params):
             params = self.conv_totuple(params)
 
+        start = time.time()
         try:
             self.cursor.execute(sql_str, params)
             self.fetcharr = self.cursor.fetchall()
             self.dictfetchall = dictfetchall(self.cursor, self.fetcharr)
         except psycopg2.Error as e:
             raise DBConnectException(e)
+        finally:
+            query_stats.queried(sql_str, time.time() - start)
+
+    def mogrify_later(self, sql_str, params=None):
+        """
+        Deferred cursor.mogrify, for logging
+
+        :return: LazySQL
+        """
+        return LazySQL(self.cursor, sql_str, params)
 
     def commit(self):
         try:
@@ -0,0 +1,90 @@
+"""
+Purpose: report where the time goes when importing a module, and whether
+importing it reaches the database
+
+Usage: python -m api.util.importprofile [module] [--top N]
+"""
+import __builtin__
+import argparse
+import sys
+import time
+import traceback
+
+
+def profile(module_name):
+    """
+    Import module_name, timing every module imported along the way
+
+    :param module_name: dotted module name
+    :return: (list of (name, cumulative seconds, self seconds),
+              list of stacks where a database connection was attempted)
+    """
+    import psycopg2
+
+    timings = []
+    children = [0.0]
+    connects = []
+    original_import = __builtin__.__import__
+    original_connect = psycopg2.connect
+
+    def timed_import(name, globals=None, locals=None, fromlist=None, level=-1):
+        loaded = name in sys.modules
+        if loaded and not fromlist:
+            return original_import(name, globals, locals, fromlist, level)
+        before = len(sys.modules)
+        children.append(0.0)
+        start = time.time()
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - start
+            nested = children.pop()
+            children[-1] += elapsed
+            if len(sys.modules) > before:
+                # 'from package import submodule' loads the submodules
+                if loaded:
+                    name = '{}.{{{}}}'.format(name, ','.join(fromlist))
+                timings.append((name, elapsed, elapsed - nested))
+
+    def counted_connect(*args, **kwargs):
+        connects.append(traceback.format_stack()[:-1])
+        return original_connect(*args, **kwargs)
+
+    __builtin__.__import__ = timed_import
+    psycopg2.connect = counted_connect
+    try:
+        __import__(module_name)
+    finally:
+        __builtin__.__import__ = original_import
+        psycopg2.connect = original_connect
+
+    return timings, connects
+
+
+def report(module_name, top=20, out=sys.stdout):
+    timings, connects = profile(module_name)
+    total = sum(t[2] for t in timings)
+
+    out.write('import {}: {:.3f}s, {} modules, {} database connections\n'
+              .format(module_name, total, len(timings), len(connects)))
+    out.write('\n{:>10} {:>10}  module\n'.format('cumulative', 'self'))
+    for name, elapsed, own in sorted(timings, key=lambda t: -t[2])[:top]:
+        out.write('{:>10.4f} {:>10.4f}  {}\n'.format(elapsed, own, name))
+
+    for stack in connects:
+        out.write('\ndatabase connection during import:\n')
+        out.write(''.join(s for s in stack if '/api/' in s))
+    return len(connects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('module', nargs='?', default='api.transports.http')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    # a non-zero exit signals the import reached the database
+    sys.exit(1 if report(args.module, args.top) else 0)
+
+
+if __name__ == '__main__':
+    main()
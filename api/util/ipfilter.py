@@ -0,0 +1,143 @@
+"""
+Purpose: match client addresses against configured white/black lists
+
+Lists are compiled once into a set of exact addresses plus a set of
+networks per CIDR prefix length, and recompiled only when the configured
+value changes
+"""
+import os
+import socket
+import struct
+import threading
+
+from api.util import cached_cfg
+from api.system.logger import ilogger as logger
+
+
+def ip_to_int(address):
+    """
+    Convert an IPv4 or IPv6 address to (family, int)
+
+    :param address: address string
+    :return: tuple, or None if not an IP address
+    """
+    for family, width in ((socket.AF_INET, 4), (socket.AF_INET6, 16)):
+        try:
+            packed = socket.inet_pton(family, address)
+        except (socket.error, ValueError, TypeError):
+            continue
+        high, low = struct.unpack('!QQ', packed.rjust(16, '\0'))
+        return family, (high << 64) | low
+    return None
+
+
+class IPFilter(object):
+    """
+    Set of addresses and CIDR networks, e.g. '10.0.0.1,192.168.0.0/16'
+
+    Malformed networks are logged and left out, rather than failing the
+    whole list
+    """
+    def __init__(self, entries):
+        self.addresses = set()
+        # {(family, prefix length): (mask, set of network ints)}
+        self.networks = dict()
+
+        for entry in entries:
+            entry = entry.strip()
+            if not entry:
+                continue
+            if '/' not in entry:
+                self.addresses.add(entry)
+                parsed = ip_to_int(entry)
+                if parsed:
+                    self.addresses.add(parsed)
+                continue
+
+            address, _, prefix = entry.partition('/')
+            parsed = ip_to_int(address)
+            if parsed is None or not prefix.isdigit():
+                logger.warning('Skipping invalid network: {}'.format(entry))
+                continue
+            family, value = parsed
+            bits = 32 if family == socket.AF_INET else 128
+            prefix = int(prefix)
+            if prefix > bits:
+                logger.warning('Skipping invalid network, prefix out of range: {}'.format(entry))
+                continue
+            mask = ((1 << bits) - 1) ^ ((1 << (bits - prefix)) - 1)
+            key = (family, prefix)
+            self.networks.setdefault(key, (mask, set()))[1].add(value & mask)
+
+    def __contains__(self, address):
+        if address in self.addresses:
+            return True
+        parsed = ip_to_int(address)
+        if parsed is None:
+            return False
+        if parsed in self.addresses:
+            return True
+        family, value = parsed
+        for (net_family, _), (mask, nets) in self.networks.iteritems():
+            if net_family == family and value & mask in nets:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.addresses) + sum(len(n) for _, n in self.networks.values())
+
+    def __repr__(self):
+        return 'IPFilter({!r})'.format(sorted(self.addresses))
+
+
+_compiled = dict()
+_compiled_lock = threading.Lock()
+
+
+def compiled(entries):
+    """
+    Compile a list, or comma separated string, of addresses, reusing the
+    result for as long as the same value is passed in
+
+    :param entries: str, list, or None
+    :return: IPFilter
+    """
+    if isinstance(entries, basestring):
+        key = entries
+    elif isinstance(entries, (list, tuple, set, frozenset)):
+        key = tuple(entries)
+    else:
+        # e.g. an error message in place of a list
+        key = ()
+
+    ipfilter = _compiled.get(key)
+    if ipfilter is None:
+        values = key.split(',') if isinstance(key, basestring) else key
+        ipfilter = IPFilter(values)
+        with _compiled_lock:
+            if len(_compiled) > 64:
+                _compiled.clear()
+            _compiled[key] = ipfilter
+    return ipfilter
+
+
+class ConfigLists(object):
+    """
+    Values from the [config] section of the api INI, re-read only when the
+    file is modified
+    """
+    def __init__(self, cfgfile=None):
+        self.cfgfile = cfgfile
+
+    def get(self, name, default=''):
+        path = self.cfgfile or os.environ['ESPA_CONFIG_PATH']
+        return cached_cfg(path)['config'].get(name, default)
+
+    def filter(self, name):
+        """
+        :return: IPFilter for the named list
+        """
+        return compiled(self.get(name))
+
+
+config_lists = ConfigLists()
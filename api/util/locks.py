@@ -0,0 +1,93 @@
+"""
+Purpose: mutual exclusion across hosts and workers, through Postgres
+session-level advisory locks
+"""
+import zlib
+
+from api.util.dbconnect import db_instance, DBConnectException
+
+# first half of every two-key advisory lock taken here, 'ESPA'
+LOCK_SPACE = 0x45535041
+
+
+def lock_key(name):
+    """
+    :param name: lock name
+    :return: int, stable across processes and hosts
+    """
+    return zlib.crc32(name) & 0x7fffffff
+
+
+class AdvisoryLock(object):
+    """
+    A named lock held by a dedicated database connection, so it is released
+    when the holder exits, or its connection is lost
+
+        with AdvisoryLock('handle_orders') as lock:
+            if not lock.acquired:
+                return lock.holder()
+    """
+    def __init__(self, name):
+        self.name = name
+        self.key = lock_key(name)
+        self.db = None
+        self.acquired = False
+
+    def acquire(self):
+        """
+        Take the lock, without waiting
+
+        :return: bool, whether it was taken
+        """
+        db = db_instance()
+        try:
+            db.select('select pg_try_advisory_lock(%s, %s)', (LOCK_SPACE, self.key))
+            self.acquired = bool(db[0][0])
+            # session locks outlive the transaction, don't sit idle in one
+            db.commit()
+        except DBConnectException:
+            db.__exit__(None, None, None)
+            raise
+
+        if self.acquired:
+            self.db = db
+        else:
+            db.__exit__(None, None, None)
+        return self.acquired
+
+    def release(self):
+        if self.db is None:
+            return
+        try:
+            self.db.select('select pg_advisory_unlock(%s, %s)', (LOCK_SPACE, self.key))
+        finally:
+            # closing the connection drops the lock regardless
+            self.db.__exit__(None, None, None)
+            self.db = None
+            self.acquired = False
+
+    def holder(self):
+        """
+        Who has the lock, and since when: the holder's connection is opened
+        to take it
+
+        :return: dict (started, client_addr, pid), or None if it is free
+        """
+        sql = ('select a.backend_start, a.client_addr, a.pid '
+               'from pg_locks l join pg_stat_activity a on a.pid = l.pid '
+               'where l.locktype = %s and l.classid = %s and l.objid = %s '
+               'and l.objsubid = 2 and l.granted')
+        with db_instance() as db:
+            db.select(sql, ('advisory', LOCK_SPACE, self.key))
+            if not db:
+                return None
+            started, client_addr, pid = db[0]
+        return {'started': started.isoformat() if started else None,
+                'client_addr': client_addr, 'pid': pid}
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
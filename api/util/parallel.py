@@ -0,0 +1,74 @@
+"""
+Purpose: call a function over many items on a bounded number of threads,
+optionally rate limited, e.g. to poll an external service
+"""
+import time
+import Queue
+import threading
+
+
+class RateLimiter(object):
+    """
+    Spaces calls to wait() at least 1/rate seconds apart, across threads
+    """
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def parallel_map(func, items, workers=4, rate=None):
+    """
+    Call func(item) for each item, on up to workers threads and at most rate
+    calls per second
+
+    An exception raised by one call is returned with its item, it does not
+    stop the others
+
+    :return: [(item, result, exception or None)], in the order of items
+    """
+    items = list(items)
+    limiter = RateLimiter(rate)
+    results = [None] * len(items)
+
+    def call(i):
+        limiter.wait()
+        try:
+            results[i] = (items[i], func(items[i]), None)
+        except Exception as e:
+            results[i] = (items[i], None, e)
+
+    if workers <= 1 or len(items) <= 1:
+        for i in range(len(items)):
+            call(i)
+        return results
+
+    todo = Queue.Queue()
+    for i in range(len(items)):
+        todo.put(i)
+
+    def work():
+        while True:
+            try:
+                i = todo.get_nowait()
+            except Queue.Empty:
+                return
+            call(i)
+
+    threads = [threading.Thread(target=work) for _ in range(min(workers, len(items)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
@@ -0,0 +1,120 @@
+"""
+Purpose: count and time the database work done per request, or per
+provider call, and point out slow statements
+"""
+import re
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from api.util import api_cfg
+
+
+class QueryCounter(object):
+    """
+    Database work done within one scope
+    """
+    def __init__(self, name):
+        self.name = name
+        self.connections = 0
+        self.connect_time = 0.0
+        self.queries = 0
+        self.query_time = 0.0
+        self.started = time.time()
+
+    def as_dict(self):
+        return {'scope': self.name,
+                'connections': self.connections,
+                'connect_ms': int(self.connect_time * 1000),
+                'queries': self.queries,
+                'query_ms': int(self.query_time * 1000),
+                'elapsed_ms': int((time.time() - self.started) * 1000)}
+
+    def headers(self):
+        return {'X-DB-Connections': str(self.connections),
+                'X-DB-Connect-Ms': str(int(self.connect_time * 1000)),
+                'X-DB-Queries': str(self.queries),
+                'X-DB-Query-Ms': str(int(self.query_time * 1000))}
+
+    def __str__(self):
+        return json.dumps(self.as_dict(), sort_keys=True)
+
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_lists = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s)\s*,?)+\)')
+_spaces = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Reduce a statement to its shape, so the same query with different
+    values is reported alike
+
+    :return: (hash, normalized sql)
+    """
+    shape = _literals.sub('?', sql)
+    shape = _lists.sub('(?)', shape)
+    shape = _spaces.sub(' ', shape).strip().lower()
+    return hashlib.md5(shape).hexdigest()[:12], shape
+
+
+class QueryStats(threading.local):
+    """
+    Per thread stack of QueryCounters, every query counts towards each
+    scope it happens within
+    """
+    default_slow_ms = 500
+
+    def __init__(self):
+        self.scopes = []
+        self._slow_ms = None
+
+    @property
+    def slow_ms(self):
+        if self._slow_ms is None:
+            self._slow_ms = int(api_cfg().get('slow_query_ms', self.default_slow_ms))
+        return self._slow_ms
+
+    def begin(self, name):
+        counter = QueryCounter(name)
+        self.scopes.append(counter)
+        return counter
+
+    def end(self, counter):
+        if counter in self.scopes:
+            self.scopes.remove(counter)
+        return counter
+
+    def reset(self):
+        del self.scopes[:]
+
+    @contextmanager
+    def scope(self, name):
+        counter = self.begin(name)
+        try:
+            yield counter
+        finally:
+            self.end(counter)
+
+    def connected(self, elapsed):
+        for counter in self.scopes:
+            counter.connections += 1
+            counter.connect_time += elapsed
+
+    def queried(self, sql, elapsed):
+        for counter in self.scopes:
+            counter.queries += 1
+            counter.query_time += elapsed
+
+        if elapsed * 1000 >= self.slow_ms:
+            # imported here, as the logger depends on the database module
+            from api.system.logger import ilogger as logger
+            digest, shape = fingerprint(sql)
+            logger.warning('slow query %dms fingerprint=%s scope=%s sql: %s',
+                           elapsed * 1000, digest,
+                           self.scopes[-1].name if self.scopes else None, shape)
+
+
+query_stats = QueryStats()
@@ -0,0 +1,55 @@
+"""
+Purpose: collapse concurrent calls for the same key into a single call
+"""
+import sys
+import threading
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Threads asking for a key which is already being computed wait for,
+    and share, the result of the call in progress instead of making
+    their own
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = dict()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs), unless a call for key is in progress
+
+        :param key: hashable identifying the call
+        :param func: callable to run
+        :return: the (possibly shared) result of func
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error[0], call.error[1], call.error[2]
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except:
+            call.error = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
@@ -3,8 +3,11 @@ Purpose: Easy access to run remote ssh commands.
 Original Author: David V. Hill
 '''
 
+import time
+
 import paramiko
 from api.system.logger import ilogger as logger
+from api.providers.metrics.registry import registry
 
 
 class RemoteHost(object):
@@ -20,6 +23,7 @@ class RemoteHost(object):
 
     def execute(self, command):
         """ """
+        start = time.time()
         try:
             if self.debug is True:
                 logger.critical("Attempting to run [%s] on %s as %s" %
@@ -44,6 +48,7 @@ class RemoteHost(object):
             return {'stdout': stdout.readlines(), 'stderr': stderr.readlines()}
 
         except paramiko.SSHException as e:
+            registry.inc('espa_external_request_errors_total', service='ssh', host=self.host)
             logger.critical('Failed running [{}]'
                             ' on {} as {} exception: {}'
                             .format(command, self.host, self.user, e))
@@ -54,6 +59,8 @@ class RemoteHost(object):
             if self.client is not None:
                 self.client.close()
                 self.client = None
+            registry.observe('espa_external_request_seconds', time.time() - start,
+                             service='ssh', host=self.host)
 
     def execute_script(self, script, interpreter):
         raise NotImplementedError
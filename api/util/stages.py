@@ -0,0 +1,254 @@
+"""
+Purpose: time the stages of a long running job, such as handle_orders,
+run the independent ones concurrently, and optionally profile the whole run
+"""
+import os
+import time
+import Queue
+import threading
+import traceback
+import pstats
+import cProfile
+import datetime
+import tempfile
+from contextlib import contextmanager
+from cStringIO import StringIO
+
+from api.providers.metrics.registry import registry
+from api.system.logger import ilogger as logger
+from api.util.querystats import query_stats
+
+
+class StageTimer(object):
+    """
+    Collects a span per stage: elapsed seconds, rows handled, and the
+    database queries made
+    """
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.started = time.time()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a stage, the caller may set span['rows'] to the number of
+        rows it handled
+
+        :return: the span dict
+        """
+        span = {'stage': name, 'rows': None}
+        start = time.time()
+        try:
+            with query_stats.scope('{}.{}'.format(self.name, name)) as counter:
+                yield span
+        except Exception:
+            span['error'] = True
+            raise
+        finally:
+            span['seconds'] = round(time.time() - start, 3)
+            span['queries'] = counter.queries
+            self.spans.append(span)
+            registry.observe('espa_stage_seconds', span['seconds'], job=self.name, stage=name)
+            logger.info('%s stage %s: %ss, rows: %s, queries: %s', self.name, name,
+                        span['seconds'], span['rows'], span['queries'])
+
+    def summary(self):
+        return {'job': self.name,
+                'seconds': round(time.time() - self.started, 3),
+                'stages': self.spans}
+
+
+class StageScheduler(object):
+    """
+    Runs stages on a bounded number of threads, each as soon as the stages
+    it depends on have settled
+
+    A stage which raises is logged and recorded, it does not stop the
+    others. A stage still running after its timeout is abandoned (a thread
+    cannot be killed): the run no longer waits on it, join() does, for a
+    while, e.g. before releasing a lock held for the whole run
+
+    With workers=0 the stages run one at a time in the calling thread, in the
+    order added and without timeouts, e.g. to profile them
+
+    Stages added with lock=True run only while holding lock('<job>.<stage>'),
+    a context manager whose value has an acquired attribute, e.g.
+    api.util.locks.AdvisoryLock. They are marked 'locked' if it is held
+    elsewhere
+    """
+    def __init__(self, timer, workers=4, timeout=1800, lock=None):
+        self.timer = timer
+        self.workers = workers
+        self.timeout = timeout
+        self.lock = lock
+        self.stages = []
+        # {stage name: 'ok', 'error', 'timeout', 'locked' or 'skipped'}
+        self.status = dict()
+        # {stage name: thread}, timed out stages which may still be running
+        self.abandoned = dict()
+
+    def add(self, name, func, after=(), needs=(), settled=(), timeout=None, lock=False):
+        """
+        :param name: stage name
+        :param func: callable, may return the number of rows it handled
+        :param after: stages to wait for, whatever their outcome
+        :param needs: stages to wait for, skipping this one unless they succeed
+        :param settled: stages to wait for, skipping this one if any timed
+                        out, as they may still be running
+        :param timeout: seconds to wait for this stage, defaults to the
+                        scheduler's
+        :param lock: run only while holding the stage's lock
+        """
+        known = [s['name'] for s in self.stages]
+        missing = set(after) | set(needs) | set(settled)
+        missing.difference_update(known)
+        if missing:
+            raise ValueError('{} depends on unknown stages: {}'.format(name, sorted(missing)))
+        if lock and self.lock is None:
+            raise ValueError('{} needs a lock, the scheduler has none'.format(name))
+        self.stages.append({'name': name, 'func': func,
+                            'after': tuple(after) + tuple(needs) + tuple(settled),
+                            'needs': tuple(needs), 'settled': tuple(settled),
+                            'timeout': timeout or self.timeout, 'lock': lock})
+
+    def _call(self, stage):
+        with self.timer.stage(stage['name']) as span:
+            span['rows'] = stage['func']()
+
+    def _work(self, stage, done):
+        try:
+            if stage['lock']:
+                with self.lock('{}.{}'.format(self.timer.name, stage['name'])) as lock:
+                    if not lock.acquired:
+                        logger.warning('%s stage %s skipped, locked elsewhere',
+                                       self.timer.name, stage['name'])
+                        done.put((stage['name'], 'locked'))
+                        return
+                    self._call(stage)
+            else:
+                self._call(stage)
+            done.put((stage['name'], 'ok'))
+        except Exception:
+            logger.critical('ERR %s stage %s. trace: %s', self.timer.name,
+                            stage['name'], traceback.format_exc())
+            done.put((stage['name'], 'error'))
+
+    def _ready(self, stage):
+        if any(self.status[d] != 'ok' for d in stage['needs']):
+            logger.warning('%s stage %s skipped, needs: %s', self.timer.name,
+                           stage['name'], ', '.join(stage['needs']))
+            self.status[stage['name']] = 'skipped'
+            return False
+        running = [d for d in stage['settled'] if self.status[d] == 'timeout']
+        if running:
+            logger.warning('%s stage %s skipped, still running: %s', self.timer.name,
+                           stage['name'], ', '.join(running))
+            self.status[stage['name']] = 'skipped'
+            return False
+        return True
+
+    def run(self):
+        """
+        Run every stage, returning once each has settled
+
+        :return: dict, the status of each stage
+        """
+        done = Queue.Queue()
+        if self.workers < 1:
+            for stage in self.stages:
+                if self._ready(stage):
+                    self._work(stage, done)
+                    self.status[stage['name']] = done.get()[1]
+            return self.status
+
+        waiting = list(self.stages)
+        running = dict()
+        threads = dict()
+
+        while waiting or running:
+            for stage in list(waiting):
+                if len(running) >= self.workers:
+                    break
+                if any(d not in self.status for d in stage['after']):
+                    continue
+                waiting.remove(stage)
+                if not self._ready(stage):
+                    continue
+                worker = threading.Thread(target=self._work, args=(stage, done),
+                                          name='{}-{}'.format(self.timer.name, stage['name']))
+                worker.daemon = True
+                worker.start()
+                threads[stage['name']] = worker
+                running[stage['name']] = time.time() + stage['timeout']
+
+            if not running:
+                # everything left was skipped
+                continue
+
+            try:
+                name, status = done.get(timeout=max(0, min(running.values()) - time.time()))
+                if name in running:
+                    del running[name]
+                    self.status[name] = status
+            except Queue.Empty:
+                now = time.time()
+                for name, deadline in running.items():
+                    if deadline <= now:
+                        logger.critical('ERR %s stage %s timed out, no longer waiting on it',
+                                        self.timer.name, name)
+                        del running[name]
+                        self.status[name] = 'timeout'
+                        self.abandoned[name] = threads[name]
+        return self.status
+
+    def join(self, timeout=None):
+        """
+        Wait for the stages abandoned by run() to actually finish
+
+        :param timeout: seconds to wait for all of them, None to wait as
+                        long as it takes
+        :return: [names of the stages still running]
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        for name, worker in sorted(self.abandoned.items()):
+            if worker.is_alive():
+                logger.warning('%s waiting on timed out stage %s to finish',
+                               self.timer.name, name)
+                worker.join(max(0, deadline - time.time()) if deadline else None)
+        running = sorted(n for n, w in self.abandoned.items() if w.is_alive())
+        if running:
+            logger.critical('ERR %s stages still running, no longer waiting on them: %s',
+                            self.timer.name, ', '.join(running))
+        self.abandoned = dict((n, self.abandoned[n]) for n in running)
+        return running
+
+
+@contextmanager
+def profiled(name, enabled=True, top=25):
+    """
+    Run the enclosed block under cProfile, if enabled, dumping the stats to
+    $ESPA_PROFILE_DIR (or the temp directory)
+
+    :return: dict, filled in with the dump path and a text report on exit
+    """
+    report = dict()
+    if not enabled:
+        yield report
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield report
+    finally:
+        profile.disable()
+        directory = os.getenv('ESPA_PROFILE_DIR', tempfile.gettempdir())
+        path = os.path.join(directory, '{}-{}-{}.prof'.format(
+            name, datetime.datetime.now().strftime('%Y%m%d-%H%M%S'), os.getpid()))
+        profile.dump_stats(path)
+
+        out = StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(top)
+        report.update(path=path, top=out.getvalue())
+        logger.info('%s profile written to %s', name, path)
@@ -0,0 +1,119 @@
+"""
+Purpose: end to end benchmark of the ordering and production paths, through
+the real HTTP clients, against the stub services (api/external/mocks/server.py)
+and a local Postgres loaded with the unit test schema (setup/docker-compose.yml)
+
+Only the espa_unit_test schema is used, see benchmarks/environment.py
+
+    ESPA_CONFIG_PATH=~/.usgs/.cfgnfo python -m benchmarks.e2e --rounds 5 \\
+        --latency .05 --output bench.json --baseline previous.json
+"""
+import sys
+import time
+import argparse
+
+from benchmarks.environment import StubEnvironment
+from benchmarks.report import summarize, write
+from api.external.mocks import server
+from api.util.dbconnect import db_instance
+from api.util.querystats import query_stats
+
+
+class Benchmark(object):
+    def __init__(self, stub, scenes=50, rounds=5):
+        self.stub = stub
+        self.scenes = scenes
+        self.rounds = rounds
+
+    # scenarios ===============================================================
+    def timed(self, func, items=1):
+        seconds = []
+        queries = []
+        for _ in range(self.rounds):
+            with query_stats.scope('benchmark') as counter:
+                start = time.time()
+                func()
+                seconds.append(time.time() - start)
+            queries.append(counter.queries)
+        result = summarize(seconds, items)
+        result['queries'] = max(queries)
+        return result
+
+    def place_order(self):
+        from api.domain.user import User
+        from api.interfaces.ordering.version1 import API
+
+        user = User('bench_user', 'bench@example.com', 'bench', 'user', '900001')
+        api = API()
+        names = [server.landsat_id(0, n) for n in range(self.scenes)]
+
+        def place():
+            order = {'olitirs8_collection': {'inputs': names, 'products': ['sr']},
+                     'format': 'gtiff'}
+            api.place_order(order, user)
+            # the open scene limit would otherwise stop later rounds
+            with db_instance() as db:
+                db.execute("update ordering_scene set status = 'complete' "
+                           "where status = 'submitted'")
+                db.commit()
+
+        return self.timed(place, self.scenes)
+
+    def handle_orders(self):
+        from api.providers.production.production_provider import ProductionProvider
+        provider = ProductionProvider()
+        stages = dict()
+
+        def handle():
+            summary = provider.handle_orders(report=True)
+            for span in summary.get('stages', []) if isinstance(summary, dict) else []:
+                stages.setdefault(span['stage'], []).append(span['seconds'])
+
+        result = self.timed(handle, self.stub.options.orders * self.stub.options.units)
+        result['stages'] = {k: round(sum(v) / len(v), 4) for k, v in stages.items()}
+        return result
+
+    def get_products_to_process(self):
+        from api.providers.production.production_provider import ProductionProvider
+        provider = ProductionProvider()
+        return self.timed(lambda: provider.get_products_to_process(record_limit=500), 500)
+
+    def run(self):
+        with StubEnvironment(self.stub):
+            scenarios = dict()
+            for name in ('place_order', 'handle_orders', 'get_products_to_process'):
+                scenarios[name] = getattr(self, name)()
+        return {'scenarios': scenarios, 'stub_requests': dict(self.stub.requests),
+                'options': dict(vars(self.stub.options), scenes=self.scenes, rounds=self.rounds)}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='End to end benchmark against stub services')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--scenes', type=int, default=50, help='scenes per placed order')
+    parser.add_argument('--orders', type=int, default=10, help='orders in the EE queue')
+    parser.add_argument('--units', type=int, default=10, help='scenes per EE order')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--missing-rate', type=float, default=0.0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction slower than the baseline counted as a regression')
+    args = parser.parse_args(argv)
+
+    options = server.StubOptions(latency=args.latency, jitter=args.jitter,
+                                 error_rate=args.error_rate, missing_rate=args.missing_rate,
+                                 orders=args.orders, units=args.units)
+    stub = server.start(options=options)
+    try:
+        results = Benchmark(stub, scenes=args.scenes, rounds=args.rounds).run()
+    finally:
+        stub.shutdown()
+
+    return write(results, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
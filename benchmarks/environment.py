@@ -0,0 +1,98 @@
+"""
+Purpose: point the unit test schema's configuration at the stub services for
+the length of a benchmark, and leave it as it was found
+
+Only the espa_unit_test schema is used, and it is emptied of orders and users
+before and after
+"""
+import os
+
+from api.util.dbconnect import db_instance
+from api.providers.configuration.configuration_provider import ConfigurationProvider
+
+config = ConfigurationProvider()
+
+
+def put(key, value):
+    # not config.put, which writes a backup of the whole table each time
+    sql = ('insert into ordering_configuration (key, value) values (%s, %s) '
+           'on conflict (key) do update set value = %s')
+    with db_instance() as db:
+        db.execute(sql, (key, value, value))
+        db.commit()
+
+
+def delete(key):
+    with db_instance() as db:
+        db.execute('delete from ordering_configuration where key = %s', (key,))
+        db.commit()
+
+
+def in_test_schema():
+    with db_instance() as db:
+        db.select('select current_schema()')
+        return db[0][0] == 'espa_unit_test'
+
+
+def clean():
+    from api.domain.mocks.order import MockOrder
+    from api.domain.mocks.user import MockUser
+    MockOrder().tear_down_testing_orders()
+    MockUser().cleanup()
+
+
+class StubEnvironment(object):
+    """
+    :param stub: a running api.external.mocks.server.StubServer
+    :param settings: {key: value}, further configuration for the benchmark
+    """
+    def __init__(self, stub, settings=None):
+        self.stub = stub
+        self.settings = settings or dict()
+        self._saved = dict()
+        self._testing = None
+
+    def stub_settings(self):
+        mode = config.mode
+        url = self.stub.url
+        settings = {'url.{}.earthexplorer.json'.format(mode): url + '/inventory/json/',
+                    'url.{}.ersapi'.format(mode): url,
+                    'url.{}.mesos_master'.format(mode): url,
+                    'url.{}.modis.datapool'.format(mode): url + '/',
+                    'url.{}.viirs.datapool'.format(mode): url + '/',
+                    'system.m2m_val_enabled': 'True',
+                    'system.load_ee_orders_enabled': 'True'}
+        settings.update(self.settings)
+        return settings
+
+    def _restore_testing(self):
+        if self._testing is None:
+            os.environ.pop('espa_api_testing', None)
+        else:
+            os.environ['espa_api_testing'] = self._testing
+
+    def __enter__(self):
+        # connections made from here on use the espa_unit_test schema
+        self._testing = os.environ.get('espa_api_testing')
+        os.environ['espa_api_testing'] = 'True'
+        if not in_test_schema():
+            self._restore_testing()
+            raise RuntimeError('Not connected to the espa_unit_test schema, '
+                               'leaving the configuration alone')
+        clean()
+        current = config.configuration_keys
+        for key, value in self.stub_settings().items():
+            self._saved[key] = current.get(key)
+            put(key, value)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            for key, value in self._saved.items():
+                if value is None:
+                    delete(key)
+                else:
+                    put(key, value)
+            clean()
+        finally:
+            self._restore_testing()
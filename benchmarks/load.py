@@ -0,0 +1,323 @@
+"""
+Purpose: load test the Flask transports (api.transports.http.app) with the
+traffic mixes seen in production, against a local Postgres loaded with the
+unit test schema and the stub USGS services (api/external/mocks/server.py)
+
+    ESPA_CONFIG_PATH=~/.usgs/.cfgnfo python -m benchmarks.load \\
+        --mix steady --mix completions --workers 20 --duration 60 --output load.json
+
+Mixes, the share of each request in them:
+
+    downloaders   bulk downloaders polling item-status (with If-None-Match)
+                  and list-orders
+    ordering      users placing orders, and checking on them
+    scheduler     the processing scheduler polling for products and marking
+                  them queued
+    completions   a burst of mark_product_complete, until every processing
+                  product is done
+    steady        all of the above, in production proportions
+
+Latency (p50, p95, p99), throughput, status codes and the database queries
+(the X-DB-Queries response header) are reported for each endpoint of a mix
+"""
+import sys
+import json
+import time
+import Queue
+import random
+import argparse
+import threading
+
+from benchmarks.environment import StubEnvironment
+from benchmarks.report import summarize, write
+from api.external.mocks import server
+from api.util.dbconnect import db_instance
+
+import requests
+from werkzeug.serving import make_server
+
+MIXES = {'downloaders': (('item_status', 85), ('list_orders', 15)),
+         'ordering': (('order', 70), ('item_status', 30)),
+         'scheduler': (('products', 60), ('update_status', 40)),
+         'completions': (('complete', 100),),
+         'steady': (('item_status', 55), ('list_orders', 5), ('products', 20),
+                    ('update_status', 10), ('order', 5), ('complete', 5))}
+
+PASSWORD = 'load-test'
+
+# returned by a request with nothing left to do, error responses are falsy
+NOTHING = object()
+
+# how each request is reported
+ENDPOINTS = {'item_status': 'GET /api/v1/item-status/<orderid>',
+             'list_orders': 'GET /api/v1/list-orders',
+             'order': 'POST /api/v1/order',
+             'products': 'GET /production-api/v1/products',
+             'update_status': 'POST /production-api/v1/update_status',
+             'complete': 'POST /production-api/v1/mark_product_complete'}
+
+
+def serve():
+    """
+    The real application, on a free port, from a background thread
+
+    :return: werkzeug server, stop it with shutdown()
+    """
+    from api.transports.http import app
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, name='load-app')
+    thread.daemon = True
+    thread.start()
+    return httpd
+
+
+class Results(object):
+    """
+    Request timings by endpoint, shared by the workers
+    """
+    def __init__(self):
+        self.samples = dict()
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, response):
+        queries = response.headers.get('X-DB-Queries') if response is not None else None
+        status = response.status_code if response is not None else 'failed'
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(
+                (seconds, status, int(queries) if queries else None))
+
+    def summary(self, elapsed):
+        endpoints = dict()
+        for endpoint, samples in self.samples.items():
+            seconds = [s[0] for s in samples]
+            queries = [s[2] for s in samples if s[2] is not None]
+            statuses = dict()
+            for _, status, _ in samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            result = summarize(seconds)
+            result.update({'requests': len(samples),
+                           'throughput': round(len(samples) / float(elapsed), 2) if elapsed else None,
+                           'status': statuses,
+                           'errors': sum(n for s, n in statuses.items()
+                                         if not s.startswith(('2', '3'))),
+                           'queries_mean': None, 'queries_max': None})
+            if queries:
+                result.update(queries_mean=round(sum(queries) / float(len(queries)), 2),
+                              queries_max=max(queries))
+            endpoints[endpoint] = result
+        return endpoints
+
+
+class LoadTest(object):
+    """
+    :param url: base url of the application
+    :param accounts: ordering users, each logged in through the stub ERS
+    :param orders: orders placed by each account before the load starts
+    :param scenes: scenes in each order
+    """
+    def __init__(self, url, accounts=5, orders=3, scenes=10, seed=0):
+        self.url = url
+        self.accounts = ['load_user_{}'.format(n) for n in range(accounts)]
+        self.orders = orders
+        self.scenes = scenes
+        self.seed = seed
+        self.placed = dict()       # username: [orderid]
+        self.oncache = []          # [(name, orderid)]
+        self.processing = Queue.Queue()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def next_inputs(self):
+        with self._lock:
+            start = self._count
+            self._count += self.scenes
+        return [server.landsat_id(self.seed, n) for n in range(start, start + self.scenes)]
+
+    def order_body(self):
+        return {'olitirs8_collection': {'inputs': self.next_inputs(), 'products': ['sr']},
+                'format': 'gtiff', 'note': 'load test'}
+
+    # setup ===================================================================
+    def setup(self):
+        """
+        Place the starting orders through the API, then split their products
+        between oncache, for the scheduler, and processing, for completions
+        """
+        session = requests.Session()
+        for username in self.accounts:
+            self.placed[username] = []
+            for _ in range(self.orders):
+                resp = session.post(self.url + '/api/v1/order', auth=(username, PASSWORD),
+                                    data=json.dumps(self.order_body()))
+                resp.raise_for_status()
+                self.placed[username].append(resp.json()['orderid'])
+
+        with db_instance() as db:
+            db.select("select s.id, s.name, o.orderid from ordering_scene s "
+                      "join ordering_order o on o.id = s.order_id order by s.id")
+            rows = [(r['id'], r['name'], r['orderid']) for r in db]
+            half = len(rows) // 2
+            oncache, processing = rows[:half], rows[half:]
+            if oncache:
+                db.execute("update ordering_scene set status = 'oncache' where id in %s",
+                           (tuple(r[0] for r in oncache),))
+            if processing:
+                db.execute("update ordering_scene set status = 'processing' where id in %s",
+                           (tuple(r[0] for r in processing),))
+            db.commit()
+
+        self.oncache = [(name, orderid) for _, name, orderid in oncache]
+        for _, name, orderid in processing:
+            self.processing.put((name, orderid))
+
+    # requests ================================================================
+    # each returns the response, or NOTHING when it has nothing left to do
+    def item_status(self, session, rand, state):
+        username = rand.choice(self.accounts)
+        orderid = rand.choice(self.placed[username])
+        headers = dict()
+        if orderid in state:
+            headers['If-None-Match'] = state[orderid]
+        resp = session.get('{}/api/v1/item-status/{}'.format(self.url, orderid),
+                           auth=(username, PASSWORD), headers=headers)
+        if resp.headers.get('ETag'):
+            state[orderid] = resp.headers['ETag']
+        return resp
+
+    def list_orders(self, session, rand, state):
+        username = rand.choice(self.accounts)
+        return session.get(self.url + '/api/v1/list-orders', auth=(username, PASSWORD))
+
+    def order(self, session, rand, state):
+        username = rand.choice(self.accounts)
+        resp = session.post(self.url + '/api/v1/order', auth=(username, PASSWORD),
+                            data=json.dumps(self.order_body()))
+        if resp.status_code == 201:
+            with self._lock:
+                self.placed[username].append(resp.json()['orderid'])
+        return resp
+
+    def products(self, session, rand, state):
+        params = {'record_limit': 50, 'product_types': rand.choice(('landsat', 'modis'))}
+        return session.get(self.url + '/production-api/v1/products', params=params)
+
+    def update_status(self, session, rand, state):
+        if not self.oncache:
+            return NOTHING
+        name, orderid = rand.choice(self.oncache)
+        body = {'name': name, 'orderid': orderid, 'processing_loc': 'load-test', 'status': 'queued'}
+        return session.post(self.url + '/production-api/v1/update_status', data=json.dumps(body))
+
+    def complete(self, session, rand, state):
+        try:
+            name, orderid = self.processing.get_nowait()
+        except Queue.Empty:
+            return NOTHING
+        body = {'name': name, 'orderid': orderid, 'processing_loc': 'load-test',
+                'completed_file_location': '/output/{}/{}.tar.gz'.format(orderid, name),
+                'cksum_file_location': '/output/{}/{}.md5'.format(orderid, name),
+                'log_file_contents': 'processing complete\n' * 200}
+        return session.post(self.url + '/production-api/v1/mark_product_complete',
+                            data=json.dumps(body))
+
+    # driver ==================================================================
+    def run(self, mix, workers=10, duration=30, limit=None):
+        """
+        Send the mix's requests from workers threads, until duration seconds
+        pass, limit requests are sent, or none of the mix has anything left to do
+
+        :return: dict, by endpoint, and the mix's elapsed seconds
+        """
+        weighted = []
+        for name, weight in MIXES[mix]:
+            weighted.extend([name] * weight)
+
+        results = Results()
+        sent = [0]
+        deadline = time.time() + duration
+
+        def work(index):
+            rand = random.Random('{}:{}:{}'.format(self.seed, mix, index))
+            session = requests.Session()
+            state = dict()
+            idle = 0
+            while time.time() < deadline and idle < 100:
+                with self._lock:
+                    if limit and sent[0] >= limit:
+                        return
+                    sent[0] += 1
+                name = rand.choice(weighted)
+                start = time.time()
+                try:
+                    resp = getattr(self, name)(session, rand, state)
+                except requests.RequestException:
+                    resp = None
+                if resp is NOTHING:
+                    idle += 1
+                    with self._lock:
+                        sent[0] -= 1
+                    continue
+                idle = 0
+                results.add(ENDPOINTS[name], time.time() - start, resp)
+
+        started = time.time()
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - started
+        return results.summary(elapsed), elapsed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Load test the Flask transports')
+    parser.add_argument('--mix', action='append', choices=sorted(MIXES),
+                        help='run this mix, repeatable, default steady')
+    parser.add_argument('--workers', type=int, default=10, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds per mix')
+    parser.add_argument('--requests', type=int, help='stop each mix after this many requests')
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--orders', type=int, default=3, help='orders placed by each account up front')
+    parser.add_argument('--scenes', type=int, default=10, help='scenes per order')
+    parser.add_argument('--latency', type=float, default=0.0, help='added by the stub services')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction slower than the baseline counted as a regression')
+    args = parser.parse_args(argv)
+
+    stub = server.start(options=server.StubOptions(latency=args.latency))
+    settings = {'policy.open_scene_limit': '1000000'}
+    scenarios = dict()
+    mixes = dict()
+    try:
+        with StubEnvironment(stub, settings):
+            httpd = serve()
+            try:
+                load = LoadTest('http://127.0.0.1:{}'.format(httpd.server_port),
+                                args.accounts, args.orders, args.scenes)
+                load.setup()
+                for mix in args.mix or ['steady']:
+                    endpoints, elapsed = load.run(mix, args.workers, args.duration, args.requests)
+                    total = sum(e['requests'] for e in endpoints.values())
+                    mixes[mix] = {'seconds': round(elapsed, 3), 'requests': total,
+                                  'throughput': round(total / elapsed, 2) if elapsed else None}
+                    for endpoint, result in endpoints.items():
+                        scenarios['{} {}'.format(mix, endpoint)] = result
+            finally:
+                httpd.shutdown()
+    finally:
+        stub.shutdown()
+
+    results = {'scenarios': scenarios, 'mixes': mixes, 'stub_requests': dict(stub.requests),
+               'options': {'workers': args.workers, 'duration': args.duration,
+                           'requests': args.requests, 'accounts': args.accounts,
+                           'orders': args.orders, 'scenes': args.scenes, 'latency': args.latency}}
+    # tail latency is what the pages are about
+    return write(results, args.output, args.baseline, args.tolerance, stat='p95')
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,288 @@
+"""
+Purpose: microbenchmarks of the CPU bound domain paths, comparable between
+commits. Nothing here needs the database, memcache or the USGS services, the
+few lookups that would (the ordering user's role, retry settings) are
+answered with fixed values
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --filter validate --baseline micro.json
+
+Each case reports the per call seconds of its fastest, median and slowest
+round, the peak RSS growth over the case, and the objects it leaves behind
+after a garbage collection (caches, or a leak)
+"""
+import gc
+import sys
+import time
+import random
+import argparse
+import resource
+import datetime
+
+from mock import patch
+
+from api.domain import sensor
+from api.domain.order import OptionsConversion
+from api.external import inventory
+from api.external.mocks.server import landsat_id
+from api.providers.production.production_provider import ProductionProvider
+from api.providers.validation.validictory import ValidationProvider
+from api.system import errors
+from api.util import lowercase_all
+from benchmarks.report import summarize, write
+
+
+class Case(object):
+    """
+    :param name: unique, used to compare results between runs
+    :param func: called with no arguments, the timed work
+    :param items: units of work in each call, e.g. scenes
+    :param setup: called, untimed, before each round, e.g. to empty a cache
+    """
+    def __init__(self, name, func, items=1, setup=None):
+        self.name = name
+        self.func = func
+        self.items = items
+        self.setup = setup
+
+
+# inputs ======================================================================
+def landsat_ids(n, seed=0):
+    prefixes = ('LC08', 'LE07', 'LT05')
+    return [prefixes[i % 3] + landsat_id(seed, i)[4:] for i in range(n)]
+
+
+def modis_ids(n):
+    return ['{}.A2016{:03d}.h{:02d}v{:02d}.006.2016314200836'.format(
+        ('MOD09GA', 'MYD09GA', 'MOD13A1', 'MYD09Q1')[i % 4], 1 + i % 365, i % 36, i % 18)
+        for i in range(n)]
+
+
+def viirs_ids(n):
+    return ['VNP09GA.A2019{:03d}.h{:02d}v06.001.2019061005706'.format(1 + i % 365, i % 36)
+            for i in range(n)]
+
+
+def sentinel_ids(n):
+    return ['L1C_T14TP{}_A{:06d}_20190910T172721'.format(chr(65 + i % 26), 22031 + i)
+            for i in range(n)]
+
+
+def mixed_ids(n):
+    """ mostly Landsat, as orders are """
+    ids = landsat_ids(n * 7 // 10) + modis_ids(n // 10) + viirs_ids(n // 10)
+    ids += sentinel_ids(n - len(ids))
+    random.Random(0).shuffle(ids)
+    return ids
+
+
+def order(n, products=('sr', 'bt', 'pixel_qa')):
+    """ as validated, after the interface has lower cased it """
+    return {'olitirs8_collection': {'inputs': [landsat_id(0, i).lower() for i in range(n)],
+                                    'products': list(products)},
+            'format': 'gtiff',
+            'resampling_method': 'cc',
+            'projection': {'utm': {'zone': 15, 'zone_ns': 'north'}},
+            'image_extents': {'north': 4431000, 'south': 4375000, 'east': 702000,
+                              'west': 641000, 'units': 'meters'},
+            'resize': {'pixel_size': 60, 'pixel_size_units': 'meters'},
+            'note': 'benchmark order'}
+
+
+def mixed_case(data):
+    """ upper case the keys and values, as some users send them """
+    if isinstance(data, dict):
+        return {k.upper() if k != 'note' else k: mixed_case(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [mixed_case(v) for v in data]
+    if isinstance(data, basestring):
+        return data.upper()
+    return data
+
+
+def production_opts():
+    opts = order(1)
+    opts.pop('olitirs8_collection')
+    for name in ('tm5_collection', 'etm7_collection', 'olitirs8_collection', 'mod09ga', 'vnp09ga'):
+        opts[name] = {'inputs': [], 'products': ['sr', 'stats']}
+    return opts
+
+
+def processing_log(size=8192, error=None):
+    """ a multi-KB log, as the processing nodes send, ending with the error """
+    started = datetime.datetime(2019, 9, 10, 17, 27, 21)
+    lines = []
+    total = 0
+    n = 0
+    while total < size:
+        stamp = started + datetime.timedelta(seconds=n)
+        line = ('{} INFO espa.processor:{}: Processing band {} of {} in {} '
+                '[cmd: gdal_translate -of GTiff -co COMPRESS=DEFLATE ...]'.format(
+                    stamp.isoformat(), 100 + n, n % 11, landsat_id(0, n), '/tmp/work'))
+        lines.append(line)
+        total += len(line) + 1
+        n += 1
+    if error:
+        lines.append('Traceback (most recent call last):')
+        lines.append('  File "processor.py", line 412, in process')
+        lines.append('Exception: {}'.format(error))
+    return '\n'.join(lines)
+
+
+# cases =======================================================================
+def cases():
+    found = []
+
+    ids = mixed_ids(1000)
+    found.append(Case('sensor.instance.cold', lambda: [sensor.instance(i) for i in ids],
+                      len(ids), setup=sensor._parsed_ids.clear))
+    found.append(Case('sensor.instance.warm', lambda: [sensor.instance(i) for i in ids], len(ids)))
+
+    big = mixed_ids(5000)
+    found.append(Case('sensor.available_products.5000', lambda: sensor.available_products(big),
+                      len(big), setup=sensor._parsed_ids.clear))
+
+    landsat = landsat_ids(5000)
+    found.append(Case('inventory.split_by_dataset.5000',
+                      lambda: inventory.split_by_dataset(landsat), len(landsat),
+                      setup=sensor._parsed_ids.clear))
+
+    new = order(1)
+    scenes = new['olitirs8_collection']['inputs']
+    old = OptionsConversion.convert(new=new, scenes=scenes)
+    found.append(Case('OptionsConversion.convert.new_to_old',
+                      lambda: OptionsConversion.convert(new=new, scenes=scenes)))
+    found.append(Case('OptionsConversion.convert.old_to_new',
+                      lambda: OptionsConversion.convert(old=old, scenes=scenes)))
+
+    opts = production_opts()
+    scene = landsat_id(0, 1)
+    found.append(Case('ProductionProvider.strip_unrelated',
+                      lambda: ProductionProvider.strip_unrelated(scene, opts)))
+
+    validator = ValidationProvider()
+    for n in (1, 100, 5000):
+        found.append(Case('ValidationProvider.validate.{}'.format(n),
+                          lambda o=order(n): validator.validate(o, 'bench_user'), n))
+
+    logs = [('night_scene', processing_log(error='solar zenith angle out of range')),
+            ('retry', processing_log(error='Connection aborted.')),
+            ('unresolved', processing_log(error='KeyError: band7'))]
+    for label, log in logs:
+        found.append(Case('errors.resolve.{}'.format(label),
+                          lambda log=log: errors.resolve(log, landsat_id(0, 1))))
+
+    upper = mixed_case(order(5000))
+    found.append(Case('lowercase_all.5000', lambda: lowercase_all(upper), 5000))
+    return found
+
+
+class FixedUser(object):
+    def is_staff(self):
+        return False
+
+
+class FixedConfig(object):
+    """ retry.<condition>.timeout and retry.<condition>.retries """
+    values = {'timeout': '3600', 'retries': '5'}
+
+    def get(self, key):
+        return self.values[key.rsplit('.', 1)[-1]]
+
+
+def services():
+    """
+    Fixed answers for the lookups the cases would otherwise send to the database,
+    not mocks, which would hold on to every call and skew the memory stats
+
+    :return: [patcher], started
+    """
+    by_username = staticmethod(lambda name: FixedUser())
+    patchers = [patch('api.providers.validation.validictory.User.by_username', new=by_username),
+                patch('api.providers.ordering.ordering_provider.User.by_username', new=by_username),
+                patch('api.system.errors.config', FixedConfig())]
+    for p in patchers:
+        p.start()
+    return patchers
+
+
+# runner ======================================================================
+def peak_rss():
+    """ KB on Linux """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(case, repeat=5, min_time=0.2):
+    """
+    Time case.func in rounds of enough calls to run for at least min_time,
+    one call per round when the case has a setup
+
+    :return: dict, per call seconds and memory stats
+    """
+    gc.collect()
+    rss = peak_rss()
+    objects = len(gc.get_objects())
+
+    if case.setup:
+        case.setup()
+    start = time.time()
+    case.func()
+    once = time.time() - start
+    loops = 1 if case.setup else max(1, int(min_time / once) if once else 1000)
+
+    seconds = []
+    for _ in range(repeat):
+        if case.setup:
+            case.setup()
+        gc.collect()
+        start = time.time()
+        for _ in range(loops):
+            case.func()
+        seconds.append((time.time() - start) / loops)
+
+    gc.collect()
+    result = summarize(seconds, case.items)
+    result.update({'loops': loops, 'items': case.items,
+                   'rss_growth_kb': peak_rss() - rss,
+                   'objects_retained': len(gc.get_objects()) - objects})
+    return result
+
+
+def run(names=None, repeat=5, min_time=0.2):
+    """
+    :param names: substrings, the cases to run, default all
+    :return: dict, results by case name
+    """
+    patchers = services()
+    try:
+        scenarios = dict()
+        for case in cases():
+            if names and not any(n in case.name for n in names):
+                continue
+            scenarios[case.name] = measure(case, repeat, min_time)
+            sys.stderr.write('{:45s} {:>12.6f}s p50\n'.format(case.name, scenarios[case.name]['p50']))
+    finally:
+        for p in patchers:
+            p.stop()
+    return {'scenarios': scenarios,
+            'options': {'repeat': repeat, 'min_time': min_time, 'python': sys.version.split()[0]}}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Microbenchmarks of the domain hot paths')
+    parser.add_argument('--filter', action='append', help='run only cases containing this, repeatable')
+    parser.add_argument('--repeat', type=int, default=5, help='timed rounds per case')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per round, at least')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction slower than the baseline counted as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat, args.min_time)
+    # the median is steadier than the mean between runs on a busy host
+    return write(results, args.output, args.baseline, args.tolerance, stat='p50')
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
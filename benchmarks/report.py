@@ -0,0 +1,60 @@
+"""
+Purpose: summary statistics and baseline comparison shared by the benchmarks
+"""
+import json
+
+
+def percentile(ordered, p):
+    """ nearest rank, ordered must be sorted """
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+
+def summarize(seconds, items=1):
+    """
+    :param seconds: [elapsed seconds], one per round
+    :param items: units of work per round, e.g. scenes
+    :return: dict
+    """
+    ordered = sorted(seconds)
+    mean = sum(ordered) / len(ordered)
+    return {'rounds': len(ordered), 'mean': round(mean, 6), 'min': round(ordered[0], 6),
+            'p50': round(percentile(ordered, .5), 6), 'p95': round(percentile(ordered, .95), 6),
+            'p99': round(percentile(ordered, .99), 6), 'max': round(ordered[-1], 6),
+            'per_second': round(items / mean, 2) if mean else None}
+
+
+def compare(results, baseline, tolerance, stat='mean'):
+    """
+    :return: [str], a line for each scenario whose stat is more than
+             tolerance (a fraction) slower than the baseline's
+    """
+    regressions = []
+    for name, result in sorted(results['scenarios'].items()):
+        before = baseline.get('scenarios', {}).get(name)
+        if not before or not before.get(stat):
+            continue
+        change = result[stat] / before[stat] - 1
+        if change > tolerance:
+            regressions.append('{}: {:.6f}s {} vs {:.6f}s, {:+.0%}'.format(
+                name, result[stat], stat, before[stat], change))
+    return regressions
+
+
+def write(results, output=None, baseline=None, tolerance=0.2, stat='mean'):
+    """
+    Print the results, save them to output and compare them to the baseline file
+
+    :return: int, exit status, 1 if anything regressed
+    """
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), tolerance, stat)
+        for line in regressions:
+            print('REGRESSION {}'.format(line))
+        return 1 if regressions else 0
+    return 0
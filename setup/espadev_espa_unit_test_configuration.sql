@@ -75,6 +75,12 @@ INSERT INTO ordering_configuration (key, value) VALUES
     ('policy.purge_orders_after', '10'),
     ('system.ondemand_enabled', 'False'),
     ('system.order_disposition_enabled', 'True'),
+    ('system.handle_orders_workers', '4'),
+    ('system.handle_orders_stage_timeout', '1800'),
+    ('system.handle_orders_shards', '1'),
+    ('system.m2m_status_workers', '8'),
+    ('system.m2m_status_rate', '10'),
+    ('system.submitted_chunk_size', '500'),
     ('policy.open_scene_limit', '25'),
 
     ('cache.key.handle_orders_lock_timeout', '1260'),
@@ -15,7 +15,7 @@ import os
 from api.domain.mocks.order import MockOrder
 from api.domain.mocks.user import MockUser
 from api.domain.order import Order
-from api.domain.user import User
+from api.domain.user import User, cache as user_cache
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.providers.production.mocks.production_provider import MockProductionProvider
 from api.providers.production.production_provider import ProductionProvider
@@ -117,6 +117,35 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(set([s.name for s in self.order.scenes()]),
                          set([s.name for s in response[self.order.orderid]]))
 
+    def test_user_authenticate_remembers_login(self):
+        User.forget(self.user.username)
+        with patch('api.domain.user.User.get', wraps=MockUser.get) as get:
+            first = User.authenticate(self.user.username, 'foo')
+            second = User.authenticate(self.user.username, 'foo')
+            User.authenticate(self.user.username, 'bar')
+        self.assertEqual(2, get.call_count)
+        self.assertEqual(first.id, second.id)
+        cached = str(user_cache.get(User.credentials_key(self.user.username)))
+        self.assertNotIn("'foo'", cached)
+        self.assertNotIn("'bar'", cached)
+
+    def test_user_roles_cached(self):
+        user = User.find(self.user.id)
+        with patch('api.domain.user.db_instance') as db_instance:
+            self.assertIn('active', user.role_list())
+            self.assertEqual({'email', 'first_name', 'last_name', 'username', 'roles'},
+                             set(user.as_dict()))
+        self.assertFalse(db_instance.called)
+
+        user.update('is_staff', True)
+        self.assertTrue(user.is_staff())
+
+    def test_user_scene_count_matches_scenes(self):
+        filters = {'status': ('submitted', 'oncache', 'processing')}
+        scenes = Order.get_user_scenes(self.user.id, params=dict(filters))
+        count = Order.user_scene_count(self.user.id, params=dict(filters))
+        self.assertEqual(len(scenes), count)
+
 
 class TestValidation(unittest.TestCase):
     def setUp(self):
@@ -169,6 +198,16 @@ class TestValidation(unittest.TestCase):
             except ValidationException as e:
                 self.fail('Raised ValidationException: {}'.format(e.message))
 
+    def test_validate_single_user_lookup(self):
+        """
+        The ordering user should only be looked up once per validation,
+        regardless of how many sensors are in the order
+        """
+        with patch('api.providers.validation.validictory.User.by_username',
+                   wraps=User.by_username) as by_username:
+            api.validation(copy.deepcopy(self.base_order), self.staffuser.username)
+        self.assertEqual(1, by_username.call_count)
+
     def test_modis_resize(self):
         """
         Most common issue of orders resizing MODIS to 30m pixels, without setting the extents
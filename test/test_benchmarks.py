@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+import os
+import unittest
+
+import requests
+
+from mock import patch, MagicMock
+
+from benchmarks import micro, report, load, environment
+
+
+class TestMicroBenchmarks(unittest.TestCase):
+    def test_cases_run(self):
+        # once each, so a change to a benchmarked path does not break the suite unnoticed
+        results = micro.run(repeat=1, min_time=0)['scenarios']
+        self.assertEqual(set(c.name for c in micro.cases()), set(results))
+        for name, result in results.items():
+            self.assertEqual(1, result['rounds'], name)
+            self.assertIn('objects_retained', result)
+
+    def test_filter(self):
+        results = micro.run(['lowercase_all'], repeat=1, min_time=0)['scenarios']
+        self.assertEqual(['lowercase_all.5000'], results.keys())
+
+    def test_validated_order_is_lower_case(self):
+        self.assertEqual(micro.lowercase_all(micro.order(3)), micro.order(3))
+
+
+class TestReport(unittest.TestCase):
+    def test_summarize(self):
+        result = report.summarize([.4, .1, .2, .3, .5], items=10)
+        self.assertEqual(.3, result['mean'])
+        self.assertEqual(.3, result['p50'])
+        self.assertEqual(.1, result['min'])
+        self.assertEqual(.5, result['p95'])
+        self.assertEqual(33.33, result['per_second'])
+
+    def test_compare(self):
+        baseline = {'scenarios': {'a': {'p50': 1.0}, 'b': {'p50': 1.0}, 'c': {'p50': 0}}}
+        results = {'scenarios': {'a': {'p50': 1.1}, 'b': {'p50': 1.5}, 'c': {'p50': 1},
+                                 'new': {'p50': 9}}}
+        regressions = report.compare(results, baseline, .2, stat='p50')
+        self.assertEqual(1, len(regressions))
+        self.assertTrue(regressions[0].startswith('b:'))
+
+
+def response(status=200, queries='3'):
+    return MagicMock(status_code=status, headers={'X-DB-Queries': queries})
+
+
+class TestLoad(unittest.TestCase):
+    def test_mixes(self):
+        for mix, requests in load.MIXES.items():
+            for name, weight in requests:
+                self.assertIn(name, load.ENDPOINTS, mix)
+                self.assertTrue(callable(getattr(load.LoadTest, name)))
+
+    def test_results(self):
+        results = load.Results()
+        for n in range(100):
+            results.add('GET /x', n / 100.0, response(200 if n < 90 else 503, str(n % 5)))
+        results.add('GET /x', 1.0, None)
+        summary = results.summary(elapsed=10)['GET /x']
+        self.assertEqual(101, summary['requests'])
+        self.assertEqual({'200': 90, '503': 10, 'failed': 1}, summary['status'])
+        self.assertEqual(11, summary['errors'])
+        self.assertEqual(10.1, summary['throughput'])
+        self.assertEqual(4, summary['queries_max'])
+        self.assertEqual(.99, summary['p99'])
+
+    @patch('benchmarks.load.requests.Session')
+    def test_completions_drain(self, mock_session):
+        mock_session.return_value.post.return_value = response()
+        test = load.LoadTest('http://localhost')
+        for n in range(50):
+            test.processing.put(('LC08_{}'.format(n), 'order-1'))
+
+        endpoints, elapsed = test.run('completions', workers=4, duration=30)
+        # stops once there is nothing left to complete, not at the deadline
+        self.assertLess(elapsed, 30)
+        self.assertEqual(50, endpoints[load.ENDPOINTS['complete']]['requests'])
+        self.assertEqual(50, mock_session.return_value.post.call_count)
+
+    @patch('benchmarks.load.requests.Session')
+    def test_request_limit(self, mock_session):
+        mock_session.return_value.get.return_value = response()
+        test = load.LoadTest('http://localhost')
+        endpoints, _ = test.run('scheduler', workers=3, duration=30, limit=20)
+        # nothing is oncache, so only the product polling is sent
+        self.assertEqual(20, endpoints[load.ENDPOINTS['products']]['requests'])
+
+    @patch('benchmarks.load.requests.Session')
+    def test_error_responses(self, mock_session):
+        unavailable = requests.models.Response()
+        unavailable.status_code = 503
+        unavailable.headers['X-DB-Queries'] = '2'
+        # error responses are falsy, they must still be counted by status
+        self.assertFalse(unavailable)
+        mock_session.return_value.get.side_effect = [unavailable, requests.ConnectionError()] * 5
+        test = load.LoadTest('http://localhost')
+        endpoints, _ = test.run('scheduler', workers=1, duration=30, limit=10)
+        summary = endpoints[load.ENDPOINTS['products']]
+        self.assertEqual({'503': 5, 'failed': 5}, summary['status'])
+        self.assertEqual(2, summary['queries_max'])
+
+
+
+@patch.dict(os.environ, clear=True)
+@patch('benchmarks.environment.clean')
+@patch('benchmarks.environment.put')
+@patch('benchmarks.environment.delete')
+@patch('benchmarks.environment.config')
+class TestStubEnvironment(unittest.TestCase):
+    def setUp(self):
+        self.stub = MagicMock(url='http://127.0.0.1:8901')
+
+    @patch('benchmarks.environment.in_test_schema')
+    def test_testing_flag_scoped(self, mock_schema, mock_config, mock_delete, mock_put, mock_clean):
+        mock_config.configuration_keys = dict()
+        mock_schema.side_effect = lambda: os.environ.get('espa_api_testing') == 'True'
+        self.assertNotIn('espa_api_testing', os.environ)
+        with environment.StubEnvironment(self.stub):
+            self.assertEqual('True', os.environ['espa_api_testing'])
+            self.assertTrue(mock_put.called)
+        self.assertNotIn('espa_api_testing', os.environ)
+        self.assertEqual(mock_put.call_count, mock_delete.call_count)
+
+    @patch('benchmarks.environment.in_test_schema')
+    def test_other_schema(self, mock_schema, mock_config, mock_delete, mock_put, mock_clean):
+        mock_schema.return_value = False
+        os.environ['espa_api_testing'] = 'False'
+        with self.assertRaises(RuntimeError):
+            with environment.StubEnvironment(self.stub):
+                pass
+        self.assertEqual('False', os.environ['espa_api_testing'])
+        mock_clean.assert_not_called()
+        mock_put.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
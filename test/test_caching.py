@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+import base64
+import json
+import unittest
+
+from mock import patch, MagicMock
+
+from api.providers.caching import caching_provider
+from api.providers.caching.caching_provider import CachingProvider, LocalCache
+
+
+class TestLocalCache(unittest.TestCase):
+    def test_entry_limit_evicts_oldest(self):
+        local = LocalCache(max_entries=2)
+        local.set('a', 1, 60)
+        local.set('b', 2, 60)
+        local.get('a')
+        local.set('c', 3, 60)
+        self.assertEqual((True, 1), local.get('a'))
+        self.assertEqual((False, None), local.get('b'))
+        self.assertEqual(2, len(local))
+
+    def test_byte_limit(self):
+        local = LocalCache(max_bytes=16 * 64)
+        local.set('big', 'x' * 100, 60)
+        self.assertEqual((False, None), local.get('big'))
+        self.assertEqual(0, local.nbytes)
+
+    def test_expired(self):
+        local = LocalCache()
+        local.set('a', 1, -1)
+        self.assertEqual((False, None), local.get('a'))
+
+    def test_values_are_copies(self):
+        local = LocalCache()
+        value = {'roles': ['staff']}
+        local.set('a', value, 60)
+        local.get('a')[1]['roles'].append('admin')
+        self.assertEqual(value, local.get('a')[1])
+
+
+class TestCachingProviderLocal(unittest.TestCase):
+    def setUp(self):
+        self.local = LocalCache()
+        patcher = patch.object(caching_provider, 'local', self.local)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.remote = MagicMock()
+        self.remote.get.return_value = None
+        patcher = patch('memcache.Client', return_value=self.remote)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_local_timeout_below_remote(self):
+        cache = CachingProvider(timeout=30, local_timeout=60)
+        self.assertEqual(30, cache.local_timeout)
+
+    def test_second_get_is_local(self):
+        cache = CachingProvider(local_timeout=60)
+        self.remote.get.side_effect = lambda key: 'token' if key == 'login' else None
+        self.assertEqual('token', cache.get('login'))
+        self.assertEqual('token', cache.get('login'))
+        self.assertEqual(1, [c[0][0] for c in self.remote.get.call_args_list].count('login'))
+        stats = cache.stats()
+        self.assertEqual(1, stats['local_hits'])
+        self.assertEqual(1, stats['remote_hits'])
+
+    def test_disabled_by_default(self):
+        cache = CachingProvider()
+        cache.set('lock', 1)
+        self.assertEqual(0, len(self.local))
+        cache.get('lock')
+        self.remote.get.assert_called_once_with('lock')
+
+    def test_namespace_change_clears(self):
+        cache = CachingProvider(local_timeout=60)
+        cache.set('login', 'token')
+        self.local.namespace_checked = 0
+        self.remote.get.side_effect = lambda key: 2 if key == cache.namespace_key else None
+        self.assertIsNone(cache.get('login'))
+        self.assertEqual(2, self.local.namespace)
+
+    def test_delete_removes_local(self):
+        cache = CachingProvider(local_timeout=60)
+        cache.set('login', 'token')
+        cache.delete('login')
+        self.assertEqual((False, None), self.local.get('login'))
+
+
+class TestGetOrCompute(unittest.TestCase):
+    def setUp(self):
+        self.store = dict()
+        self.remote = MagicMock()
+        self.remote.get.side_effect = self.store.get
+        self.remote.set.side_effect = lambda k, v, t: self.store.__setitem__(k, v) or True
+        self.remote.add.side_effect = lambda k, v, t: (k not in self.store
+                                                       and not self.store.__setitem__(k, v))
+        self.remote.delete.side_effect = lambda k: self.store.pop(k, None)
+        patcher = patch('memcache.Client', return_value=self.remote)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = CachingProvider()
+        self.compute = MagicMock(return_value=['127.0.0.1'])
+
+    def test_computes_once(self):
+        for _ in range(3):
+            self.assertEqual(['127.0.0.1'],
+                             self.cache.get_or_compute('whitelist', self.compute, 60))
+        self.compute.assert_called_once_with()
+        self.assertNotIn('whitelist.lock', self.store)
+
+    def test_serves_stale_while_locked(self):
+        self.cache.get_or_compute('whitelist', self.compute, 60)
+        self.store['whitelist']['refresh_at'] = 0
+        self.store['whitelist.lock'] = 1
+        self.compute.return_value = ['10.0.0.1']
+        self.assertEqual(['127.0.0.1'],
+                         self.cache.get_or_compute('whitelist', self.compute, 60))
+        self.compute.assert_called_once_with()
+
+    def test_refresh_failure_serves_stale(self):
+        self.cache.get_or_compute('whitelist', self.compute, 60)
+        self.store['whitelist']['refresh_at'] = 0
+        self.compute.side_effect = IOError('mesos')
+        self.assertEqual(['127.0.0.1'],
+                         self.cache.get_or_compute('whitelist', self.compute, 60))
+        self.assertNotIn('whitelist.lock', self.store)
+
+    def test_failure_without_value_raises(self):
+        self.compute.side_effect = IOError('mesos')
+        with self.assertRaises(IOError):
+            self.cache.get_or_compute('whitelist', self.compute, 60)
+
+
+
+@patch('api.providers.caching.caching_provider.CachingProvider.bump_namespace')
+@patch('api.transports.http_admin.espa.get_admin_whitelist')
+@patch('api.domain.user.User.authenticate')
+class TestCacheFlush(unittest.TestCase):
+    def setUp(self):
+        from api.transports import http
+        self.app = http.app.test_client()
+        self.headers = {'Authorization': 'Basic {}'.format(base64.b64encode('admin:foo'))}
+
+    def flush(self, remote_addr='127.0.0.1'):
+        return self.app.post('/api/v1/system/cache-flush', headers=self.headers,
+                             environ_base={'REMOTE_ADDR': remote_addr})
+
+    def test_flushed(self, mock_authenticate, mock_whitelist, mock_bump):
+        mock_authenticate.return_value.is_staff.return_value = True
+        mock_whitelist.return_value = '127.0.0.1'
+        mock_bump.return_value = 8
+        response = self.flush()
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'namespace': 8}, json.loads(response.get_data()))
+        mock_bump.assert_called_once_with()
+
+    def test_not_whitelisted(self, mock_authenticate, mock_whitelist, mock_bump):
+        mock_authenticate.return_value.is_staff.return_value = True
+        mock_whitelist.return_value = '127.0.0.1'
+        self.assertEqual(403, self.flush('10.0.0.9').status_code)
+        mock_bump.assert_not_called()
+
+    def test_staff_only(self, mock_authenticate, mock_whitelist, mock_bump):
+        mock_authenticate.return_value.is_staff.return_value = False
+        mock_whitelist.return_value = '127.0.0.1'
+        self.assertEqual(401, self.flush().status_code)
+        mock_bump.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+import unittest
+
+from mock import patch, MagicMock
+
+from api.util import connections
+
+
+class TestCachedIsReachable(unittest.TestCase):
+    def setUp(self):
+        connections._reachable.clear()
+
+    @patch('api.util.connections.requests.head')
+    def test_probed_once(self, mock_head):
+        mock_head.return_value = MagicMock(status_code=200)
+        for _ in range(5):
+            self.assertTrue(connections.cached_is_reachable('http://e4ftl01.cr.usgs.gov', timeout=4))
+        self.assertEqual(1, mock_head.call_count)
+
+    @patch('api.util.connections.time.time')
+    @patch('api.util.connections.requests.head')
+    def test_expires(self, mock_head, mock_time):
+        mock_head.side_effect = IOError('unreachable')
+        mock_time.return_value = 1000
+        self.assertFalse(connections.cached_is_reachable('http://e4ftl01.cr.usgs.gov', ttl=60))
+        self.assertEqual(3, mock_head.call_count)
+
+        mock_head.side_effect = None
+        mock_head.return_value = MagicMock(status_code=200)
+        mock_time.return_value = 1061
+        self.assertTrue(connections.cached_is_reachable('http://e4ftl01.cr.usgs.gov', ttl=60))
+
+
+class TestHeadStatus(unittest.TestCase):
+    def test_server_errors_retried(self):
+        session = MagicMock()
+        session.head.side_effect = [IOError('reset'), MagicMock(status_code=503),
+                                    MagicMock(status_code=404)]
+        self.assertEqual(404, connections.head_status('http://e4ftl01.cr.usgs.gov/x.hdf',
+                                                      session=session))
+        self.assertEqual(3, session.head.call_count)
+
+    def test_nothing_answered(self):
+        session = MagicMock()
+        session.head.side_effect = IOError('unreachable')
+        self.assertIsNone(connections.head_status('http://e4ftl01.cr.usgs.gov', session=session))
+        self.assertFalse(connections.is_reachable('http://e4ftl01.cr.usgs.gov', session=session))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -35,6 +35,24 @@ class TestInventory(unittest.TestCase):
     def tearDown(self):
         os.environ['espa_api_testing'] = ''
 
+    def test_split_by_dataset(self):
+        result = inventory.split_by_dataset(self.collection_ids)
+        self.assertEqual({'LANDSAT_8_C1': [self.collection_ids[0]],
+                          'LANDSAT_ETM_C1': [self.collection_ids[1]],
+                          'LANDSAT_TM_C1': [self.collection_ids[2]]}, result)
+
+    def test_split_by_dataset_modis_versions(self):
+        ids = ['MOD09A1.A2000072.h02v09.005.2008237032813',
+               'MOD09A1.A2016305.h11v04.006.2016314200836',
+               'MOD09A1.A2001072.h02v09.005.2008237032813']
+        result = inventory.split_by_dataset(ids)
+        self.assertEqual({'MODIS_MOD09A1': [ids[0], ids[2]],
+                          'MODIS_MOD09A1_V6': [ids[1]]}, result)
+
+    def test_split_by_dataset_not_implemented(self):
+        with self.assertRaises(ProductNotImplemented):
+            inventory.split_by_dataset(self.collection_ids + ['bilbo'])
+
     @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
     @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
     def test_api_login(self):
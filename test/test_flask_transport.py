@@ -13,6 +13,7 @@ from api.transports import http
 from api.util import lowercase_all
 from api.util.dbconnect import db_instance
 from api.domain.user import User
+from api.domain.order import Order
 from api.domain.mocks.order import MockOrder
 from api.domain.mocks.user import MockUser
 
@@ -143,6 +144,29 @@ class TransportTestCase(unittest.TestCase):
         self.assertEqual('ordered', resp_json.get('status'))
         self.assertEqual(200, response.status_code)
 
+    @patch('api.domain.user.User.get', MockUser.get)
+    def test_get_order_status_not_modified(self):
+        url = "/api/v1/order-status/" + str(self.orderid)
+        response = self.app.get(url, headers=self.headers, environ_base={'REMOTE_ADDR': '127.0.0.1'})
+        etag = response.headers.get('ETag')
+        self.assertTrue(etag)
+        headers = dict(self.headers, **{'If-None-Match': etag})
+        response = self.app.get(url, headers=headers, environ_base={'REMOTE_ADDR': '127.0.0.1'})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual('', response.get_data())
+
+    @patch('api.domain.user.User.get', MockUser.get)
+    def test_get_item_status_modified(self):
+        orderid = Order.find(self.order_id).orderid
+        url = "/api/v1/item-status/%s" % orderid
+        response = self.app.get(url, headers=self.headers, environ_base={'REMOTE_ADDR': '127.0.0.1'})
+        etag = response.headers.get('ETag')
+        self.mock_order.update_scenes(self.order_id, 'landsat', 'status', ['complete'])
+        headers = dict(self.headers, **{'If-None-Match': etag})
+        response = self.app.get(url, headers=headers, environ_base={'REMOTE_ADDR': '127.0.0.1'})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers.get('ETag'))
+
     @patch('api.domain.user.User.get', MockUser.get)
     def test_get_item_status_by_ordernum(self):
         url = "/api/v1/item-status/%s" % self.itemorderid
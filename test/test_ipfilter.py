@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+import os
+import tempfile
+import unittest
+
+from mock import patch
+
+from api.util import ipfilter
+
+
+class TestIPFilter(unittest.TestCase):
+    def test_exact_and_cidr(self):
+        white_ls = ipfilter.compiled('127.0.0.1, 10.1.0.0/16,2001:db8::/32')
+        self.assertIn('127.0.0.1', white_ls)
+        self.assertIn('10.1.200.3', white_ls)
+        self.assertIn('2001:db8::1', white_ls)
+        self.assertNotIn('10.2.0.1', white_ls)
+        self.assertNotIn('127.0.0.10', white_ls)
+        self.assertNotIn('untrackable', white_ls)
+
+    def test_list_and_error_values(self):
+        self.assertIn('127.0.0.1', ipfilter.compiled(['127.0.0.1']))
+        self.assertFalse(ipfilter.compiled({'msg': 'problem'}))
+        self.assertFalse(ipfilter.compiled(''))
+
+    def test_compiled_once(self):
+        self.assertIs(ipfilter.compiled('10.0.0.0/8'), ipfilter.compiled('10.0.0.0/8'))
+
+    @patch('api.util.ipfilter.logger')
+    def test_invalid_networks_skipped(self, mock_logger):
+        white_ls = ipfilter.IPFilter(['10.0.0.0/x', '10.1.0.0/33', 'bilbo/8', '::/129',
+                                      '127.0.0.1', '192.168.0.0/16'])
+        self.assertEqual(4, mock_logger.warning.call_count)
+        self.assertIn('127.0.0.1', white_ls)
+        self.assertIn('192.168.1.1', white_ls)
+        self.assertNotIn('10.0.0.1', white_ls)
+        self.assertNotIn('10.1.0.1', white_ls)
+        self.assertEqual(0, len(ipfilter.IPFilter(['10.0.0.0/x'])))
+
+    def test_config_lists_reload_on_change(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with open(path, 'w') as f:
+            f.write('[config]\nuser_blacklist=10.0.0.1\n')
+        lists = ipfilter.ConfigLists(path)
+        self.assertIn('10.0.0.1', lists.filter('user_blacklist'))
+
+        with open(path, 'w') as f:
+            f.write('[config]\nuser_blacklist=10.0.0.2\n')
+        os.utime(path, (0, 0))
+        self.assertNotIn('10.0.0.1', lists.filter('user_blacklist'))
+        self.assertIn('10.0.0.2', lists.filter('user_blacklist'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+import datetime
+import unittest
+
+from mock import patch, MagicMock
+
+from api.util.locks import AdvisoryLock, LOCK_SPACE, lock_key
+
+
+def fake_db(*rows):
+    db = MagicMock()
+    db.__enter__.return_value = db
+    db.__getitem__.side_effect = lambda i: rows[i]
+    db.__len__.return_value = len(rows)
+    db.__nonzero__.return_value = bool(rows)
+    return db
+
+
+class TestAdvisoryLock(unittest.TestCase):
+    def test_key_stable(self):
+        self.assertEqual(lock_key('handle_orders'), lock_key('handle_orders'))
+        self.assertNotEqual(lock_key('handle_orders'), lock_key('handle_orders.purge'))
+        self.assertTrue(0 <= lock_key('handle_orders') < 2 ** 31)
+
+    @patch('api.util.locks.db_instance')
+    def test_acquired_and_released(self, mock_instance):
+        db = fake_db((True,))
+        mock_instance.return_value = db
+        with AdvisoryLock('handle_orders') as lock:
+            self.assertTrue(lock.acquired)
+            db.select.assert_called_with('select pg_try_advisory_lock(%s, %s)',
+                                         (LOCK_SPACE, lock_key('handle_orders')))
+            db.__exit__.assert_not_called()
+        self.assertIn('pg_advisory_unlock', db.select.call_args[0][0])
+        self.assertTrue(db.__exit__.called)
+        self.assertFalse(lock.acquired)
+
+    @patch('api.util.locks.db_instance')
+    def test_held_elsewhere(self, mock_instance):
+        db = fake_db((False,))
+        mock_instance.return_value = db
+        with AdvisoryLock('handle_orders') as lock:
+            self.assertFalse(lock.acquired)
+            # the connection isn't kept open
+            self.assertTrue(db.__exit__.called)
+
+            started = datetime.datetime(2026, 10, 19, 12, 0)
+            mock_instance.return_value = fake_db((started, '10.0.0.2', 4242))
+            self.assertEqual({'started': '2026-10-19T12:00:00', 'client_addr': '10.0.0.2',
+                              'pid': 4242}, lock.holder())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
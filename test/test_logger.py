@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+import logging
+import unittest
+import Queue
+
+from mock import patch, MagicMock
+
+from api.system.logger import QueueHandler, QueueListener, ConfiguredSMTPHandler
+from api.util.dbconnect import LazySQL
+
+
+class TestQueueLogging(unittest.TestCase):
+    def setUp(self):
+        self.target = MagicMock(level=logging.INFO)
+        self.listener = QueueListener(Queue.Queue(2), self.target)
+        self.handler = QueueHandler(self.listener)
+        self.handler.setLevel(logging.INFO)
+        self.logger = logging.getLogger('test_logger')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def test_records_reach_handler(self):
+        self.logger.warn('value: %s', 1)
+        self.listener.stop()
+        record = self.target.handle.call_args[0][0]
+        self.assertEqual('value: 1', record.msg)
+        self.assertIsNone(record.args)
+
+    def test_filtered_records_not_rendered(self):
+        sql = MagicMock()
+        self.logger.debug('sql: %s', sql)
+        self.listener.stop()
+        self.assertFalse(sql.__str__.called)
+        self.assertFalse(self.target.handle.called)
+
+    def test_full_queue_drops(self):
+        self.listener.ensure_started = lambda: None
+        for _ in range(3):
+            self.logger.warn('bilbo')
+        self.assertEqual(1, self.handler.dropped)
+
+    def test_dropped_reported(self):
+        self.listener.ensure_started = lambda: None
+        for _ in range(3):
+            self.logger.warn('bilbo')
+        self.listener.queue.get_nowait()
+        self.listener.queue.get_nowait()
+
+        self.logger.warn('frodo')
+        messages = [self.listener.queue.get_nowait().msg for _ in range(2)]
+        self.assertEqual(['frodo', '1 log records dropped, the queue was full'], messages)
+        self.assertEqual(0, self.handler.unreported)
+
+    def test_record_not_modified(self):
+        record = logging.LogRecord('api', logging.WARNING, __file__, 1, 'value: %s', (1,), None)
+        self.handler.prepare(record)
+        self.assertEqual('value: %s', record.msg)
+        self.assertEqual((1,), record.args)
+
+
+class TestSMTPRateLimit(unittest.TestCase):
+    @patch('logging.handlers.SMTPHandler.emit')
+    @patch('api.system.logger.config')
+    def test_rate_limited(self, mock_config, mock_emit):
+        mock_config.get.return_value = 'espa@usgs.gov'
+        handler = ConfiguredSMTPHandler('localhost', 'ERROR', limit=2)
+        record = logging.LogRecord('api', logging.CRITICAL, __file__, 1, 'down', None, None)
+        for _ in range(4):
+            handler.emit(record)
+        self.assertEqual(2, mock_emit.call_count)
+        self.assertEqual(2, handler.suppressed)
+
+        handler.sent = []
+        handler.emit(record)
+        self.assertIn('2 similar messages suppressed', mock_emit.call_args[0][1].msg)
+        # the other handlers see the record as it was logged
+        self.assertEqual('down', record.msg)
+
+
+class TestLazySQL(unittest.TestCase):
+    def test_rendered_once(self):
+        cursor = MagicMock()
+        cursor.mogrify.return_value = "select 'bilbo'"
+        sql = LazySQL(cursor, 'select %s', ('bilbo',))
+        self.assertFalse(cursor.mogrify.called)
+        self.assertEqual("select 'bilbo'", str(sql))
+        self.assertEqual("sql: select 'bilbo'", 'sql: {}'.format(sql))
+        cursor.mogrify.assert_called_once_with('select %s', ('bilbo',))
+
+    def test_closed_cursor(self):
+        import psycopg2
+        cursor = MagicMock()
+        cursor.mogrify.side_effect = psycopg2.InterfaceError('cursor already closed')
+        self.assertEqual("select * from ordering_scene where name = 'bilbo'",
+                         str(LazySQL(cursor, 'select * from ordering_scene where name = %(name)s',
+                                     {'name': 'bilbo'})))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
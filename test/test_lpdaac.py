@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+import unittest
+
+import requests
+
+from mock import patch, MagicMock
+
+from api.external import lpdaac
+
+PRODUCTS = ['MOD09GA.A2016305.h11v04.006.2016314200836',
+            'MYD09GA.A2016305.h11v04.006.2016314200836',
+            'MOD09GA.A2016306.h11v04.006.2016314200837']
+
+
+SETTINGS = {'file.extension.modis.input.filename': '.hdf'}
+
+
+def setting(key):
+    if isinstance(key, tuple):
+        return tuple(setting(k) for k in key)
+    return SETTINGS.get(key, '/MOLT')
+
+
+# one worker, mock attribute creation is not thread safe
+@patch('api.external.lpdaac.HEAD_WORKERS', 1)
+@patch('api.external.lpdaac.cache')
+@patch('api.external.lpdaac.config')
+class TestVerifyProducts(unittest.TestCase):
+    def setUp(self):
+        self.session = patch('api.external.lpdaac.session').start()
+        self.addCleanup(patch.stopall)
+        self.head = self.session.return_value.head
+        self.head.side_effect = lambda url, **kw: MagicMock(status_code=200 if 'MOD' in url else 404)
+
+    def service(self, mock_config):
+        mock_config.url_for.return_value = 'http://e4ftl01.cr.usgs.gov'
+        mock_config.get.side_effect = setting
+        return lpdaac.LPDAACService()
+
+    def test_verify(self, mock_config, mock_cache):
+        mock_cache.get.return_value = None
+        response = self.service(mock_config).verify_products(PRODUCTS)
+
+        self.assertEqual({PRODUCTS[0]: True, PRODUCTS[1]: False, PRODUCTS[2]: True}, response)
+        # the paths and extensions, all at once before the requests
+        mock_config.get.assert_called_once_with(lpdaac.SETTINGS)
+        # a 404 is definite, and remembered for less time
+        self.assertEqual(3, self.head.call_count)
+        timeouts = dict((c[0][1], c[0][2]) for c in mock_cache.set.call_args_list)
+        self.assertEqual({True: 3600, False: 300}, timeouts)
+
+    def test_unreachable_not_cached(self, mock_config, mock_cache):
+        mock_cache.get.return_value = None
+        statuses = [requests.Timeout(), MagicMock(status_code=503), requests.ConnectionError()]
+        self.head.side_effect = statuses
+        response = self.service(mock_config).verify_products(PRODUCTS[:1])
+
+        self.assertEqual({PRODUCTS[0]: False}, response)
+        self.assertEqual(3, self.head.call_count)
+        mock_cache.set.assert_not_called()
+
+    def test_cached(self, mock_config, mock_cache):
+        mock_cache.get.return_value = False
+        response = self.service(mock_config).verify_products(PRODUCTS[:1])
+        self.assertEqual({PRODUCTS[0]: False}, response)
+        self.head.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
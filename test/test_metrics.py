@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from api.providers.metrics import MetricsProvider
+from api.providers.metrics.registry import Registry
+import api.providers.metrics.registry as registry_module
+
+from mock import patch
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.registry = Registry(self.directory)
+
+    def write_worker(self, pid, value):
+        with open(os.path.join(self.directory, '{}.json'.format(pid)), 'w') as f:
+            json.dump({'counters': [['espa_orders_total', [], value]],
+                       'histograms': []}, f)
+
+    def test_render(self):
+        self.registry.inc('espa_http_requests_total', endpoint='/api', status=200)
+        self.registry.observe('espa_http_request_seconds', 0.3, buckets=(0.1, 1), endpoint='/api')
+        text = self.registry.render()
+        self.assertIn('espa_http_requests_total{endpoint="/api",status="200"} 1', text)
+        self.assertIn('espa_http_request_seconds_bucket{endpoint="/api",le="0.1"} 0', text)
+        self.assertIn('espa_http_request_seconds_bucket{endpoint="/api",le="1"} 1', text)
+        self.assertIn('espa_http_request_seconds_count{endpoint="/api"} 1', text)
+
+    def test_timed_counts_errors(self):
+        with self.assertRaises(IOError):
+            with self.registry.timed('espa_external_request', service='m2m'):
+                raise IOError('down')
+        merged = self.registry.snapshot()
+        self.assertIn(['espa_external_request_errors_total', [['service', 'm2m']], 1],
+                      merged['counters'])
+        self.assertEqual('espa_external_request_seconds', merged['histograms'][0][0])
+
+    def test_workers_summed_and_archived(self):
+        self.registry.inc('espa_orders_total')
+        self.write_worker(os.getppid(), 2)
+        self.write_worker(999999, 4)
+        with patch.object(registry_module, '_alive', lambda pid: pid != 999999):
+            self.assertIn('espa_orders_total 7', self.registry.render())
+            self.assertFalse(os.path.exists(os.path.join(self.directory, '999999.json')))
+            # the archived count is kept
+            self.assertIn('espa_orders_total 7', self.registry.render())
+
+    def test_fork_resets(self):
+        self.registry.inc('espa_orders_total')
+        self.registry.pid = -1
+        self.assertEqual([], self.registry.snapshot()['counters'])
+
+
+class TestMetricsProvider(unittest.TestCase):
+    @patch('api.providers.metrics._registry')
+    def test_collect_order_sizes(self, mock_registry):
+        order = {'tm5': {'inputs': ['a', 'b'], 'products': ['sr']},
+                 'format': 'gtiff', 'note': 'bilbo'}
+        MetricsProvider().collect(order)
+        args, kwargs = mock_registry.observe.call_args
+        self.assertEqual(('espa_order_scenes', 2), args)
+        self.assertEqual('tm5', kwargs['sensor'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
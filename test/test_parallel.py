@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+import time
+import threading
+import unittest
+
+from api.util.parallel import RateLimiter, parallel_map
+
+
+class TestParallelMap(unittest.TestCase):
+    def test_order_and_errors(self):
+        def status(tid):
+            if tid == 3:
+                raise IOError('M2M down')
+            return tid * 10
+
+        results = parallel_map(status, range(6), workers=3)
+        self.assertEqual([0, 1, 2, 3, 4, 5], [r[0] for r in results])
+        self.assertEqual([0, 10, 20, None, 40, 50], [r[1] for r in results])
+        self.assertIsInstance(results[3][2], IOError)
+
+    def test_bounded(self):
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def poll(tid):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            time.sleep(.01)
+            with lock:
+                active[0] -= 1
+
+        parallel_map(poll, range(20), workers=4)
+        self.assertLessEqual(active[1], 4)
+
+    def test_rate(self):
+        limiter = RateLimiter(50)
+        start = time.time()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
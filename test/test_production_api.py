@@ -396,7 +396,8 @@ class TestProductionAPI(unittest.TestCase):
         self.assertTrue(emails.Emails().send_all_initial([order]))
 
     @patch('api.external.inventory.get_cached_session', inventory.get_cached_session)
-    @patch('api.external.inventory.get_order_status', inventory.get_order_status)
+    @patch('api.external.inventory.LTAService.get_order_status',
+           lambda service, tramid: inventory.get_order_status(service.token, tramid))
     @patch('api.external.inventory.update_order_status', inventory.update_order_status)
     def test_production_handle_onorder_landsat_products(self):
         tram_order_ids = inventory.sample_tram_order_ids()[0:3]
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+import unittest
+
+from mock import patch, MagicMock
+
+from api.providers.production.production_provider import ProductionProvider, ProductionProviderException
+
+
+def scene(sid, tram_order_id):
+    product = MagicMock(id=sid, tram_order_id=tram_order_id)
+    # name is a MagicMock constructor argument
+    product.name = 'LC08_{}'.format(sid)
+    return product
+
+
+CONFIG = {'system.m2m_status_workers': 8, 'system.m2m_status_rate': 0}
+
+
+@patch('api.providers.production.production_provider.config')
+@patch('api.providers.production.production_provider.cache')
+@patch('api.providers.production.production_provider.inventory')
+class TestOnorderLandsatPolling(unittest.TestCase):
+    def setUp(self):
+        self.products = [scene(i, 1000 + i) for i in range(700)]
+
+    def service(self, mock_inventory):
+        # created up front, mock attribute creation is not thread safe
+        return mock_inventory.LTAService.return_value.get_order_status
+
+    def polled(self, mock_inventory):
+        return [c[0][0] for c in self.service(mock_inventory).call_args_list]
+
+    @patch('api.providers.production.production_provider.Scene')
+    def test_rolling_cursor(self, mock_scene, mock_inventory, mock_cache, mock_config):
+        mock_config.get.side_effect = CONFIG.get
+        self.service(mock_inventory).return_value = {'units': []}
+        mock_cache.get.return_value = 1599
+
+        ProductionProvider().handle_onorder_landsat_products(self.products)
+        polled = sorted(self.polled(mock_inventory))
+        # the 100 after the cursor, then wrapping around to the oldest
+        self.assertEqual(500, len(polled))
+        self.assertEqual(range(1000, 1400) + range(1600, 1700), polled)
+        mock_cache.set.assert_called_with('onorder_landsat_cursor', 1399, 86400)
+        # one service, and its configuration, for every order polled
+        mock_inventory.LTAService.assert_called_once_with(
+            mock_inventory.get_cached_session.return_value,
+            timeout=mock_inventory.request_timeout.return_value)
+
+    @patch('api.providers.production.production_provider.Scene')
+    def test_statuses_joined(self, mock_scene, mock_inventory, mock_cache, mock_config):
+        mock_config.get.side_effect = CONFIG.get
+        products = self.products[:3]
+        statuses = {1000: {'units': [{'statusCode': 'C', 'orderingId': 'LC08_0'}]},
+                    1001: {'units': [{'statusCode': 'I', 'orderingId': 'LC08_1'}]},
+                    1002: None}
+        self.service(mock_inventory).side_effect = lambda tid: statuses[tid]
+
+        self.assertTrue(ProductionProvider().handle_onorder_landsat_products(products))
+        mock_cache.get.assert_not_called()
+        mock_scene.bulk_update.assert_called_once_with([0], {'status': 'oncache', 'note': ''})
+
+
+@patch('api.providers.production.production_provider.config')
+@patch('api.providers.production.production_provider.Scene')
+@patch('api.providers.production.production_provider.inventory')
+class TestSubmittedProducts(unittest.TestCase):
+    def setUp(self):
+        self.scenes = [scene(i, None) for i in range(5)]
+
+    def test_chunks_and_bulk_updates(self, mock_inventory, mock_scene, mock_config):
+        mock_config.get.side_effect = {'system.submitted_chunk_size': 3}.get
+        mock_inventory.check_valid.side_effect = lambda token, names: {
+            n: n != 'LC08_1' for n in names}
+        provider = ProductionProvider()
+        with patch.object(provider, 'set_products_unavailable') as unavailable:
+            self.assertTrue(provider.handle_submitted_products(self.scenes, 'landsat'))
+
+        self.assertEqual(2, mock_inventory.check_valid.call_count)
+        self.assertEqual([([0, 2], {'status': 'oncache', 'note': "''"}), ([3, 4], {'status': 'oncache', 'note': "''"})],
+                         [c[0] for c in mock_scene.bulk_update.call_args_list])
+        self.assertEqual([self.scenes[1]], unavailable.call_args[0][0])
+
+    @patch('api.providers.production.production_provider.logger')
+    def test_ee_scene_rejected(self, mock_logger, mock_inventory, mock_scene, mock_config):
+        mock_config.get.side_effect = {'system.submitted_chunk_size': 3}.get
+        mock_inventory.get_cached_session.return_value = 'token'
+        mock_inventory.check_valid.side_effect = lambda token, names: {
+            n: n != 'LC08_1' for n in names}
+        self.scenes[1].ee_unit_id = 7
+        self.scenes[1].order_attr.side_effect = {'order_source': 'ee',
+                                                 'ee_order_id': '0101703'}.get
+
+        self.assertTrue(ProductionProvider().handle_submitted_landsat_products(self.scenes))
+        mock_inventory.update_order_status.assert_called_once_with('token', '0101703', 7, 'R')
+        mock_logger.info.assert_any_call('Found 5 submitted landsat products')
+        mock_logger.warn.assert_not_called()
+
+    @patch('api.providers.production.production_provider.logger')
+    def test_failed_chunk(self, mock_logger, mock_inventory, mock_scene, mock_config):
+        mock_config.get.side_effect = {'system.submitted_chunk_size': 3}.get
+
+        def check_valid(token, names):
+            if 'LC08_0' in names:
+                raise IOError('M2M down')
+            return dict.fromkeys(names, True)
+        mock_inventory.check_valid.side_effect = check_valid
+
+        with self.assertRaises(ProductionProviderException):
+            ProductionProvider().handle_submitted_modis_products(self.scenes)
+        # same level for every sensor
+        mock_logger.info.assert_any_call('Found 5 submitted modis products')
+        mock_logger.warn.assert_not_called()
+        # the second chunk still went through
+        mock_scene.bulk_update.assert_called_once_with([3, 4], {'status': 'oncache', 'note': "''"})
+
+
+@patch('api.providers.production.production_provider.config')
+@patch('api.providers.production.production_provider.Scene')
+@patch('api.util.connections.cached_is_reachable')
+class TestCheckDependencies(unittest.TestCase):
+    def test_one_probe_per_batch(self, mock_reachable, mock_scene, mock_config):
+        mock_config.url_for.return_value = 'http://e4ftl01.cr.usgs.gov'
+        mock_reachable.return_value = False
+        scenes = [scene(i, None) for i in range(50)]
+        for s in scenes:
+            s.name = 'LC08_L1TP_027029_20170912_20170912_01_T1'
+        mock_scene.order_attrs.return_value = {
+            s.id: {'olitirs8_collection': {'products': ['st'] if s.id % 2 else ['sr']}} for s in scenes}
+
+        passed = ProductionProvider.check_dependencies_for_products(scenes)
+        self.assertEqual(scenes[::2], passed)
+        self.assertEqual(1, mock_reachable.call_count)
+        mock_scene.order_attrs.assert_called_once_with(scenes, 'product_opts')
+
+
+class FakeLock(object):
+    def __init__(self, name):
+        self.name = name
+        self.acquired = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.acquired = False
+
+
+HANDLERS = ('load_ee_orders', 'send_initial_emails', 'handle_onorder_landsat_products',
+            'handle_retry_products', 'handle_failed_ee_updates', 'handle_submitted_landsat_products',
+            'handle_submitted_modis_products', 'handle_submitted_viirs_products',
+            'handle_submitted_sentinel_products', 'handle_submitted_plot_products',
+            'calc_scene_download_sizes', 'update_order_if_complete', 'handle_stuck_jobs',
+            'handle_cancelled_orders', 'purge_orders')
+
+
+@patch('api.providers.production.production_provider.AdvisoryLock', FakeLock)
+@patch('api.providers.production.production_provider.config')
+@patch('api.providers.production.production_provider.cache')
+@patch('api.providers.production.production_provider.Order')
+@patch('api.providers.production.production_provider.Scene')
+class TestHandleOrders(unittest.TestCase):
+    def setUp(self):
+        self.provider = ProductionProvider()
+        self.handlers = dict((name, patch.object(self.provider, name).start()) for name in HANDLERS)
+        self.addCleanup(patch.stopall)
+
+    def configure(self, mock_order, mock_scene, mock_config):
+        mock_config.get.side_effect = {'system.handle_orders_shards': None,
+                                       'system.run_order_purge_every': '3600',
+                                       'policy.purge_orders_after': '10'}.get
+        mock_order.where.return_value = [MagicMock(id=1, user_id=7, initial_email_sent=None)]
+        mock_scene.where.return_value = []
+
+    def test_unsharded(self, mock_scene, mock_order, mock_cache, mock_config):
+        self.configure(mock_order, mock_scene, mock_config)
+        summary = self.provider.handle_orders(report=True)
+
+        self.assertTrue(summary['result'])
+        self.assertEqual('ok', summary['status']['stuck_jobs'])
+        self.assertEqual('ok', summary['status']['cancelled_orders'])
+        self.assertEqual(set(['ok']), set(summary['status'].values()))
+        stages = [span['stage'] for span in summary['stages']]
+        # completion emails only after the confirmations
+        self.assertLess(stages.index('initial_emails'), stages.index('finalize'))
+        self.handlers['handle_stuck_jobs'].assert_called_once_with([])
+        search = self.handlers['handle_cancelled_orders'].call_args[0][0]
+        self.assertNotIn('user_id', search)
+
+    @patch('api.providers.production.production_provider.User')
+    def test_one_user(self, mock_user, mock_scene, mock_order, mock_cache, mock_config):
+        self.configure(mock_order, mock_scene, mock_config)
+        mock_user.by_username.return_value = MagicMock(id=7, contactid='900001')
+
+        self.assertTrue(self.provider.handle_orders(username='bilbo'))
+        search = self.handlers['handle_cancelled_orders'].call_args[0][0]
+        self.assertEqual(7, search['user_id'])
+        stuck = [c[0][0] for c in mock_scene.where.call_args_list if 'status_modified <' in c[0][0]]
+        self.assertEqual([1], stuck[0]['order_id'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
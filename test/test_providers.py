@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+import os
+import unittest
+
+from mock import patch
+
+from api.interfaces.providers import LazyProvider
+from api.providers.configuration.configuration_provider import ConfigurationProvider
+
+
+class TestLazyProvider(unittest.TestCase):
+    def test_built_on_first_use(self):
+        provider = LazyProvider('collections.OrderedDict')
+        self.assertIsNone(provider._instance)
+        provider.update(a=1)
+        self.assertEqual([('a', 1)], provider.items())
+        self.assertIs(provider._instance, provider._resolve())
+
+    def test_patched_methods_apply(self):
+        provider = LazyProvider('api.providers.ordering.ordering_provider.OrderingProvider')
+        with patch('api.providers.ordering.ordering_provider.OrderingProvider.available_products',
+                   return_value={'patched': True}):
+            self.assertEqual({'patched': True}, provider.available_products('id', 'bilbo'))
+
+
+@patch('api.providers.configuration.configuration_provider.db_instance')
+class TestConfigurationProvider(unittest.TestCase):
+    def rows(self, mock_db, rows):
+        db = mock_db.return_value.__enter__.return_value
+        db.__iter__.return_value = iter(rows)
+        return db
+
+    def test_one_key(self, mock_db):
+        db = self.rows(mock_db, [{'key': 'policy.open_scene_limit', 'value': '10000'}])
+        self.assertEqual('10000', ConfigurationProvider().get('policy.open_scene_limit'))
+        # only the key asked for, not the whole table
+        db.select.assert_called_once_with(
+            'select key, value from ordering_configuration where key in %s',
+            (('policy.open_scene_limit',),))
+
+    def test_several_keys(self, mock_db):
+        db = self.rows(mock_db, [{'key': 'a', 'value': '1'}])
+        self.assertEqual(('1', None), ConfigurationProvider().get(('a', 'b')))
+        self.assertEqual((('a', 'b'),), db.select.call_args[0][1])
+
+    def test_email_receive(self, mock_db):
+        db = self.rows(mock_db, [{'key': 'apiemailreceive', 'value': 'espa@usgs.gov'}])
+        with patch.dict(os.environ):
+            os.environ.pop('ESPA_API_EMAIL_RECEIVE', None)
+            self.assertEqual('espa@usgs.gov', ConfigurationProvider().get('ESPA_API_EMAIL_RECEIVE'))
+        self.assertEqual((('ESPA_API_EMAIL_RECEIVE', 'apiemailreceive'),), db.select.call_args[0][1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+import unittest
+
+from mock import patch, MagicMock
+
+from api.util.dbconnect import DBConnect
+from api.util.querystats import QueryStats, fingerprint, query_stats
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_values_ignored(self):
+        a = fingerprint("select * from ordering_scene where name = 'bilbo' and id in (1, 2, 3)")
+        b = fingerprint("SELECT *  FROM ordering_scene\nWHERE name = 'frodo' AND id IN (4)")
+        self.assertEqual(a, b)
+        self.assertEqual('select * from ordering_scene where name = ? and id in (?)', a[1])
+
+    def test_placeholders(self):
+        self.assertEqual(fingerprint('update ordering_scene set status = %s where id in %(ids)s')[0],
+                         fingerprint('update ordering_scene set status = %s where id in %(ids)s')[0])
+
+
+class TestQueryStats(unittest.TestCase):
+    def test_nested_scopes(self):
+        stats = QueryStats()
+        stats._slow_ms = 1000
+        request = stats.begin('GET /api')
+        with stats.scope('OrderingProvider.fetch_order') as inner:
+            stats.queried('select 1', 0.01)
+        stats.queried('select 2', 0.02)
+        stats.connected(0.005)
+        stats.end(request)
+
+        self.assertEqual(1, inner.queries)
+        self.assertEqual(2, request.queries)
+        self.assertEqual(1, request.connections)
+        self.assertEqual('2', request.headers()['X-DB-Queries'])
+        self.assertEqual([], stats.scopes)
+
+    @patch('api.system.logger.ilogger')
+    def test_slow_query_logged(self, mock_logger):
+        stats = QueryStats()
+        stats._slow_ms = 100
+        stats.queried("select * from auth_user where username = 'bilbo'", 0.5)
+        args = mock_logger.warning.call_args[0]
+        self.assertIn('select * from auth_user where username = ?', args)
+
+
+class TestDBConnectCounting(unittest.TestCase):
+    @patch('api.util.dbconnect.psycopg2.connect')
+    def test_select_counted(self, mock_connect):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+        mock_connect.return_value.cursor.return_value = cursor
+        with query_stats.scope('test') as counter:
+            db = DBConnect('localhost', 'espa', 'bilbo', 'baggins', 5432)
+            db.select('select 1')
+            db.execute('update ordering_scene set status = %s', ('queued',))
+        self.assertEqual(1, counter.connections)
+        self.assertEqual(2, counter.queries)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+import re
+import unittest
+
+from api import ProductNotImplemented
+from api.domain import sensor
+
+
+class TestSensorInstance(unittest.TestCase):
+    def setUp(self):
+        sensor._parsed_ids.clear()
+        self.samples = {key: val[2] for key, val in sensor.SensorCONST.instances.items()}
+
+    def test_instance_matches_patterns(self):
+        """
+        Prefix dispatch must agree with trying every pattern in turn
+        """
+        for key, sample in self.samples.items():
+            expected = [k for k, v in sensor.SensorCONST.instances.items()
+                        if re.match(v[0], sample.lower())]
+            self.assertEqual(expected, [sensor.instance(sample).shortname])
+
+    def test_instance_case_and_extension(self):
+        product_id = 'LC08_L1TP_042034_20011103_20160706_01_T1'
+        inst = sensor.instance(product_id + '.tar.gz')
+        self.assertEqual('olitirs8_collection', inst.shortname)
+        self.assertEqual(product_id, inst.product_id)
+        self.assertEqual('olitirs8_collection', sensor.instance(product_id.lower()).shortname)
+
+    def test_instance_long_sentinel_name(self):
+        product_id = 'S2A_OPER_MSI_L1C_TL_SGS__20160130T184417_20160130T203840_A003170_T13VCC_N02_01_01'
+        self.assertEqual(sensor.instance(product_id).shortname, 'sentinel')
+
+    def test_instance_not_implemented(self):
+        for product_id in ('bilbo', 'lt04_bilbo', 'bilbo.baggins'):
+            with self.assertRaises(ProductNotImplemented):
+                sensor.instance(product_id)
+
+    def test_instance_matches_parse_id(self):
+        long_id = 'S2A_OPER_MSI_L1C_TL_SGS__20160130T184417_20160130T203840_A003170_T13VCC_N02_01_01'
+        for product_id in self.samples.values() + [long_id]:
+            inst = sensor.instance(product_id)
+            year, doy, dataset = type(inst).parse_id(inst.product_id)
+            self.assertEqual((year, doy, dataset), (inst.year, inst.doy, inst.lta_json_name), product_id)
+
+    def test_instance_cached(self):
+        product_id = self.samples['mod09a1']
+        sensor.instance(product_id)
+        self.assertEqual(('mod09a1', sensor.ModisTerra09A1),
+                         sensor._parsed_ids.get(product_id.lower()))
+
+
+class TestSensorClassify(unittest.TestCase):
+    def setUp(self):
+        self.samples = [val[2] for val in sensor.SensorCONST.instances.values()]
+        self.samples.append('S2A_OPER_MSI_L1C_TL_SGS__20160130T184417_20160130T203840_A003170_T13VCC_N02_01_01')
+
+    def test_classify_matches_instance(self):
+        result = sensor.classify(self.samples)
+        self.assertNotIn('not_implemented', result)
+        for product_id in self.samples:
+            inst = sensor.instance(product_id)
+            group = result[inst.shortname]
+            self.assertIn(product_id, group['inputs'])
+            self.assertIn(product_id, group['datasets'][inst.lta_json_name])
+            self.assertEqual((inst.year, inst.doy), group['dates'][product_id])
+            self.assertEqual(inst.products, group['products'])
+
+    def test_classify_not_implemented(self):
+        bad = ['bilbo', 'lt04_bilbo', 'l1c_t14tpp_a022031_20190910t17272']
+        result = sensor.classify(self.samples[:1] + bad)
+        self.assertEqual(bad, result['not_implemented'])
+
+    def test_available_products_groups(self):
+        result = sensor.available_products(['mod09a1.a2000072.h02v09.005.2008237032813',
+                                             'mod09a1.a2016305.h11v04.006.2016314200836',
+                                             'bilbo'])
+        self.assertEqual({'mod09a1', 'not_implemented'}, set(result))
+        self.assertEqual(2, len(result['mod09a1']['inputs']))
+        self.assertEqual(['bilbo'], result['not_implemented'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
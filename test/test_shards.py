@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+import json
+import unittest
+
+from mock import patch, MagicMock
+
+from api.providers.production import shards
+
+
+class TestShards(unittest.TestCase):
+    def test_shard_of(self):
+        assigned = [shards.shard_of(user_id, 4) for user_id in range(1, 401)]
+        self.assertEqual(assigned, [shards.shard_of(user_id, 4) for user_id in range(1, 401)])
+        self.assertEqual(set([0, 1, 2, 3]), set(assigned))
+        # no shard gets more than twice its share
+        self.assertTrue(max(assigned.count(i) for i in range(4)) < 200)
+
+    def test_merge(self):
+        merged = shards.merge([
+            {'result': True, 'status': {'submitted_modis': 'ok', 'retry': 'ok'},
+             'stages': [{'stage': 'retry', 'rows': 2, 'seconds': 1.5, 'queries': 3}]},
+            {'result': False, 'status': {'submitted_modis': 'timeout', 'retry': 'ok'},
+             'stages': [{'stage': 'retry', 'rows': 1, 'seconds': 0.5, 'queries': 2}]}])
+        self.assertTrue(merged['result'])
+        self.assertEqual({'submitted_modis': 'timeout', 'retry': 'ok'}, merged['status'])
+        self.assertEqual([{'stage': 'retry', 'rows': 3, 'seconds': 2.0, 'queries': 5,
+                           'shards': 2}], merged['stages'])
+
+    @patch('api.providers.production.shards.subprocess.Popen')
+    def test_run_shards(self, mock_popen):
+        def popen(cmd):
+            index, count, path = cmd[3:6]
+            if index == '0':
+                with open(path, 'w') as f:
+                    json.dump({'shard': 0, 'result': True, 'status': {}, 'stages': []}, f)
+            return MagicMock(**{'poll.return_value': 0 if index == '0' else 1,
+                                'returncode': 0 if index == '0' else 1})
+        mock_popen.side_effect = popen
+
+        summaries = shards.run_shards(2)
+        self.assertEqual(['api.providers.production.shards', '0', '2'],
+                         mock_popen.call_args_list[0][0][0][2:5])
+        self.assertTrue(summaries[0]['result'])
+        self.assertEqual({'shard': 'error'}, summaries[1]['status'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from mock import patch, MagicMock
+
+from api.util.stages import StageScheduler, StageTimer, profiled
+
+
+class TestStageTimer(unittest.TestCase):
+    @patch('api.util.stages.registry')
+    def test_spans(self, mock_registry):
+        timer = StageTimer('handle_orders')
+        with timer.stage('retry') as span:
+            span['rows'] = 3
+        with self.assertRaises(ValueError):
+            with timer.stage('purge'):
+                raise ValueError('disk full')
+
+        summary = timer.summary()
+        self.assertEqual('handle_orders', summary['job'])
+        self.assertEqual(['retry', 'purge'], [s['stage'] for s in summary['stages']])
+        self.assertEqual(3, summary['stages'][0]['rows'])
+        self.assertEqual(0, summary['stages'][0]['queries'])
+        self.assertTrue(summary['stages'][1]['error'])
+        self.assertEqual(2, mock_registry.observe.call_count)
+
+
+@patch('api.util.stages.registry')
+class TestStageScheduler(unittest.TestCase):
+    def test_dependencies_and_isolation(self, mock_registry):
+        ran = []
+        scheduler = StageScheduler(StageTimer('handle_orders'), workers=2)
+        scheduler.add('retry', lambda: ran.append('retry'))
+        scheduler.add('failed_ee_updates', lambda: 1 / 0)
+        scheduler.add('submitted_scenes', lambda: ran.append('submitted_scenes'), after=['retry'])
+        scheduler.add('submitted_modis', lambda: ran.append('submitted_modis'),
+                      needs=['failed_ee_updates'])
+        scheduler.add('finalize', lambda: ran.append('finalize'),
+                      after=['submitted_scenes', 'submitted_modis'])
+        status = scheduler.run()
+
+        self.assertEqual({'retry': 'ok', 'failed_ee_updates': 'error',
+                          'submitted_scenes': 'ok', 'submitted_modis': 'skipped',
+                          'finalize': 'ok'}, status)
+        self.assertLess(ran.index('retry'), ran.index('submitted_scenes'))
+        self.assertEqual('finalize', ran[-1])
+
+    def test_timeout(self, mock_registry):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        scheduler = StageScheduler(StageTimer('handle_orders'), workers=2)
+        scheduler.add('submitted_modis', release.wait, timeout=0.1)
+        scheduler.add('submitted_landsat', lambda: 5)
+        status = scheduler.run()
+        self.assertEqual('timeout', status['submitted_modis'])
+        self.assertEqual('ok', status['submitted_landsat'])
+
+    def test_join_abandoned(self, mock_registry):
+        release = threading.Event()
+        finished = []
+        scheduler = StageScheduler(StageTimer('handle_orders'), workers=2)
+        scheduler.add('submitted_modis', lambda: release.wait() and finished.append(1), timeout=0.1)
+        self.assertEqual('timeout', scheduler.run()['submitted_modis'])
+        self.assertEqual([], finished)
+
+        threading.Timer(0.1, release.set).start()
+        self.assertEqual([], scheduler.join())
+        self.assertEqual([1], finished)
+        self.assertEqual({}, scheduler.abandoned)
+
+    def test_join_bounded(self, mock_registry):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        scheduler = StageScheduler(StageTimer('handle_orders'), workers=2)
+        scheduler.add('submitted_modis', release.wait, timeout=0.1)
+        scheduler.run()
+
+        start = time.time()
+        self.assertEqual(['submitted_modis'], scheduler.join(0.1))
+        self.assertLess(time.time() - start, 1)
+        release.set()
+        self.assertEqual([], scheduler.join(1))
+
+    def test_settled(self, mock_registry):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        ran = []
+        scheduler = StageScheduler(StageTimer('handle_orders'), workers=2)
+        scheduler.add('submitted_modis', release.wait, timeout=0.1)
+        scheduler.add('retry', lambda: 1 / 0)
+        scheduler.add('finalize', lambda: ran.append('finalize'),
+                      settled=['submitted_modis', 'retry'])
+        scheduler.add('download_sizes', lambda: ran.append('download_sizes'), settled=['retry'])
+        status = scheduler.run()
+
+        self.assertEqual('skipped', status['finalize'])
+        self.assertEqual('ok', status['download_sizes'])
+        self.assertEqual(['download_sizes'], ran)
+
+    def test_inline(self, mock_registry):
+        threads = []
+        scheduler = StageScheduler(StageTimer('handle_orders'), workers=0)
+        scheduler.add('retry', lambda: threads.append(threading.current_thread()))
+        scheduler.run()
+        self.assertEqual([threading.current_thread()], threads)
+
+    def test_locked_stage(self, mock_registry):
+        held = set(['handle_orders.purge'])
+        lock = MagicMock(side_effect=lambda name: MagicMock(
+            **{'__enter__.return_value.acquired': name not in held}))
+        scheduler = StageScheduler(StageTimer('handle_orders'), lock=lock)
+        scheduler.add('purge', lambda: None, lock=True)
+        scheduler.add('retry', lambda: None, lock=True)
+        self.assertEqual({'purge': 'locked', 'retry': 'ok'}, scheduler.run())
+
+    def test_unknown_dependency(self, mock_registry):
+        scheduler = StageScheduler(StageTimer('handle_orders'))
+        with self.assertRaises(ValueError):
+            scheduler.add('finalize', lambda: None, after=['purge'])
+
+
+class TestProfiled(unittest.TestCase):
+    def test_disabled(self):
+        with profiled('handle_orders', enabled=False) as report:
+            pass
+        self.assertEqual({}, report)
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with patch.dict(os.environ, {'ESPA_PROFILE_DIR': directory}):
+            with profiled('handle_orders') as report:
+                sorted(range(1000))
+        self.assertTrue(os.path.exists(report['path']))
+        self.assertEqual(directory, os.path.dirname(report['path']))
+        self.assertIn('function calls', report['top'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+import unittest
+
+import requests
+
+from mock import patch, MagicMock
+
+from api.external.mocks import server
+from api.external import inventory, ers
+from api.util import connections
+
+
+class TestStubServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = server.start(options=server.StubOptions(missing_rate=.2, orders=3, units=4))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        cls.stub.server_close()
+
+    def setUp(self):
+        urls = {'earthexplorer.json': self.stub.url + '/inventory/json/',
+                'ersapi': self.stub.url}
+        self.config = MagicMock(mode='dev')
+        self.config.url_for.side_effect = lambda name: urls.get(name, 'http://localhost/')
+        self.config.get.side_effect = lambda key: {
+            'system.handle_orders_stage_timeout': '300'}.get(key, 'stub')
+        patch('api.external.inventory.config', self.config).start()
+        patch('api.external.ers.cfg', self.config).start()
+        self.addCleanup(patch.stopall)
+
+    def service(self):
+        return inventory.LTAService(ipaddr='127.0.0.1')
+
+    def test_login(self):
+        self.assertEqual('stub-api-key', self.service().login())
+
+    def test_verify_scenes(self):
+        names = [server.landsat_id(0, n) for n in range(20)]
+        response = self.service().verify_scenes(names, 'LANDSAT_8_C1')
+        self.assertEqual(set(names), set(response))
+        # deterministic, with some reported missing
+        self.assertEqual(response, self.service().verify_scenes(names, 'LANDSAT_8_C1'))
+        self.assertTrue(0 < sum(response.values()) < len(names))
+
+    def test_order_queue_and_status(self):
+        service = self.service()
+        orders = service.get_available_orders()
+        self.assertEqual(3, len(orders))
+        self.assertEqual(4, len(orders[0]['units']))
+
+        status = service.get_order_status(orders[0]['orderNumber'])
+        self.assertEqual([u['orderingId'] for u in orders[0]['units']],
+                         [u['orderingId'] for u in status['units']])
+        self.assertTrue(set(u['statusCode'] for u in status['units']) <= {'C', 'I', 'R'})
+
+    def test_request_timeout(self):
+        self.assertEqual(30, inventory.LTAService(ipaddr='127.0.0.1').timeout)
+        self.stub.options.latency = 1
+        try:
+            with self.assertRaises(requests.Timeout):
+                inventory.LTAService(ipaddr='127.0.0.1', timeout=0.2).login()
+        finally:
+            self.stub.options.latency = 0
+
+    def test_ers_user_info(self):
+        info = ers.ERSApi().get_user_info('bench', 'secret')
+        self.assertEqual('bench', info['username'])
+        self.assertEqual('bench@example.com', info['email'])
+
+    def test_head(self):
+        self.assertTrue(connections.is_reachable(self.stub.url + '/inventory/json/login', timeout=2))
+        found = [connections.is_reachable('{}/MOLT/{}.hdf'.format(self.stub.url, n), timeout=2, n_tries=1)
+                 for n in range(20)]
+        self.assertTrue(0 < sum(found) < len(found))
+
+    def test_mesos_slaves(self):
+        from api.providers.production.production_provider import ProductionProvider
+        self.config.url_for.side_effect = lambda name: self.stub.url
+        with patch('api.providers.production.production_provider.config', self.config), \
+                patch('api.providers.production.production_provider.local_cache') as mock_cache:
+            mock_cache.get_or_compute.side_effect = lambda key, func, timeout: func()
+            whitelist = ProductionProvider.production_whitelist()
+        self.assertIn('127.0.0.1', whitelist)
+        self.assertIn('10.12.34.10', whitelist)
+
+    def test_counts_requests(self):
+        self.service().login()
+        self.assertTrue(self.stub.requests.get('POST login 200') >= 1)
+
+    def test_errors(self):
+        self.stub.options.error_rate = 1
+        try:
+            with self.assertRaises(ers.ERSApiConnectionException):
+                ers.ERSApi().get_user_info('bench', 'secret')
+        finally:
+            self.stub.options.error_rate = 0
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)